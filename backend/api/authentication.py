@@ -0,0 +1,70 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from foodgram.caching import TieredCache
+from users.models import User
+
+CachedToken = namedtuple('CachedToken', 'key user_id is_active')
+
+
+def cached_token(token):
+    return CachedToken(token.key, token.user_id, token.user.is_active)
+
+
+class TokenCache(TieredCache):
+    """Уже проверенные токены: LRU процесса и, если задан, общий кеш Django.
+
+    Хранится только CachedToken, без модели пользователя и хеша пароля.
+    Устаревшие токены не отдаются (stale_ttl=0), а промах по одному ключу
+    проверяется в базе одним потоком и одним воркером.
+    """
+
+    def _user_keys(self, user_id):
+        with self.lock:
+            return {
+                key for key, (envelope, _) in self.entries.items()
+                if envelope[0].user_id == user_id
+            }
+
+    def delete_user(self, user_id):
+        keys = self._user_keys(user_id)
+        keys.update(Token.objects.filter(
+            user_id=user_id).values_list('key', flat=True))
+        for key in keys:
+            self.delete(key)
+
+
+token_cache = TokenCache(
+    'auth-token',
+    shared_alias=settings.TOKEN_CACHE['SHARED_CACHE'],
+    max_size=settings.TOKEN_CACHE['MAX_SIZE'],
+    ttl=settings.TOKEN_CACHE['TTL'],
+    local_ttl=settings.TOKEN_CACHE['LOCAL_TTL'],
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к базе для недавно виденных токенов.
+
+    Пользователь из кеша загружен только с id и is_active; первое
+    обращение к любому другому полю догружает остальные одним запросом.
+    """
+
+    def authenticate_credentials(self, key):
+        authenticate = super().authenticate_credentials
+        cached = token_cache.get_or_set(
+            key, lambda: cached_token(authenticate(key)[1]))
+        if not cached.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+        user = User.from_db(
+            None, ('id', 'is_active'), (cached.user_id, cached.is_active))
+        token = Token.from_db(
+            None, ('key', 'user_id'), (cached.key, cached.user_id))
+        token.user = user
+        return user, token
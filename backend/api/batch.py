@@ -0,0 +1,128 @@
+"""Выполнение пачки GET-запросов к API внутри одного HTTP-запроса.
+
+Подзапросы идут прямо во view из api.urls, минуя middleware: пользователь
+уже аутентифицирован внешним запросом и передаётся как принудительный,
+кеш списков пользователя (memberships) общий на всю пачку. По умолчанию
+подзапросы выполняются по очереди в одном потоке и одном соединении с
+базой; с parallel — в пуле из BATCH['MAX_WORKERS'] потоков, у каждого из
+которых своё соединение, закрываемое после подзапроса. Запросы к базе из
+потоков пула проходят через те же execute_wrapper, что и внешний запрос,
+поэтому видны в Server-Timing и /metrics.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from urllib.parse import urlsplit
+
+import orjson
+from django.db import connections
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework.renderers import JSONRenderer
+
+from foodgram.db_router import is_pinned, replica_reads
+from foodgram.performance import inherited_wrappers
+
+logger = logging.getLogger(__name__)
+
+SKIPPED_META = ('CONTENT_LENGTH', 'CONTENT_TYPE', 'HTTP_IF_NONE_MATCH',
+                'wsgi.input')
+NOT_FOUND = orjson.dumps({'detail': 'Страница не найдена.'})
+
+
+def build_request(request, path, query, shared):
+    """HttpRequest для подзапроса с пользователем и кешами внешнего."""
+    sub = HttpRequest()
+    sub.method = 'GET'
+    sub.path = sub.path_info = path
+    sub.META = {
+        **{key: value for key, value in request.META.items()
+           if key not in SKIPPED_META},
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'HTTP_ACCEPT': JSONRenderer.media_type,
+        'HTTP_ACCEPT_ENCODING': 'identity',
+    }
+    sub.GET = QueryDict(query)
+    sub.COOKIES = request.COOKIES
+    if request.user.is_authenticated:
+        sub._force_auth_user = request.user
+        sub._force_auth_token = request.auth
+    sub._recipe_memberships = shared
+    return sub
+
+
+def response_body(response):
+    if response.streaming:
+        content = b''.join(response.streaming_content)
+    else:
+        content = response.content
+    if not content:
+        return b'null'
+    if response.get('Content-Type', '').startswith(JSONRenderer.media_type):
+        return content
+    return orjson.dumps(content.decode(response.charset, 'replace'))
+
+
+def execute(request, url, shared):
+    """(статус, тело JSON в байтах) одного подзапроса."""
+    parts = urlsplit(url)
+    try:
+        match = resolve(parts.path)
+    except Resolver404:
+        return 404, NOT_FOUND
+    if match.namespace != 'api' or match.url_name == 'batch':
+        return 404, NOT_FOUND
+    sub = build_request(request, parts.path, parts.query, shared)
+    sub.resolver_match = match
+    pinned = is_pinned(match.func, match.view_name)
+    try:
+        with replica_reads(not pinned):
+            response = match.func(sub, *match.args, **match.kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+        try:
+            return response.status_code, response_body(response)
+        finally:
+            response.close()
+    except Exception:
+        logger.exception('Подзапрос %s завершился ошибкой', url)
+        return 500, b'null'
+
+
+def execute_instrumented(request, url, shared):
+    """execute в потоке пула: запросы к базе считаются в Server-Timing и
+    метриках внешнего запроса, соединение потока закрывается после."""
+    try:
+        with inherited_wrappers():
+            return execute(request, url, shared)
+    finally:
+        connections.close_all()
+
+
+def run_in_thread(context, request, url, shared):
+    return context.run(execute_instrumented, request, url, shared)
+
+
+def run_batch(request, urls, parallel=False, max_workers=1):
+    """Ответы подзапросов в порядке urls: [(статус, тело), ...]."""
+    shared = {}
+    if not parallel or len(urls) < 2 or max_workers < 2:
+        return [execute(request, url, shared) for url in urls]
+    with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(urls)),
+            thread_name_prefix='batch') as pool:
+        return list(pool.map(
+            run_in_thread, [copy_context() for _ in urls],
+            [request] * len(urls), urls, [shared] * len(urls)))
+
+
+def render_batch(urls, results):
+    """JSON-массив [{path, status, body}], тела вставляются как есть."""
+    items = (
+        b'{"path":%b,"status":%d,"body":%b}' % (
+            orjson.dumps(url), status, body)
+        for url, (status, body) in zip(urls, results)
+    )
+    return b'[' + b','.join(items) + b']'
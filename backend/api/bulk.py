@@ -0,0 +1,136 @@
+"""Создание пачки рецептов одним запросом.
+
+Формат каждого рецепта проверяет BulkRecipeSerializer без обращений к
+базе; существование тегов и ингредиентов и занятые у автора названия
+проверяются тремя запросами на всю пачку. Прошедшие проверку рецепты, их
+теги и ингредиенты вставляются тремя bulk_create в одной транзакции.
+Сигналы post_save и m2m_changed при этом не срабатывают, поэтому счётчики
+тегов, карточки и событие 'recipe' для кешей других воркеров обновляются
+здесь же.
+"""
+from django.db import transaction
+from rest_framework import status
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from . import facets
+from .cards import schedule_refresh
+from .invalidation import channel
+from .serializers import BulkRecipeSerializer
+
+
+def check_format(items):
+    """{индекс: данные} прошедших проверку и {индекс: ошибки} остальных."""
+    valid, errors = {}, {}
+    for index, item in enumerate(items):
+        serializer = BulkRecipeSerializer(data=item)
+        if serializer.is_valid():
+            valid[index] = serializer.validated_data
+        else:
+            errors[index] = serializer.errors
+    return valid, errors
+
+
+def known_ids(model, ids):
+    return set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+
+
+def check_references(author, valid):
+    """Ошибки ссылок и повторов названий по индексам пачки."""
+    tags = known_ids(Tag, {pk for data in valid.values()
+                           for pk in data['tags']})
+    ingredients = known_ids(Ingredient, {
+        ingredient['id'] for data in valid.values()
+        for ingredient in data['ingredients']
+    })
+    taken = set(Recipe.objects.filter(
+        author=author, name__in={data['name'] for data in valid.values()},
+    ).values_list('name', flat=True))
+    errors = {}
+    for index, data in valid.items():
+        item_errors = {}
+        missing_tags = sorted(set(data['tags']) - tags)
+        if missing_tags:
+            item_errors['tags'] = [
+                f'{pk} - такого тега нет' for pk in missing_tags]
+        missing_ingredients = sorted(
+            {ingredient['id'] for ingredient in data['ingredients']}
+            - ingredients)
+        if missing_ingredients:
+            item_errors['ingredients'] = [
+                f'{pk}- ингредиент с таким id не найден'
+                for pk in missing_ingredients]
+        if data['name'] in taken:
+            item_errors['name'] = ['У вас уже есть рецепт с таким названием']
+        taken.add(data['name'])
+        if item_errors:
+            errors[index] = item_errors
+    return errors
+
+
+def insert_recipes(author, items):
+    """Вставляет рецепты со связями; возвращает их id в порядке items.
+
+    Картинки сохраняются в хранилище при bulk_create, поэтому при откате
+    транзакции уже записанные файлы удаляются.
+    """
+    recipes = [
+        Recipe(
+            author=author, name=data['name'], text=data['text'],
+            cooking_time=data['cooking_time'], image=data['image'])
+        for data in items
+    ]
+    try:
+        with transaction.atomic():
+            insert_rows(author, recipes, items)
+            ids = [recipe.pk for recipe in recipes]
+            channel.publish('recipe', *ids)
+            schedule_refresh(ids)
+            transaction.on_commit(facets.invalidate)
+    except Exception:
+        for recipe in recipes:
+            if recipe.image._committed:
+                recipe.image.delete(save=False)
+        raise
+    return ids
+
+
+def insert_rows(author, recipes, items):
+    Recipe.objects.bulk_create(recipes)
+    if recipes[0].pk is None:
+        ids = dict(Recipe.objects.filter(
+            author=author, name__in=[recipe.name for recipe in recipes],
+        ).values_list('name', 'id'))
+        for recipe in recipes:
+            recipe.pk = ids[recipe.name]
+    recipe_tag = Recipe.tags.through
+    recipe_tag.objects.bulk_create([
+        recipe_tag(recipe_id=recipe.pk, tag_id=tag_id)
+        for recipe, data in zip(recipes, items)
+        for tag_id in data['tags']
+    ])
+    IngredientInRecipe.objects.bulk_create([
+        IngredientInRecipe(
+            recipe_id=recipe.pk, ingredient_id=ingredient['id'],
+            amount=ingredient['amount'])
+        for recipe, data in zip(recipes, items)
+        for ingredient in data['ingredients']
+    ])
+
+
+def create_recipes(author, items):
+    """Результаты по порядку items: {index, status, id} у созданных и
+    {index, status, errors} у отклонённых."""
+    valid, errors = check_format(items)
+    if valid:
+        errors.update(check_references(author, valid))
+    accepted = [index for index in valid if index not in errors]
+    created = dict(zip(accepted, insert_recipes(
+        author, [valid[index] for index in accepted]))) if accepted else {}
+    return [
+        {'index': index, 'status': status.HTTP_201_CREATED,
+         'id': created[index]}
+        if index in created else
+        {'index': index, 'status': status.HTTP_400_BAD_REQUEST,
+         'errors': errors[index]}
+        for index in range(len(items))
+    ]
@@ -0,0 +1,93 @@
+"""Read-модель карточек рецептов для списков.
+
+В RecipeCard для каждого рецепта лежит готовый JSON частей ответа, не
+зависящих от пользователя (build_cards). Списки читают карточки тем же
+запросом, что и страницу рецептов, — JOIN по первичному ключу, — и
+добавляют только флаги текущего пользователя.
+
+Карточки пишет только сторона записи: сигналы рецептов, авторов, тегов и
+ингредиентов вызывают schedule_refresh, и затронутые карточки пересобираются
+один раз после коммита транзакции. Чтение ничего не пишет: карточку с
+modified, отличным от Recipe.modified, или отсутствующую оно собирает для
+ответа, не сохраняя.
+"""
+import orjson
+from django.conf import settings
+from django.db import transaction
+
+from recipes.models import RecipeCard
+from .representations import build_cards
+
+REFRESH_BATCH_SIZE = 500
+CARD_COLUMNS = ('id', 'modified', 'card__data', 'card__modified')
+
+
+def store_cards(built):
+    with transaction.atomic():
+        RecipeCard.objects.filter(pk__in=list(built)).delete()
+        RecipeCard.objects.bulk_create(
+            [
+                RecipeCard(
+                    recipe_id=pk, modified=modified,
+                    data=orjson.dumps(card).decode())
+                for pk, (modified, card) in built.items()
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def refresh_cards(ids):
+    if not settings.RECIPE_CARDS:
+        return
+    ids = list(ids)
+    for offset in range(0, len(ids), REFRESH_BATCH_SIZE):
+        store_cards(build_cards(ids[offset:offset + REFRESH_BATCH_SIZE]))
+
+
+class CardRefresh:
+    """Отложенная до коммита пересборка; копит id всей транзакции."""
+
+    def __init__(self):
+        self.ids = set()
+
+    def __call__(self):
+        refresh_cards(sorted(self.ids))
+
+
+def schedule_refresh(ids):
+    """Пересобирает карточки ids после коммита текущей транзакции.
+
+    Все вызовы в одной транзакции попадают в одну пересборку; вне
+    транзакции карточки пересобираются сразу.
+    """
+    if not settings.RECIPE_CARDS:
+        return
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        refresh_cards(ids)
+        return
+    for _, callback in connection.run_on_commit:
+        if isinstance(callback, CardRefresh):
+            callback.ids.update(ids)
+            return
+    callback = CardRefresh()
+    callback.ids.update(ids)
+    transaction.on_commit(callback)
+
+
+def read_cards(rows):
+    """Карточки для строк .values(*CARD_COLUMNS) в том же порядке;
+    недостающие и устаревшие собираются для ответа без сохранения."""
+    rows = list(rows)
+    stale = {
+        row['id'] for row in rows
+        if row['card__data'] is None
+        or row['card__modified'] != row['modified']
+    }
+    built = build_cards(list(stale)) if stale else {}
+    return [
+        built[row['id']][1] if row['id'] in built
+        else orjson.loads(row['card__data'])
+        for row in rows
+        if row['id'] in built or row['id'] not in stale
+    ]
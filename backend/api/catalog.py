@@ -0,0 +1,131 @@
+"""Готовые сжатые ответы для справочников тегов и ингредиентов.
+
+Снимок рендерится один раз и лежит в двухуровневом кеше: в памяти процесса
+и в общем кеше Django. Собирает его один воркер, остальные ждут; после
+CATALOG_CACHE['TTL'] устаревший снимок ещё отдаётся, пока он
+пересобирается в фоне. Сигналы об изменении строк удаляют снимок, и
+следующий запрос собирает его заново.
+"""
+import gzip
+import hashlib
+from collections import namedtuple
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+from foodgram.caching import TieredCache
+from recipes.models import Ingredient, Tag
+from .serializers import IngredientSerializer, TagSerializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODINGS = ('br', 'gzip')
+
+Snapshot = namedtuple('Snapshot', ('etag', 'variants'))
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding с ненулевым q."""
+    encodings = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            encodings.add(coding.strip().lower())
+    return encodings
+
+
+class CatalogSnapshot:
+    def __init__(self, name, build_data, cache):
+        self.name = name
+        self.build_data = build_data
+        self.cache = cache
+
+    def render(self):
+        content = JSONRenderer().render(self.build_data())
+        variants = {
+            'identity': content,
+            'gzip': gzip.compress(content, compresslevel=9, mtime=0),
+        }
+        if brotli is not None:
+            variants['br'] = brotli.compress(content)
+        return Snapshot(hashlib.sha256(content).hexdigest()[:32], variants)
+
+    def get(self):
+        return self.cache.get_or_set(self.name, self.render)
+
+    def rebuild(self):
+        return self.cache.set(self.name, self.render())
+
+    def invalidate(self):
+        self.cache.delete(self.name)
+
+    def forget(self):
+        self.cache.forget(self.name)
+
+    def response(self, request):
+        snapshot = self.get()
+        encodings = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        encoding = next(
+            (name for name in ENCODINGS
+             if name in snapshot.variants
+             and (name in encodings or '*' in encodings)),
+            'identity',
+        )
+        etag = snapshot.etag if encoding == 'identity' else (
+            f'{snapshot.etag}-{encoding}')
+        if self.matches(request, snapshot.etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                snapshot.variants[encoding],
+                content_type=JSONRenderer.media_type)
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+        response['ETag'] = f'"{etag}"'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    @staticmethod
+    def matches(request, etag):
+        """If-None-Match совпадает с любым вариантом текущего снимка."""
+        header = request.META.get('HTTP_IF_NONE_MATCH')
+        if not header:
+            return False
+        for candidate in parse_etags(header):
+            if candidate == '*':
+                return True
+            candidate = candidate.replace('W/', '', 1).strip('"')
+            if candidate.split('-')[0] == etag:
+                return True
+        return False
+
+
+catalog_cache = TieredCache(
+    'catalog',
+    shared_alias=settings.CATALOG_CACHE['CACHE'],
+    max_size=2,
+    ttl=settings.CATALOG_CACHE['TTL'],
+    stale_ttl=settings.CATALOG_CACHE['STALE_TTL'],
+    local_ttl=settings.CATALOG_CACHE['LOCAL_TTL'],
+)
+tags_catalog = CatalogSnapshot(
+    'tags', lambda: TagSerializer(Tag.objects.all(), many=True).data,
+    catalog_cache)
+ingredients_catalog = CatalogSnapshot(
+    'ingredients',
+    lambda: IngredientSerializer(Ingredient.objects.all(), many=True).data,
+    catalog_cache)
+CATALOGS = (tags_catalog, ingredients_catalog)
@@ -0,0 +1,83 @@
+"""Счётчики рецептов по тегам для ?facets=tags.
+
+Считаются одним GROUP BY по связи рецепт-тег для выборки RecipeFilter без
+фильтра tags: иначе у невыбранных тегов всегда был бы ноль. Кешируются
+только выборки без фильтров или с одним author — под номером версии,
+который меняется при любой записи рецепта, его тегов или тега. Любой
+другой параметр RecipeFilter (личные флаги, ordering, have) меняет выборку
+так, что версия этого не отражает, и счётчики для него считаются заново.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count
+from rest_framework.exceptions import ValidationError
+
+from foodgram.metrics import record_cache
+from recipes.models import Recipe
+from .filters import RecipeFilter
+
+FACETS = ('tags',)
+FACET_FILTERS = tuple(name for name in RecipeFilter.base_filters
+                      if name != 'tags')
+SHARED_FILTERS = {'author'}
+VERSION_KEY = 'recipe-facets:version'
+
+
+def requested_facets(request):
+    names = [
+        name for name in request.query_params.get('facets', '').split(',')
+        if name
+    ]
+    unknown = set(names) - set(FACETS)
+    if unknown:
+        raise ValidationError(
+            {'facets': f'Неизвестные фасеты: {", ".join(sorted(unknown))}'})
+    return names
+
+
+def tag_counts(queryset):
+    """{slug: число рецептов} одним запросом с группировкой."""
+    return dict(
+        Recipe.tags.through.objects.filter(
+            recipe_id__in=queryset.order_by().values('pk'),
+        ).values('tag__slug').annotate(
+            count=Count('recipe_id'),
+        ).order_by('tag__slug').values_list('tag__slug', 'count')
+    )
+
+
+def get_cache():
+    return caches[settings.RECIPE_FACETS['CACHE']]
+
+
+def current_version(cache):
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        return cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    get_cache().set(VERSION_KEY, time.time_ns(), None)
+
+
+def cached_tag_counts(params, build_queryset):
+    """tag_counts с кешем для выборок, общих для всех пользователей."""
+    used = {
+        name: params.getlist(name) for name in FACET_FILTERS if name in params
+    }
+    authors = used.get('author', [''])
+    if not set(used) <= SHARED_FILTERS or len(authors) > 1 or (
+            authors[0] and not authors[0].isdigit()):
+        return tag_counts(build_queryset())
+    cache = get_cache()
+    key = f'recipe-facets:{current_version(cache)}:{authors[0]}'
+    counts = cache.get(key)
+    record_cache('facets', hit=counts is not None)
+    if counts is None:
+        counts = tag_counts(build_queryset())
+        cache.set(key, counts, settings.RECIPE_FACETS['TIMEOUT'])
+    return counts
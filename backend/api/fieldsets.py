@@ -0,0 +1,38 @@
+from rest_framework.exceptions import ValidationError
+
+
+def _split(request, param):
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def get_fieldset(request, fields, relations):
+    """Разбирает ?fields= и ?expand= в (поля по порядку схемы, связи).
+
+    Без обоих параметров возвращаются все поля с раскрытыми связями. Если
+    указан хотя бы один, связи, не перечисленные в expand, отдаются
+    идентификаторами; поля из expand добавляются к fields.
+    """
+    if request is None:
+        return tuple(fields), frozenset(relations)
+    selected = _split(request, 'fields')
+    expand = _split(request, 'expand')
+    if selected is None and expand is None:
+        return tuple(fields), frozenset(relations)
+    expand = expand or set()
+    selected = set(fields) if selected is None else selected | expand
+    errors = {}
+    if selected - set(fields):
+        errors['fields'] = (
+            f'Неизвестные поля: {", ".join(sorted(selected - set(fields)))}')
+    if expand - set(relations):
+        errors['expand'] = (
+            f'Раскрыть можно только: {", ".join(relations)}')
+    if errors:
+        raise ValidationError(errors)
+    return (
+        tuple(name for name in fields if name in selected),
+        frozenset(expand),
+    )
@@ -1,7 +1,13 @@
+from django import forms
 from django_filters.rest_framework import FilterSet, filters
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.models import Recipe
+from . import memberships
+
+
+class IntegerInFilter(filters.BaseInFilter, filters.NumberFilter):
+    field_class = forms.IntegerField
 
 
 class RecipeFilter(FilterSet):
@@ -10,6 +16,9 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    have = IntegerInFilter(method='filter_have')
+    ordering = filters.ChoiceFilter(
+        choices=(('trending', 'Популярные'),), method='filter_ordering')
 
     class Meta:
         model = Recipe
@@ -17,23 +26,34 @@ class RecipeFilter(FilterSet):
             'tags',
             'author',
             'is_favorited',
-            'is_in_shopping_cart'
+            'is_in_shopping_cart',
+            'have',
+            'ordering',
         )
 
     def filter_is_favorited(self, queryset, name, value):
-        reс_pk = Favorite.objects.filter(
-            recipe_lover=self.request.user).values('recipe_id')
         if value:
-            return queryset.filter(pk__in=reс_pk)
+            return memberships.filter_recipes(
+                queryset, self.request, memberships.FAVORITES)
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
-        reс_pk = ShoppingCart.objects.filter(
-            cart_owner=self.request.user).values('recipe_id')
         if value:
-            return queryset.filter(pk__in=reс_pk)
+            return memberships.filter_recipes(
+                queryset, self.request, memberships.SHOPPING_CART)
         return queryset
 
+    def filter_have(self, queryset, name, value):
+        """Отбор и порядок по ?have= делает RecipeViewSet по индексу
+        ингредиентов, здесь только проверяется формат."""
+        return queryset
+
+    def filter_ordering(self, queryset, name, value):
+        """Порядок по свёрнутым оценкам RecipePopularity, одна сортировка
+        по индексу; рецепты появляются после запуска update_trending."""
+        return queryset.filter(popularity__isnull=False).order_by(
+            '-popularity__score', '-popularity__recipe_id')
+
 
 class IngredientSearchFilter(SearchFilter):
     search_param = 'name'
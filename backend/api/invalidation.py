@@ -0,0 +1,102 @@
+"""Сброс кешей процессов во всех воркерах через таблицу событий.
+
+Сигналы записи добавляют строку CacheInvalidation(topic, key) в той же
+транзакции, что и сами данные. Каждый воркер не чаще раза в
+INVALIDATION['POLL_INTERVAL'] секунд, перед обработкой запроса, читает
+события по индексу created с перекрытием OVERLAP секунд, чтобы не
+потерять строки, закоммиченные позже соседних, и передаёт ключи
+подписчикам темы. Воркер, не опрашивавший таблицу дольше RETENTION,
+сбрасывает подписчиков целиком (ключи None): события за это время уже
+удалены.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.utils import timezone
+
+from recipes.models import CacheInvalidation
+
+
+class InvalidationChannel:
+    def __init__(self):
+        self.lock = Lock()
+        self.subscribers = defaultdict(list)
+        self.synced_at = None
+        self.seen = {}
+        self.next_poll = 0
+        self.next_prune = 0
+
+    def subscriber(self, topic):
+        """Декоратор: callback(keys) вызывается с множеством ключей темы
+        или с None, если сбросить нужно всё."""
+        def register(callback):
+            self.subscribers[topic].append(callback)
+            return callback
+        return register
+
+    def publish(self, topic, *keys):
+        CacheInvalidation.objects.bulk_create([
+            CacheInvalidation(topic=topic, key=str(key)) for key in keys
+        ])
+
+    def poll(self, force=False):
+        if not force and monotonic() < self.next_poll:
+            return
+        if not self.lock.acquire(blocking=False):
+            return
+        try:
+            self.next_poll = (
+                monotonic() + settings.INVALIDATION['POLL_INTERVAL'])
+            self._poll()
+        finally:
+            self.lock.release()
+
+    def _notify(self, topic, keys):
+        for callback in self.subscribers[topic]:
+            callback(keys)
+
+    def _poll(self):
+        now = timezone.now()
+        retention = timedelta(seconds=settings.INVALIDATION['RETENTION'])
+        if self.synced_at is not None and now - self.synced_at > retention:
+            for topic in self.subscribers:
+                self._notify(topic, None)
+            self.synced_at, self.seen = None, {}
+        if self.synced_at is None:
+            self.synced_at = now
+            return
+        since = self.synced_at - timedelta(
+            seconds=settings.INVALIDATION['OVERLAP'])
+        keys = defaultdict(set)
+        for pk, topic, key, created in CacheInvalidation.objects.filter(
+                created__gte=since).values_list(
+                    'id', 'topic', 'key', 'created'):
+            if pk not in self.seen:
+                self.seen[pk] = created
+                keys[topic].add(key)
+        for topic, changed in keys.items():
+            self._notify(topic, changed)
+        self.seen = {
+            pk: created for pk, created in self.seen.items()
+            if created >= since
+        }
+        self.synced_at = now
+        if monotonic() >= self.next_prune:
+            self.next_prune = monotonic() + retention.total_seconds() / 10
+            CacheInvalidation.objects.filter(
+                created__lt=now - retention).delete()
+
+
+channel = InvalidationChannel()
+
+
+class InvalidationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        channel.poll()
+        return self.get_response(request)
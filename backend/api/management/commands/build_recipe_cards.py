@@ -0,0 +1,34 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from api.cards import store_cards
+from api.representations import build_cards
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает карточки всех рецептов пачками. Без неё рецепты без '
+        'карточки собираются при каждом чтении, но не сохраняются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--stale', action='store_true',
+            help='только отсутствующие и устаревшие карточки')
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        recipes = Recipe.objects.order_by('pk')
+        if options['stale']:
+            recipes = recipes.filter(
+                Q(card__isnull=True) | ~Q(card__modified=F('modified')))
+        ids = list(recipes.values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        for offset in range(0, len(ids), batch_size):
+            store_cards(build_cards(ids[offset:offset + batch_size]))
+        self.stdout.write(
+            f'{len(ids)} карточек за {perf_counter() - start:.1f} с')
@@ -0,0 +1,25 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from api.similarity import similarity_index
+
+
+class Command(BaseCommand):
+    help = 'Собирает индекс похожих рецептов и сохраняет его на диск.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--if-missing', action='store_true',
+            help='ничего не делать, если файл индекса уже есть')
+
+    def handle(self, *args, **options):
+        if options['if_missing'] and similarity_index.path.exists():
+            self.stdout.write(f'индекс уже есть: {similarity_index.path}')
+            return
+        start = perf_counter()
+        index = similarity_index.rebuild()
+        self.stdout.write(
+            f'{len(index.recipe_ids)} рецептов, {len(index.codes)} признаков, '
+            f'{index.matrix.nnz} ненулевых весов за '
+            f'{perf_counter() - start:.1f} с: {similarity_index.path}')
@@ -0,0 +1,55 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.cards import schedule_refresh
+from api.catalog import ingredients_catalog
+from recipes.importers import IngredientImport, read_ingredients
+from recipes.models import IngredientInRecipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает ингредиенты из CSV пачками. Строки совпадают по '
+        '(name, measurement_unit); столбец id, если есть, позволяет '
+        'переименовать существующий ингредиент.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='CSV-файл, например data/ingredients.csv')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='только вывести дифф, ничего не записывая')
+        parser.add_argument(
+            '--quiet', action='store_true', help='не выводить дифф по строкам')
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        importer = IngredientImport(
+            options['batch_size'], dry_run=options['dry_run'])
+        with open(options['path'], encoding='utf-8', newline='') as source:
+            with transaction.atomic():
+                for action, pk, old, new in importer.run(
+                        read_ingredients(source)):
+                    if not options['quiet']:
+                        self.stdout.write(self.format(action, pk, old, new))
+                if not options['dry_run']:
+                    schedule_refresh(IngredientInRecipe.objects.filter(
+                        ingredient_id__in=importer.renamed,
+                    ).values_list('recipe_id', flat=True).distinct())
+                    transaction.on_commit(ingredients_catalog.invalidate)
+        stats = importer.stats
+        self.stdout.write(
+            f'{"проверка: " if options["dry_run"] else ""}'
+            f'добавлено {stats["created"]}, изменено {stats["updated"]}, '
+            f'без изменений {stats["unchanged"]} '
+            f'за {perf_counter() - start:.2f} с')
+
+    @staticmethod
+    def format(action, pk, old, new):
+        if action == 'create':
+            return f'+ {new[0]} ({new[1]})'
+        return f'~ {pk}: {old[0]} ({old[1]}) -> {new[0]} ({new[1]})'
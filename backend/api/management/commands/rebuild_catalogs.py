@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.catalog import CATALOGS
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает снимки справочников тегов и ингредиентов.'
+
+    def handle(self, *args, **options):
+        for catalog in CATALOGS:
+            snapshot = catalog.rebuild()
+            sizes = ', '.join(
+                f'{encoding}={len(content)}'
+                for encoding, content in snapshot.variants.items())
+            self.stdout.write(f'{catalog.name}: {snapshot.etag} ({sizes})')
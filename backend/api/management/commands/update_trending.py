@@ -0,0 +1,22 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from api.trending import update_trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Сворачивает новые события избранного и списка покупок в оценки '
+        'популярности рецептов. Запускается периодически, например из cron.'
+    )
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        stats = update_trending()
+        self.stdout.write(
+            f'событий: {stats["events"]} за {stats["windows"]} окон, '
+            f'новых рецептов: {stats["added"]}, '
+            f'удалено событий: {stats["pruned"]}, '
+            f'сдвиг epoch: {"да" if stats["rebased"] else "нет"}, '
+            f'{perf_counter() - start:.2f} с')
@@ -0,0 +1,112 @@
+"""Кеш рецептов в избранном и списке покупок пользователя.
+
+Для каждого пользователя и списка в кеше лежит отсортированный массив
+идентификаторов int64 (bytes) под ключом с номером версии. Изменение через
+эндпоинты после коммита задаёт новую версию и сразу кладёт под неё свежий
+массив; удаление и добавление строк через ORM, в том числе каскадное, только
+меняют версию. Читатель, успевший взять старую версию, пишет под старым
+ключом и никому не мешает. В пределах запроса массивы запоминаются на
+объекте request, так что флаги страницы и фильтры читают кеш один раз.
+"""
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+
+from foodgram.metrics import record_cache
+from recipes.models import Favorite, ShoppingCart
+
+FAVORITES, SHOPPING_CART = 'favorites', 'shopping_cart'
+LISTS = {
+    FAVORITES: (Favorite, 'recipe_lover_id'),
+    SHOPPING_CART: (ShoppingCart, 'cart_owner_id'),
+}
+KIND_OF = {model: kind for kind, (model, _) in LISTS.items()}
+EMPTY = np.empty(0, dtype=np.int64)
+
+
+def get_cache():
+    return caches[settings.RECIPE_MEMBERSHIPS['CACHE']]
+
+
+def _version_key(kind, user_id):
+    return f'recipe-memberships:{kind}:{user_id}'
+
+
+def owner_id(instance):
+    return getattr(instance, LISTS[KIND_OF[type(instance)]][1])
+
+
+def load(kind, user_id):
+    model, owner_field = LISTS[kind]
+    return np.fromiter(
+        model.objects.filter(**{owner_field: user_id}).order_by(
+            'recipe_id').values_list('recipe_id', flat=True).iterator(),
+        dtype=np.int64)
+
+
+def recipe_ids(kind, user_id):
+    """Отсортированный массив рецептов из списка пользователя."""
+    cache = get_cache()
+    version_key = _version_key(kind, user_id)
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, time.time_ns(), None)
+        version = cache.get(version_key)
+    key = f'{version_key}:{version}'
+    stored = cache.get(key)
+    record_cache('memberships', hit=stored is not None)
+    if stored is not None:
+        return np.frombuffer(stored, dtype=np.int64)
+    ids = load(kind, user_id)
+    cache.set(key, ids.tobytes(), settings.RECIPE_MEMBERSHIPS['TIMEOUT'])
+    return ids
+
+
+def invalidate(kind, user_id):
+    get_cache().set(_version_key(kind, user_id), time.time_ns(), None)
+
+
+def refresh(kind, user_id):
+    """Новая версия с уже загруженным массивом; вызывается после коммита."""
+    cache = get_cache()
+    version = time.time_ns()
+    version_key = _version_key(kind, user_id)
+    cache.set(version_key, version, None)
+    cache.set(
+        f'{version_key}:{version}', load(kind, user_id).tobytes(),
+        settings.RECIPE_MEMBERSHIPS['TIMEOUT'])
+
+
+def for_request(request, kind):
+    """recipe_ids текущего пользователя, один раз за запрос; у анонима
+    список пуст."""
+    if request.user.is_anonymous:
+        return EMPTY
+    memo = getattr(request, '_recipe_memberships', None)
+    if memo is None:
+        memo = request._recipe_memberships = {}
+    if kind not in memo:
+        memo[kind] = recipe_ids(kind, request.user.pk)
+    return memo[kind]
+
+
+def owned(request, kind, ids):
+    """Множество тех из ids, что есть в списке пользователя."""
+    ids = np.fromiter(ids, dtype=np.int64)
+    return set(ids[np.isin(
+        ids, for_request(request, kind), assume_unique=True)].tolist())
+
+
+def filter_recipes(queryset, request, kind):
+    """Рецепты из списка пользователя: по массиву из кеша, а если он
+    длиннее FILTER_MAX_IDS — подзапросом к таблице списка."""
+    ids = for_request(request, kind)
+    if not len(ids):
+        return queryset.none()
+    if len(ids) > settings.RECIPE_MEMBERSHIPS['FILTER_MAX_IDS']:
+        model, owner_field = LISTS[kind]
+        return queryset.filter(pk__in=model.objects.filter(
+            **{owner_field: request.user.pk}).values('recipe_id'))
+    return queryset.filter(pk__in=ids.tolist())
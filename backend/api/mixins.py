@@ -1,7 +1,89 @@
+from django.utils.functional import cached_property
 from rest_framework import mixins, viewsets
+from rest_framework.renderers import JSONRenderer
+
+from foodgram.performance import span
+from .fieldsets import get_fieldset
+from .throttles import ServerBusy, get_semaphore, get_view_scope
 
 
 class CreateDestroyViewSet(mixins.CreateModelMixin,
                            mixins.DestroyModelMixin,
                            viewsets.GenericViewSet):
     pass
+
+
+class TimedRepresentationMixin:
+    def to_representation(self, instance):
+        with span('serializer'):
+            return super().to_representation(instance)
+
+
+class SparseFieldsetMixin:
+    """Отдаёт только поля из ?fields= и ?expand= запроса.
+
+    collapsed_fields сопоставляет связи поле, которым они выводятся без
+    раскрытия.
+    """
+
+    collapsed_fields = {}
+
+    @cached_property
+    def fieldset(self):
+        return get_fieldset(
+            self.context.get('request'), tuple(self.fields),
+            tuple(self.collapsed_fields))
+
+    @cached_property
+    def _collapsed(self):
+        collapsed = {}
+        for name, factory in self.collapsed_fields.items():
+            collapsed[name] = factory()
+            collapsed[name].bind(name, self)
+        return collapsed
+
+    @property
+    def _readable_fields(self):
+        names, expand = self.fieldset
+        for field in super()._readable_fields:
+            if field.field_name not in names:
+                continue
+            if field.field_name in self._collapsed and (
+                    field.field_name not in expand):
+                yield self._collapsed[field.field_name]
+            else:
+                yield field
+
+
+class CatalogSnapshotMixin:
+    """Отдаёт список без параметров из готового снимка справочника."""
+
+    catalog = None
+
+    def list(self, request, *args, **kwargs):
+        if (request.query_params
+                or request.accepted_media_type != JSONRenderer.media_type):
+            return super().list(request, *args, **kwargs)
+        return self.catalog.response(request)
+
+
+class ConcurrencyLimitMixin:
+    """Ограничивает число одновременных тяжёлых запросов в процессе."""
+
+    retry_after = 1
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        semaphore = get_semaphore(get_view_scope(self, request))
+        if semaphore is None:
+            return
+        if not semaphore.acquire(blocking=False):
+            raise ServerBusy(wait=self.retry_after)
+        request.concurrency_semaphore = semaphore
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        semaphore = getattr(request, 'concurrency_semaphore', None)
+        if semaphore is not None:
+            request.concurrency_semaphore = None
+            semaphore.release()
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,26 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson с тем же компактным выводом.
+
+    Даты, Decimal и ленивые строки по-прежнему проходят через encoder DRF,
+    поэтому результат совпадает с JSONRenderer байт в байт.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if indent or self.ensure_ascii or not self.compact:
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        content = orjson.dumps(
+            data, default=self.encoder_class().default, option=OPTIONS)
+        return content.replace(
+            '\u2028'.encode(), b'\\u2028').replace(
+                '\u2029'.encode(), b'\\u2029')
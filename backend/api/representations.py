@@ -0,0 +1,313 @@
+"""Быстрая сборка ответов на чтение без полей сериализаторов DRF.
+
+Словари строятся из строк .values() и повторяют вывод RecipeSerializer и
+SubscribeSerializer байт в байт, включая порядок ключей. Запросы за связями
+выполняются только для полей, попавших в ?fields= и ?expand=.
+"""
+from collections import defaultdict
+from operator import itemgetter
+
+from django.db.models import Count, OuterRef, Subquery
+
+from recipes.models import IngredientInRecipe, Recipe
+from users.models import Subscribe
+from . import memberships
+
+RECIPE_SCHEMA = (
+    'id', 'tags', 'author', 'ingredients', 'is_favorited',
+    'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time',
+)
+RECIPE_RELATIONS = ('tags', 'author', 'ingredients')
+CARD_FIELDS = (
+    'id', 'tags', 'author', 'ingredients', 'name', 'image', 'text',
+    'cooking_time',
+)
+AUTHOR_COLUMNS = (
+    'author__username', 'author__email', 'author__first_name',
+    'author__last_name',
+)
+SUBSCRIPTION_SCHEMA = (
+    'email', 'id', 'username', 'first_name', 'last_name', 'is_subscrubed',
+    'recipes', 'recipes_count',
+)
+SUBSCRIPTION_RELATIONS = ('recipes',)
+SUBSCRIPTION_COLUMNS = {
+    'email': 'author__email',
+    'id': 'author_id',
+    'username': 'author__username',
+    'first_name': 'author__first_name',
+    'last_name': 'author__last_name',
+}
+
+image_storage = Recipe._meta.get_field('image').storage
+
+
+def image_url(name, request=None):
+    """То же, что ImageField.to_representation с use_url=True."""
+    if not name:
+        return None
+    url = image_storage.url(name)
+    if request is None:
+        return url
+    return request.build_absolute_uri(url)
+
+
+def short_recipe(row, request=None):
+    """Рецепт в формате RecipeToRepresentationSerializer."""
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'image': image_url(row['image'], request),
+        'cooking_time': row['cooking_time'],
+    }
+
+
+def favorite_recipe(row, request=None):
+    """Рецепт в формате FavoriteRecipeSerializer: image — имя файла."""
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'image': row['image'] or '',
+        'cooking_time': row['cooking_time'],
+    }
+
+
+def _group(rows):
+    groups = defaultdict(list)
+    for key, *item in rows:
+        groups[key].append(item[0] if len(item) == 1 else item)
+    return groups
+
+
+def _owned_ids(model, owner_field, item_field, user, ids):
+    if user.is_anonymous or not ids:
+        return set()
+    return set(model.objects.filter(
+        **{owner_field: user, f'{item_field}__in': ids}
+    ).values_list(item_field, flat=True))
+
+
+def recipe_columns(fields, expand):
+    """Колонки для .values(), нужные выбранным полям рецепта."""
+    columns = ['id']
+    columns += [
+        name for name in ('name', 'image', 'text', 'cooking_time')
+        if name in fields
+    ]
+    if 'author' in fields:
+        columns.append('author_id')
+        if 'author' in expand:
+            columns += AUTHOR_COLUMNS
+    return columns
+
+
+def _tags_getter(ids, expanded):
+    through = Recipe.tags.through.objects.filter(
+        recipe_id__in=ids).order_by('tag_id')
+    if not expanded:
+        tags = _group(through.values_list('recipe_id', 'tag_id'))
+        return lambda row: tags[row['id']]
+    tags = _group(through.values_list(
+        'recipe_id', 'tag_id', 'tag__name', 'tag__color', 'tag__slug'))
+    return lambda row: [
+        {'id': pk, 'name': name, 'color': color, 'slug': slug}
+        for pk, name, color, slug in tags[row['id']]
+    ]
+
+
+def _ingredients_getter(ids, expanded):
+    lines = IngredientInRecipe.objects.filter(
+        recipe_id__in=ids).order_by('id')
+    if not expanded:
+        ingredients = _group(lines.values_list('recipe_id', 'ingredient_id'))
+        return lambda row: ingredients[row['id']]
+    ingredients = _group(lines.values_list(
+        'recipe_id', 'ingredient_id', 'ingredient__name',
+        'ingredient__measurement_unit', 'amount'))
+    return lambda row: [
+        {'id': pk, 'name': name, 'measurement_unit': unit, 'amount': amount}
+        for pk, name, unit, amount in ingredients[row['id']]
+    ]
+
+
+def _author(row):
+    return {
+        'username': row['author__username'],
+        'id': row['author_id'],
+        'email': row['author__email'],
+        'first_name': row['author__first_name'],
+        'last_name': row['author__last_name'],
+    }
+
+
+def _author_getter(rows, user, expanded):
+    if not expanded:
+        return itemgetter('author_id')
+    subscribed = _owned_ids(
+        Subscribe, 'user', 'author_id', user,
+        {row['author_id'] for row in rows})
+    return lambda row: {
+        **_author(row), 'is_subscribed': row['author_id'] in subscribed}
+
+
+def _flag_getters(ids, request, fields):
+    getters = {}
+    if 'is_favorited' in fields:
+        favorited = memberships.owned(request, memberships.FAVORITES, ids)
+        getters['is_favorited'] = lambda row: row['id'] in favorited
+    if 'is_in_shopping_cart' in fields:
+        in_cart = memberships.owned(
+            request, memberships.SHOPPING_CART, ids)
+        getters['is_in_shopping_cart'] = lambda row: row['id'] in in_cart
+    return getters
+
+
+def _recipe_getters(rows, request, fields, expand):
+    ids = [row['id'] for row in rows]
+    user = request.user
+    getters = {
+        name: itemgetter(name)
+        for name in ('id', 'name', 'text', 'cooking_time')
+    }
+    getters['image'] = lambda row: image_url(row['image'], request)
+    if 'tags' in fields:
+        getters['tags'] = _tags_getter(ids, 'tags' in expand)
+    if 'ingredients' in fields:
+        getters['ingredients'] = _ingredients_getter(
+            ids, 'ingredients' in expand)
+    if 'author' in fields:
+        getters['author'] = _author_getter(rows, user, 'author' in expand)
+    getters.update(_flag_getters(ids, request, fields))
+    return getters
+
+
+def build_recipes(rows, request, fields=RECIPE_SCHEMA,
+                  expand=RECIPE_RELATIONS):
+    """Список рецептов в формате RecipeSerializer."""
+    rows = list(rows)
+    if not rows:
+        return []
+    getters = _recipe_getters(rows, request, fields, expand)
+    return [{name: getters[name](row) for name in fields} for row in rows]
+
+
+def build_cards(ids):
+    """{recipe_id: (modified, карточка)}: поля RecipeSerializer, не
+    зависящие от пользователя, с раскрытыми связями; image — путь в
+    хранилище, автор — без is_subscribed."""
+    rows = Recipe.objects.filter(pk__in=ids).values(
+        'modified', *recipe_columns(CARD_FIELDS, RECIPE_RELATIONS))
+    tags = _tags_getter(ids, True)
+    ingredients = _ingredients_getter(ids, True)
+    return {
+        row['id']: (row['modified'], {
+            'id': row['id'],
+            'tags': tags(row),
+            'author': _author(row),
+            'ingredients': ingredients(row),
+            'name': row['name'],
+            'image': row['image'],
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        })
+        for row in rows
+    }
+
+
+def _related_ids(name):
+    return lambda card: [item['id'] for item in card[name]]
+
+
+def _card_getters(cards, request, fields, expand):
+    user = request.user
+    getters = {
+        name: itemgetter(name)
+        for name in ('id', 'name', 'text', 'cooking_time')
+    }
+    getters['image'] = lambda card: image_url(card['image'], request)
+    for name in ('tags', 'ingredients'):
+        getters[name] = (
+            itemgetter(name) if name in expand else _related_ids(name))
+    if 'author' in fields and 'author' in expand:
+        subscribed = _owned_ids(
+            Subscribe, 'user', 'author_id', user,
+            {card['author']['id'] for card in cards})
+        getters['author'] = lambda card: {
+            **card['author'],
+            'is_subscribed': card['author']['id'] in subscribed,
+        }
+    else:
+        getters['author'] = lambda card: card['author']['id']
+    getters.update(_flag_getters(
+        [card['id'] for card in cards], request, fields))
+    return getters
+
+
+def build_recipes_from_cards(cards, request, fields=RECIPE_SCHEMA,
+                             expand=RECIPE_RELATIONS):
+    """То же, что build_recipes, но из готовых карточек: к ним
+    добавляются только флаги текущего пользователя."""
+    if not cards:
+        return []
+    getters = _card_getters(cards, request, fields, expand)
+    return [{name: getters[name](card) for name in fields} for card in cards]
+
+
+def subscription_columns(fields):
+    return ['author_id'] + [
+        SUBSCRIPTION_COLUMNS[name] for name in fields
+        if name in SUBSCRIPTION_COLUMNS and name != 'id'
+    ]
+
+
+def _recipe_counts(author_ids):
+    return dict(Recipe.objects.filter(
+        author_id__in=author_ids).values('author_id').annotate(
+            count=Count('id')).order_by().values_list('author_id', 'count'))
+
+
+def _subscription_recipes(author_ids, fields, expand, limit):
+    """Рецепты авторов, не больше limit новых на автора, и их число.
+
+    Ограничение применяется в SQL подзапросом на каждого автора, а число
+    рецептов считается отдельным GROUP BY, так что страница плодовитых
+    авторов не загружает все их рецепты.
+    """
+    counts = _recipe_counts(author_ids) if 'recipes_count' in fields else {}
+    if 'recipes' not in fields:
+        return {}, counts
+    queryset = Recipe.objects.filter(author_id__in=author_ids)
+    if limit is not None and limit >= 0:
+        queryset = queryset.filter(pk__in=Subquery(Recipe.objects.filter(
+            author_id=OuterRef('author_id')).order_by(
+                '-pub_date').values('pk')[:limit]))
+    if 'recipes' in expand:
+        recipes = _group(
+            (row['author_id'], short_recipe(row))
+            for row in queryset.values(
+                'author_id', 'id', 'name', 'image', 'cooking_time'))
+    else:
+        recipes = _group(queryset.values_list('author_id', 'id'))
+    return recipes, counts
+
+
+def build_subscriptions(rows, request, fields=SUBSCRIPTION_SCHEMA,
+                        expand=SUBSCRIPTION_RELATIONS):
+    """Подписки в формате SubscribeSerializer."""
+    rows = list(rows)
+    if not rows:
+        return []
+    recipes_limit = request.query_params.get('recipes_limit')
+    limit = int(recipes_limit) if recipes_limit else None
+    recipes, counts = _subscription_recipes(
+        [row['author_id'] for row in rows], fields, expand, limit)
+    getters = {
+        name: itemgetter(column)
+        for name, column in SUBSCRIPTION_COLUMNS.items()
+    }
+    getters.update({
+        'is_subscrubed': lambda row: True,
+        'recipes': lambda row: recipes[row['author_id']][:limit],
+        'recipes_count': lambda row: counts.get(row['author_id'], 0),
+    })
+    return [{name: getters[name](row) for name in fields} for row in rows]
@@ -1,14 +1,19 @@
+from django.conf import settings
+from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
 from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
                             ShoppingCart, Tag)
 from users.models import Subscribe, User
+from . import memberships
+from .mixins import SparseFieldsetMixin, TimedRepresentationMixin
 from .validators import (validate_cooking_time, validate_ingredients,
                          validate_tags)
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedRepresentationMixin,
+                    serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = (
@@ -19,7 +24,8 @@ class TagSerializer(serializers.ModelSerializer):
         )
 
 
-class FavoriteRecipeSerializer(serializers.ModelSerializer):
+class FavoriteRecipeSerializer(TimedRepresentationMixin,
+                               serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source='recipe.id')
     name = serializers.ReadOnlyField(source='recipe.name')
     image = serializers.CharField(source='recipe.image', read_only=True)
@@ -49,7 +55,8 @@ class FavoriteRecipeSerializer(serializers.ModelSerializer):
         return data
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedRepresentationMixin,
+                           serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = (
@@ -59,7 +66,8 @@ class IngredientSerializer(serializers.ModelSerializer):
         )
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedRepresentationMixin,
+                     serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -80,7 +88,8 @@ class UserSerializer(serializers.ModelSerializer):
         return user.follower.filter(author=obj).exists()
 
 
-class SubscribeSerializer(serializers.ModelSerializer):
+class SubscribeSerializer(SparseFieldsetMixin, TimedRepresentationMixin,
+                          serializers.ModelSerializer):
     email = serializers.ReadOnlyField(source='author.email')
     id = serializers.ReadOnlyField(source='author.id')
     username = serializers.ReadOnlyField(source='author.username')
@@ -103,19 +112,32 @@ class SubscribeSerializer(serializers.ModelSerializer):
         """метод для просмотра текущих подписок всегда тру"""
         return True
 
-    def get_recipes(self, obj):
+    collapsed_fields = {
+        'recipes': lambda: serializers.SerializerMethodField(
+            method_name='get_recipe_ids'),
+    }
+
+    def get_limited_recipes(self, obj):
         request = self.context.get('request')
         recipes = obj.author.recipe.all()
         recipes_limit = request.query_params.get('recipes_limit')
         if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
-        return RecipeToRepresentationSerializer(recipes, many=True).data
+            return recipes[:int(recipes_limit)]
+        return recipes
+
+    def get_recipes(self, obj):
+        return RecipeToRepresentationSerializer(
+            self.get_limited_recipes(obj), many=True).data
+
+    def get_recipe_ids(self, obj):
+        return [recipe.pk for recipe in self.get_limited_recipes(obj)]
 
     def get_recipes_count(self, obj):
         return obj.author.recipe.count()
 
 
-class IngredientInRecipeSerializer(serializers.ModelSerializer):
+class IngredientInRecipeSerializer(TimedRepresentationMixin,
+                                   serializers.ModelSerializer):
     id = serializers.ReadOnlyField(
         source='ingredient.id',
     )
@@ -136,7 +158,8 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
         )
 
 
-class RecipeToRepresentationSerializer(serializers.ModelSerializer):
+class RecipeToRepresentationSerializer(TimedRepresentationMixin,
+                                       serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = (
@@ -147,7 +170,8 @@ class RecipeToRepresentationSerializer(serializers.ModelSerializer):
         )
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SparseFieldsetMixin, TimedRepresentationMixin,
+                       serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     tags = TagSerializer(read_only=True, many=True)
     ingredients = IngredientInRecipeSerializer(many=True)
@@ -155,6 +179,14 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
     image = Base64ImageField(use_url=True, max_length=None)
 
+    collapsed_fields = {
+        'tags': lambda: serializers.PrimaryKeyRelatedField(
+            many=True, read_only=True),
+        'author': lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+        'ingredients': lambda: serializers.SlugRelatedField(
+            slug_field='ingredient_id', many=True, read_only=True),
+    }
+
     class Meta:
         model = Recipe
         fields = (
@@ -167,15 +199,15 @@ class RecipeSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
-        return Favorite.objects.filter(
-            recipe=obj, recipe_lover=request.user).exists()
+        return bool(memberships.owned(
+            request, memberships.FAVORITES, [obj.pk]))
 
     def get_is_in_shopping_cart(self, obj):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
-        return ShoppingCart.objects.filter(
-            recipe=obj, cart_owner=request.user).exists()
+        return bool(memberships.owned(
+            request, memberships.SHOPPING_CART, [obj.pk]))
 
     def validate(self, data):
         tags = self.initial_data.get('tags')
@@ -198,16 +230,18 @@ class RecipeSerializer(serializers.ModelSerializer):
         })
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients')
         new_recipe = Recipe.objects.create(**validated_data)
-        new_recipe.save()
         if tags:
             new_recipe.tags.set([*tags])
         self.create_ingredients(ingredients, new_recipe)
+        new_recipe.save(update_fields=('modified',))
         return new_recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients')
@@ -229,7 +263,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         IngredientInRecipe.objects.bulk_create(bulk_create_data)
 
 
-class ShoppingCartSerializer(serializers.ModelSerializer):
+class ShoppingCartSerializer(TimedRepresentationMixin,
+                             serializers.ModelSerializer):
     class Meta:
         model = ShoppingCart
         fields = ('cart_owner', 'recipe')
@@ -252,3 +287,62 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
             instance.recipe,
             context={'request': request}
         ).data
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = serializers.ListField(
+        child=serializers.CharField(), allow_empty=False)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        limit = settings.BATCH['MAX_REQUESTS']
+        if len(value) > limit:
+            raise serializers.ValidationError(
+                f'Не больше {limit} подзапросов в пачке')
+        for url in value:
+            if not url.startswith('/api/'):
+                raise serializers.ValidationError(
+                    f'Подзапрос должен начинаться с /api/: {url}')
+        return value
+
+
+class BulkIngredientSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    amount = serializers.IntegerField(min_value=1, max_value=32767)
+
+
+class BulkRecipeSerializer(serializers.Serializer):
+    """Рецепт из пачки: формат проверяется без запросов к базе, ссылки на
+    теги и ингредиенты — сразу для всей пачки в api.bulk."""
+
+    name = serializers.CharField(max_length=200)
+    text = serializers.CharField()
+    cooking_time = serializers.IntegerField(min_value=1, max_value=32767)
+    image = Base64ImageField(max_length=None)
+    tags = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False)
+    ingredients = BulkIngredientSerializer(many=True, allow_empty=False)
+
+    def validate_tags(self, value):
+        duplicates = sorted({pk for pk in value if value.count(pk) > 1})
+        if duplicates:
+            raise serializers.ValidationError(
+                [f'{pk} - дублирующийся тег' for pk in duplicates])
+        return value
+
+    def validate_ingredients(self, value):
+        ids = [ingredient['id'] for ingredient in value]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError('Дублирующийся ингредиент')
+        return value
+
+
+class BulkRecipesSerializer(serializers.Serializer):
+    recipes = serializers.ListField(allow_empty=False)
+
+    def validate_recipes(self, value):
+        limit = settings.BULK_RECIPES['MAX_ITEMS']
+        if len(value) > limit:
+            raise serializers.ValidationError(
+                f'Не больше {limit} рецептов за запрос')
+        return value
@@ -0,0 +1,198 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from import_export.signals import post_import
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            RecipeActivity, ShoppingCart, Tag)
+from users.models import User
+from .authentication import token_cache
+from . import facets, memberships
+from .cards import schedule_refresh
+from .catalog import ingredients_catalog, tags_catalog
+from .invalidation import channel
+from .similarity import similarity_index
+from .trending import ACTIVITY_KINDS
+from .writes import relation_changed
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    transaction.on_commit(partial(token_cache.delete, instance.key))
+
+
+@receiver(post_save, sender=User)
+def forget_deactivated_user_tokens(sender, instance, created, **kwargs):
+    if not created and not instance.is_active:
+        transaction.on_commit(partial(token_cache.delete_user, instance.pk))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tags_catalog(sender, **kwargs):
+    transaction.on_commit(tags_catalog.invalidate)
+    transaction.on_commit(facets.invalidate)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_facets(sender, **kwargs):
+    transaction.on_commit(facets.invalidate)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredients_catalog(sender, **kwargs):
+    transaction.on_commit(ingredients_catalog.invalidate)
+
+
+@receiver(post_import)
+def invalidate_imported_catalog(sender, model, **kwargs):
+    if model is Ingredient:
+        transaction.on_commit(ingredients_catalog.invalidate)
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_similar_recipe(sender, instance, **kwargs):
+    similarity_index.discard(instance.pk)
+
+
+@receiver(relation_changed)
+def record_recipe_activity(sender, owner_id, item_id, added, **kwargs):
+    kind = ACTIVITY_KINDS.get(sender)
+    if kind is not None:
+        RecipeActivity.objects.create(
+            recipe_id=item_id, owner_id=owner_id, kind=kind,
+            weight=1 if added else -1)
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_recipe_card(sender, instance, **kwargs):
+    schedule_refresh([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def refresh_tagged_cards(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            schedule_refresh([instance.pk])
+    elif action == 'pre_clear':
+        # post_clear со стороны тега приходит без pk_set: рецепты, у
+        # которых снимается тег, запоминаются до очистки.
+        instance._cleared_recipe_ids = list(
+            instance.recipe_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        schedule_refresh(instance.__dict__.pop('_cleared_recipe_ids', ()))
+    elif action.startswith('post_'):
+        schedule_refresh(pk_set)
+
+
+@receiver(post_save, sender=User)
+def refresh_author_cards(sender, instance, created, update_fields=None,
+                         **kwargs):
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    schedule_refresh(Recipe.objects.filter(
+        author=instance).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def refresh_tag_cards(sender, instance, **kwargs):
+    schedule_refresh(Recipe.objects.filter(
+        tags=instance).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def refresh_ingredient_cards(sender, instance, **kwargs):
+    schedule_refresh(IngredientInRecipe.objects.filter(
+        ingredient=instance).values_list('recipe_id', flat=True))
+
+
+@receiver(relation_changed)
+def refresh_recipe_memberships(sender, owner_id, **kwargs):
+    kind = memberships.KIND_OF.get(sender)
+    if kind is not None:
+        transaction.on_commit(partial(memberships.refresh, kind, owner_id))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def invalidate_recipe_memberships(sender, instance, **kwargs):
+    transaction.on_commit(partial(
+        memberships.invalidate, memberships.KIND_OF[sender],
+        memberships.owner_id(instance)))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def publish_change(sender, instance, **kwargs):
+    channel.publish(sender._meta.model_name, instance.pk)
+
+
+@receiver(post_save, sender=User)
+def publish_deactivated_user(sender, instance, created, **kwargs):
+    if not created and not instance.is_active:
+        channel.publish('user', instance.pk)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def publish_recipe_tags(sender, instance, action, **kwargs):
+    if action.startswith('post_') and isinstance(instance, Recipe):
+        channel.publish('recipe', instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def publish_deleted_token(sender, instance, **kwargs):
+    channel.publish('token', instance.key)
+
+
+@channel.subscriber('tag')
+def forget_tags_catalog(keys):
+    tags_catalog.invalidate()
+
+
+@channel.subscriber('ingredient')
+def forget_ingredients_catalog(keys):
+    ingredients_catalog.invalidate()
+
+
+@channel.subscriber('recipe')
+def forget_deleted_recipes(keys):
+    if keys is None:
+        similarity_index.unload()
+    else:
+        similarity_index.forget_deleted([int(key) for key in keys])
+
+
+@channel.subscriber('token')
+def forget_tokens(keys):
+    # Удаляется и общая копия: воркер, проверявший токен одновременно с
+    # удалением, мог записать его туда уже после первого удаления.
+    if keys is None:
+        token_cache.clear()
+        return
+    for key in keys:
+        token_cache.delete(key)
+
+
+@channel.subscriber('user')
+def forget_tokens_of_users(keys):
+    if keys is None:
+        token_cache.clear()
+        return
+    for key in keys:
+        token_cache.delete_user(int(key))
@@ -0,0 +1,363 @@
+"""Индекс рецептов по ингредиентам и тегам: похожие рецепты и поиск по
+имеющимся продуктам.
+
+Каждый рецепт — строка разреженной матрицы: столбцы соответствуют
+ингредиентам и тегам, веса — IDF (у тегов умноженный на
+SIMILARITY['TAG_WEIGHT']), строки нормированы, так что сходство — косинус.
+Столбцы той же матрицы в формате CSC — отсортированные списки рецептов по
+каждому ингредиенту, по ним считается покрытие для ?have=.
+Базовая матрица строится командой build_similarity_index (её же запускает
+gunicorn при старте, если файла нет) и читается воркерами с диска; пока
+файла нет, запросы к индексу получают 503. Изменённые после сборки рецепты
+каждый воркер не чаще раза в SIMILARITY['SYNC_INTERVAL'] секунд
+подтягивает по Recipe.modified в небольшую дельту и при её разрастании
+вливает в базу.
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from threading import Lock
+from time import monotonic
+
+import numpy as np
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from scipy import sparse
+
+from recipes.models import IngredientInRecipe, Recipe
+
+INGREDIENT, TAG = 0, 1
+
+
+def feature_code(kind, pk):
+    return pk * 2 + kind
+
+
+def load_features(recipe_ids=None):
+    """{recipe_id: [коды признаков]} из базы одним запросом на связь."""
+    lines = IngredientInRecipe.objects.all()
+    tags = Recipe.tags.through.objects.all()
+    if recipe_ids is not None:
+        lines = lines.filter(recipe_id__in=recipe_ids)
+        tags = tags.filter(recipe_id__in=recipe_ids)
+    features = {pk: [] for pk in recipe_ids or ()}
+    for recipe_id, ingredient_id in lines.values_list(
+            'recipe_id', 'ingredient_id').iterator():
+        features.setdefault(recipe_id, []).append(
+            feature_code(INGREDIENT, ingredient_id))
+    for recipe_id, tag_id in tags.values_list(
+            'recipe_id', 'tag_id').iterator():
+        features.setdefault(recipe_id, []).append(feature_code(TAG, tag_id))
+    return features
+
+
+class SimilarityIndex:
+    def __init__(self, recipe_ids, matrix, codes, idf, built_at):
+        self.recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+        self.matrix = sparse.csr_matrix(matrix, dtype=np.float32)
+        self.columns = self.matrix.tocsc()
+        self.codes = np.asarray(codes, dtype=np.int64)
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.built_at = built_at
+        self.column_of = {code: col for col, code in enumerate(self.codes)}
+        self.row_of = {pk: row for row, pk in enumerate(self.recipe_ids)}
+        self.sizes = _ingredient_counts(self.matrix, self.codes)
+        self.hidden = np.zeros(len(self.recipe_ids), dtype=bool)
+        self.delta = {}
+        self.delta_matrix = None
+        self.delta_ids = np.empty(0, dtype=np.int64)
+        self.delta_sizes = np.empty(0, dtype=np.int64)
+        self.synced_at = built_at
+        self.applied = {}
+
+    @classmethod
+    def build(cls, features, tag_weight, built_at=None):
+        """Собирает индекс из {recipe_id: [коды признаков]}."""
+        recipe_ids = np.fromiter(features, dtype=np.int64, count=len(features))
+        codes, inverse = np.unique(
+            np.fromiter(
+                (code for items in features.values() for code in items),
+                dtype=np.int64),
+            return_inverse=True)
+        indptr = np.zeros(len(recipe_ids) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(items) for items in features.values()])
+        presence = sparse.csr_matrix(
+            (np.ones(len(inverse), dtype=np.float32), inverse, indptr),
+            shape=(len(recipe_ids), len(codes)))
+        presence.sum_duplicates()
+        presence.data[:] = 1
+        document_frequency = np.bincount(
+            presence.indices, minlength=len(codes))
+        idf = np.log((1 + len(recipe_ids)) / (1 + document_frequency)) + 1
+        idf[codes % 2 == TAG] *= tag_weight
+        matrix = _normalize(presence.multiply(idf).tocsr())
+        return cls(
+            recipe_ids, matrix, codes, idf,
+            built_at or datetime.now(timezone.utc))
+
+    def vectorize(self, codes):
+        columns = np.unique([
+            self.column_of[code] for code in codes if code in self.column_of
+        ]).astype(np.int64)
+        weights = self.idf[columns]
+        norm = np.linalg.norm(weights)
+        return columns, weights / norm if norm else weights
+
+    def vector(self, recipe_id):
+        if recipe_id in self.delta:
+            return self.delta[recipe_id]
+        row = self.row_of.get(recipe_id)
+        if row is None or self.hidden[row]:
+            return None
+        start, end = self.matrix.indptr[row], self.matrix.indptr[row + 1]
+        return self.matrix.indices[start:end], self.matrix.data[start:end]
+
+    def update(self, features):
+        """Заменяет векторы изменённых рецептов; пустой список — удаление."""
+        for recipe_id, codes in features.items():
+            row = self.row_of.get(recipe_id)
+            if row is not None:
+                self.hidden[row] = True
+            self.delta.pop(recipe_id, None)
+            if codes:
+                self.delta[recipe_id] = self.vectorize(codes)
+        self.delta_ids = np.fromiter(self.delta, dtype=np.int64)
+        self.delta_matrix = _stack(
+            list(self.delta.values()), len(self.codes))
+        self.delta_sizes = np.fromiter(
+            (np.count_nonzero(self.codes[columns] % 2 == INGREDIENT)
+             for columns, _ in self.delta.values()),
+            dtype=np.int64, count=len(self.delta))
+
+    def discard(self, recipe_id):
+        self.update({recipe_id: []})
+
+    def similar(self, recipe_id, limit):
+        """До limit пар (recipe_id, сходство) по убыванию сходства."""
+        vector = self.vector(recipe_id)
+        if vector is None or not len(vector[0]):
+            return []
+        columns, weights = vector
+        scores = self.columns[:, columns] @ weights
+        scores[self.hidden] = 0
+        ids, values = _top(self.recipe_ids, scores, limit + 1)
+        if self.delta_matrix is not None:
+            delta_scores = self.delta_matrix[:, columns] @ weights
+            ids = np.concatenate((ids, self.delta_ids))
+            values = np.concatenate((values, delta_scores))
+        order = np.lexsort((ids, -values))
+        return [
+            (int(ids[index]), float(values[index])) for index in order
+            if values[index] > 0 and ids[index] != recipe_id
+        ][:limit]
+
+    def cookable(self, ingredient_ids):
+        """Рецепты, где есть хотя бы один из ингредиентов: сначала больше
+        совпавших, затем меньше недостающих, затем новее."""
+        columns = np.array(sorted(
+            self.column_of[code] for code in {
+                feature_code(INGREDIENT, pk) for pk in ingredient_ids}
+            if code in self.column_of
+        ), dtype=np.int64)
+        if not len(columns):
+            return np.empty(0, dtype=np.int64)
+        matched = np.bincount(
+            self.columns[:, columns].indices, minlength=len(self.recipe_ids))
+        matched[self.hidden] = 0
+        ids, sizes = self.recipe_ids, self.sizes
+        if self.delta_matrix is not None:
+            matched = np.concatenate((matched, np.bincount(
+                self.delta_matrix[:, columns].indices,
+                minlength=len(self.delta_ids))))
+            ids = np.concatenate((ids, self.delta_ids))
+            sizes = np.concatenate((sizes, self.delta_sizes))
+        found = np.flatnonzero(matched)
+        ids, matched, sizes = ids[found], matched[found], sizes[found]
+        return ids[np.lexsort((-ids, sizes - matched, -matched))]
+
+    def merged(self):
+        """Новый индекс, в котором дельта влита в базовую матрицу."""
+        keep = ~self.hidden
+        matrix = sparse.vstack((
+            self.matrix[keep],
+            _stack(list(self.delta.values()), len(self.codes)),
+        )).tocsr()
+        index = SimilarityIndex(
+            np.concatenate((self.recipe_ids[keep], self.delta_ids)),
+            matrix, self.codes, self.idf, self.built_at)
+        index.synced_at = self.synced_at
+        index.applied = self.applied
+        return index
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(
+            dir=path.parent, suffix='.npz')
+        with os.fdopen(descriptor, 'wb') as output:
+            np.savez(
+                output, recipe_ids=self.recipe_ids,
+                data=self.matrix.data, indices=self.matrix.indices,
+                indptr=self.matrix.indptr, shape=self.matrix.shape,
+                codes=self.codes, idf=self.idf,
+                built_at=self.built_at.timestamp(),
+            )
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as stored:
+            matrix = sparse.csr_matrix(
+                (stored['data'], stored['indices'], stored['indptr']),
+                shape=tuple(stored['shape']))
+            built_at = datetime.fromtimestamp(
+                float(stored['built_at']), timezone.utc)
+            return cls(
+                stored['recipe_ids'], matrix, stored['codes'], stored['idf'],
+                built_at)
+
+
+def _normalize(matrix):
+    norms = np.sqrt(matrix.multiply(matrix).sum(axis=1)).A1
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+def _ingredient_counts(matrix, codes):
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    return np.bincount(
+        rows[codes[matrix.indices] % 2 == INGREDIENT],
+        minlength=matrix.shape[0])
+
+
+def _stack(vectors, width):
+    if not vectors:
+        return None
+    indptr = np.zeros(len(vectors) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(columns) for columns, _ in vectors])
+    return sparse.csr_matrix(
+        (np.concatenate([weights for _, weights in vectors]),
+         np.concatenate([columns for columns, _ in vectors]), indptr),
+        shape=(len(vectors), width)).tocsc()
+
+
+def _top(ids, scores, limit):
+    if len(scores) > limit:
+        candidates = np.argpartition(-scores, limit)[:limit]
+    else:
+        candidates = np.arange(len(scores))
+    return ids[candidates], scores[candidates]
+
+
+def build_index():
+    built_at = datetime.now(timezone.utc)
+    return SimilarityIndex.build(
+        load_features(), settings.SIMILARITY['TAG_WEIGHT'], built_at)
+
+
+class IndexNotBuilt(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = (
+        'Индекс похожих рецептов ещё не собран, повторите запрос позже.')
+    default_code = 'similarity_index_not_built'
+    wait = 60
+
+
+class SharedSimilarityIndex:
+    """Индекс процесса: файл с диска плюс изменения рецептов из базы."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.index = None
+        self.version = None
+        self.next_sync = 0
+
+    @property
+    def path(self):
+        return Path(settings.SIMILARITY['INDEX_PATH'])
+
+    def _load(self):
+        try:
+            version = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            raise IndexNotBuilt
+        if version == self.version:
+            return
+        self.index = SimilarityIndex.load(self.path)
+        self.version, self.next_sync = version, 0
+
+    def _sync(self):
+        if monotonic() < self.next_sync:
+            return
+        self.next_sync = monotonic() + settings.SIMILARITY['SYNC_INTERVAL']
+        index = self.index
+        checked_at = datetime.now(timezone.utc)
+        since = index.synced_at - timedelta(
+            seconds=settings.SIMILARITY['SYNC_OVERLAP'])
+        changed = {
+            pk: modified for pk, modified in Recipe.objects.filter(
+                modified__gte=since).values_list('id', 'modified')
+            if index.applied.get(pk) != modified
+        }
+        if changed:
+            index.update(load_features(list(changed)))
+        index.applied = {
+            pk: modified
+            for pk, modified in {**index.applied, **changed}.items()
+            if modified >= since
+        }
+        index.synced_at = checked_at
+        if len(index.delta) > settings.SIMILARITY['MAX_DELTA']:
+            self.index = index.merged()
+
+    def similar(self, recipe_id, limit):
+        with self.lock:
+            self._load()
+            self._sync()
+            return self.index.similar(recipe_id, limit)
+
+    def cookable(self, ingredient_ids):
+        with self.lock:
+            self._load()
+            self._sync()
+            return self.index.cookable(ingredient_ids)
+
+    def discard(self, recipe_id):
+        with self.lock:
+            if self.index is not None:
+                self.index.discard(recipe_id)
+
+    def forget_deleted(self, recipe_ids):
+        """Убирает из индекса процесса рецепты, удалённые другими
+        воркерами."""
+        if self.index is None:
+            return
+        existing = set(Recipe.objects.filter(
+            pk__in=recipe_ids).values_list('pk', flat=True))
+        for recipe_id in set(recipe_ids) - existing:
+            self.discard(recipe_id)
+
+    def rebuild(self):
+        """Собирает индекс из базы и атомарно заменяет файл; воркеры
+        перечитают его при следующем запросе."""
+        index = build_index()
+        index.save(self.path)
+        return index
+
+    def unload(self):
+        with self.lock:
+            self.index = self.version = None
+
+    def reset(self):
+        """Забывает индекс процесса и удаляет файл до следующей сборки."""
+        self.unload()
+        with self.lock:
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+similarity_index = SharedSimilarityIndex()
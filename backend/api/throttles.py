@@ -0,0 +1,163 @@
+import math
+import time
+from threading import BoundedSemaphore, Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+_semaphores = {}
+_semaphores_lock = Lock()
+
+
+def parse_rate(rate):
+    """'30/min' -> (ёмкость ведра, токенов в секунду)."""
+    number, period = rate.split('/')
+    capacity = int(number)
+    return capacity, capacity / DURATIONS[period[0]]
+
+
+def get_view_cost(view, request):
+    """Сколько токенов списывает запрос: view может взвесить его
+    методом get_throttle_cost, по умолчанию — один."""
+    get_cost = getattr(view, 'get_throttle_cost', None)
+    return get_cost(request) if get_cost is not None else 1
+
+
+def get_view_scope(view, request):
+    scopes = getattr(view, 'throttle_scopes', None)
+    if scopes is not None:
+        return scopes.get(
+            getattr(view, 'action', None) or request.method.lower())
+    return getattr(view, 'throttle_scope', None)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Token bucket, состояние которого лежит в кеше throttle.
+
+    Чтение и запись ведра идут под блокировкой cache.add() на ключ ведра,
+    поэтому одновременные запросы одного клиента из разных воркеров не
+    проходят сверх лимита. Запрос, не дождавшийся блокировки за
+    lock_wait секунд, списывает токены атомарным cache.incr() в долг ведра
+    и проходит, если долг не больше остатка; владелец блокировки вычитает
+    долг при следующей записи. По умолчанию ведро своё у каждого
+    пользователя, у анонимов — у каждого IP.
+    """
+
+    rate_suffix = ''
+    cache_alias = 'throttle'
+    lock_timeout = 1
+    lock_wait = 0.05
+    lock_poll = 0.002
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        scope = get_view_scope(view, request)
+        rate_scope = f'{scope}{self.rate_suffix}'
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(rate_scope)
+        if not scope or rate is None:
+            return True
+        capacity, refill = parse_rate(rate)
+        cost = min(get_view_cost(view, request), capacity)
+        cache = caches[self.cache_alias]
+        key = f'throttle:{rate_scope}:{self.get_ident_key(request)}'
+        if not self.acquire(cache, key):
+            return self.borrow(cache, key, capacity, refill, cost)
+        try:
+            return self.take(cache, key, capacity, refill, cost)
+        finally:
+            cache.delete(f'{key}:lock')
+
+    def acquire(self, cache, key):
+        deadline = time.monotonic() + self.lock_wait
+        while not cache.add(f'{key}:lock', 1, self.lock_timeout):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.lock_poll)
+        return True
+
+    @staticmethod
+    def available(cache, key, capacity, refill, now):
+        tokens, updated = cache.get(key, (capacity, now))
+        return min(capacity, tokens + (now - updated) * refill)
+
+    def borrow(self, cache, key, capacity, refill, cost):
+        """Списание без блокировки: долг ведра растёт атомарно и
+        откатывается, если превысил остаток."""
+        now = time.time()
+        debt_key = f'{key}:debt'
+        cache.add(debt_key, 0, math.ceil(capacity / refill))
+        try:
+            debt = cache.incr(debt_key, cost)
+        except ValueError:
+            debt = cost
+        tokens = self.available(cache, key, capacity, refill, now)
+        if debt <= tokens:
+            return True
+        try:
+            cache.decr(debt_key, cost)
+        except ValueError:
+            pass
+        self.wait_seconds = (debt - tokens) / refill
+        return False
+
+    def take(self, cache, key, capacity, refill, cost=1):
+        now = time.time()
+        tokens = self.available(cache, key, capacity, refill, now)
+        debt = cache.get(f'{key}:debt', 0)
+        if debt:
+            cache.decr(f'{key}:debt', debt)
+            tokens -= debt
+        timeout = math.ceil(capacity / refill)
+        if tokens < cost:
+            self.wait_seconds = (cost - tokens) / refill
+            cache.set(key, (tokens, now), timeout)
+            return False
+        cache.set(key, (tokens - cost, now), timeout)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Ведро на пользователя, для анонимов — на IP."""
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Общее ведро на IP для всех пользователей за этим адресом."""
+
+    rate_suffix = '_ip'
+
+    def get_ident_key(self, request):
+        return self.get_ident(request)
+
+
+class ServerBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервер перегружен, повторите запрос позже.'
+    default_code = 'server_busy'
+
+    def __init__(self, wait):
+        super().__init__()
+        self.wait = wait
+
+
+def get_semaphore(scope):
+    """Семафор текущего процесса для тяжёлого scope или None."""
+    limit = settings.CONCURRENCY_LIMITS.get(scope)
+    if not limit:
+        return None
+    with _semaphores_lock:
+        if scope not in _semaphores:
+            _semaphores[scope] = BoundedSemaphore(limit)
+        return _semaphores[scope]
@@ -0,0 +1,211 @@
+"""Популярность рецептов с затуханием по времени.
+
+Добавление и удаление из избранного и списка покупок пишет одну строку
+RecipeActivity. Команда update_trending окнами по id сворачивает новые
+события в RecipePopularity. Оценка хранится как сумма
+вес * 2 ** ((t - epoch) / период полураспада): текущая затухшая оценка
+отличается от неё общим для всех рецептов множителем, поэтому порядок со
+временем не меняется и старые строки пересчитывать не нужно. Когда
+показатель вырастает, все оценки разом делятся на него и epoch сдвигается.
+
+Удаление вычитает ровно то, что внесло соответствующее добавление того же
+пользователя, — вес на момент добавления, а не удаления; если добавление
+уже удалено prune (старше RETENTION_DAYS) или записано без пользователя,
+удаление ничего не вычитает. Оценка не опускается ниже нуля.
+
+Окна идут по id, но id выдаются при INSERT, а видны строки после коммита.
+Пропуски id внутри свёрнутого окна запоминаются в TrendingWatermark.pending
+и сворачиваются, когда их транзакции закоммитятся; пропуск, не
+заполнившийся за GAP_TIMEOUT секунд (откат транзакции), забывается.
+"""
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from recipes.models import (Favorite, Recipe, RecipeActivity, RecipePopularity,
+                            ShoppingCart, TrendingWatermark)
+
+ACTIVITY_KINDS = {
+    Favorite: RecipeActivity.FAVORITE,
+    ShoppingCart: RecipeActivity.SHOPPING_CART,
+}
+REBASE_AFTER = 32
+
+
+def half_lives(moment, epoch):
+    return (moment - epoch).total_seconds() / 3600 / (
+        settings.TRENDING['HALF_LIFE_HOURS'])
+
+
+def kind_weights():
+    return {
+        RecipeActivity.FAVORITE: settings.TRENDING['FAVORITE_WEIGHT'],
+        RecipeActivity.SHOPPING_CART: (
+            settings.TRENDING['SHOPPING_CART_WEIGHT']),
+    }
+
+
+def get_watermark():
+    watermark, _ = TrendingWatermark.objects.select_for_update(
+    ).get_or_create(pk=1, defaults={'epoch': timezone.now()})
+    return watermark
+
+
+def _apply(scores):
+    existing = RecipePopularity.objects.in_bulk(list(scores))
+    for recipe_id, popularity in existing.items():
+        popularity.score = max(0.0, popularity.score + scores[recipe_id])
+    RecipePopularity.objects.bulk_update(
+        existing.values(), ('score',), batch_size=500)
+    created = Recipe.objects.filter(
+        pk__in=[pk for pk in scores if pk not in existing]
+    ).values_list('id', flat=True)
+    RecipePopularity.objects.bulk_create(
+        [RecipePopularity(recipe_id=pk, score=max(0.0, scores[pk]))
+         for pk in created],
+        batch_size=500)
+
+
+def added_at(removals):
+    """{id удаления: время добавления, которое оно отменяет} — последнего
+    добавления того же пользователя, рецепта и вида с меньшим id."""
+    removals = [event for event in removals if event[2] is not None]
+    if not removals:
+        return {}
+    candidates = RecipeActivity.objects.filter(
+        recipe_id__in={event[1] for event in removals},
+        owner_id__in={event[2] for event in removals},
+        weight__gt=0, id__lt=max(event[0] for event in removals),
+    ).order_by('id').values_list(
+        'id', 'recipe_id', 'owner_id', 'kind', 'created')
+    adds = defaultdict(list)
+    for pk, recipe_id, owner_id, kind, created in candidates:
+        adds[recipe_id, owner_id, kind].append((pk, created))
+    found = {}
+    for pk, recipe_id, owner_id, kind, *_ in removals:
+        earlier = [
+            created for add_id, created in adds[recipe_id, owner_id, kind]
+            if add_id < pk]
+        if earlier:
+            found[pk] = earlier[-1]
+    return found
+
+
+def score_events(events, epoch):
+    """{recipe_id: прирост оценки} для событий
+    (id, recipe_id, owner_id, kind, weight, created)."""
+    weights = kind_weights()
+    cancelled = added_at([event for event in events if event[4] < 0])
+    scores = defaultdict(float)
+    for pk, recipe_id, _, kind, weight, created in events:
+        if weight < 0:
+            created = cancelled.get(pk)
+            if created is None:
+                continue
+        scores[recipe_id] += weights[kind] * weight * 2 ** half_lives(
+            created, epoch)
+    return scores
+
+
+def track_gaps(watermark, events, late_ids):
+    """Обновляет pending: убирает свёрнутые поздние события и устаревшие
+    пропуски, добавляет пропуски id внутри нового окна."""
+    now = time.time()
+    timeout = settings.TRENDING['GAP_TIMEOUT']
+    pending = {
+        pk: noticed for pk, noticed in watermark.pending.items()
+        if int(pk) not in late_ids and now - noticed < timeout
+    }
+    folded = {event[0] for event in events}
+    if folded:
+        pending.update(
+            (str(pk), now)
+            for pk in range(watermark.last_activity_id + 1, max(folded))
+            if pk not in folded)
+        watermark.last_activity_id = max(folded)
+    watermark.pending = pending
+
+
+def fold_window(cutoff):
+    """Сворачивает следующее окно событий до cutoff и закоммиченные с тех
+    пор события из пропусков прошлых окон; возвращает их число.
+
+    События новее cutoff (now - LAG_SECONDS) ждут следующего запуска, чтобы
+    окно реже перешагивало ещё не закоммиченные строки.
+    """
+    columns = ('id', 'recipe_id', 'owner_id', 'kind', 'weight', 'created')
+    with transaction.atomic():
+        watermark = get_watermark()
+        late = list(RecipeActivity.objects.filter(
+            id__in=[int(pk) for pk in watermark.pending],
+        ).values_list(*columns))
+        events = list(RecipeActivity.objects.filter(
+            id__gt=watermark.last_activity_id, created__lte=cutoff,
+        ).order_by('id').values_list(
+            *columns)[:settings.TRENDING['BATCH_SIZE']])
+        if not events and not late and not watermark.pending:
+            return 0
+        _apply(score_events(late + events, watermark.epoch))
+        track_gaps(watermark, events, {event[0] for event in late})
+        watermark.save(update_fields=('last_activity_id', 'pending'))
+    return len(late) + len(events)
+
+
+def rebase(now):
+    """Сдвигает epoch к now, если множитель оценок стал слишком большим."""
+    with transaction.atomic():
+        watermark = get_watermark()
+        shift = half_lives(now, watermark.epoch)
+        if shift < REBASE_AFTER:
+            return False
+        RecipePopularity.objects.update(score=F('score') * 2 ** -shift)
+        watermark.epoch = now
+        watermark.save(update_fields=('epoch',))
+    return True
+
+
+def add_missing():
+    """Нулевые оценки для рецептов без активности: они в конце ленты."""
+    missing = Recipe.objects.filter(
+        popularity__isnull=True).values_list('id', flat=True)
+    return len(RecipePopularity.objects.bulk_create(
+        [RecipePopularity(recipe_id=pk) for pk in missing],
+        batch_size=500, ignore_conflicts=True))
+
+
+def prune(now):
+    """Удаляет учтённые события старше RETENTION_DAYS."""
+    watermark = TrendingWatermark.objects.filter(pk=1).first()
+    if watermark is None:
+        return 0
+    deleted, _ = RecipeActivity.objects.filter(
+        id__lte=watermark.last_activity_id,
+        created__lt=now - timedelta(
+            days=settings.TRENDING['RETENTION_DAYS']),
+    ).delete()
+    return deleted
+
+
+def update_trending(now=None):
+    """Полный проход команды update_trending; возвращает статистику."""
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=settings.TRENDING['LAG_SECONDS'])
+    folded = windows = 0
+    while True:
+        count = fold_window(cutoff)
+        if not count:
+            break
+        folded += count
+        windows += 1
+    return {
+        'events': folded,
+        'windows': windows,
+        'rebased': rebase(now),
+        'added': add_missing(),
+        'pruned': prune(now),
+    }
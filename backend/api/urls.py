@@ -26,6 +26,7 @@ urlpatterns = [
         views.DownloadShoppingCart.as_view(),
         name='download_shopping_cart'
     ),
+    path('batch/', views.BatchAPIView.as_view(), name='batch'),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
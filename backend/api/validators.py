@@ -24,10 +24,14 @@ def validate_ingredients(ingredients_list, val_model):
 
 
 def validate_tags(tags_list, val_model):
+    unique_list = []
     for tag in tags_list:
         tag_id = tag.pk if hasattr(tag, 'pk') else tag
         if not val_model.objects.filter(pk=tag_id).exists():
             raise ValidationError(f'{tag} - такого тега нет')
+        if tag_id in unique_list:
+            raise ValidationError(f'{tag_id} - дублирующийся тег')
+        unique_list.append(tag_id)
 
 
 def validate_cooking_time(value):
@@ -1,153 +1,331 @@
+import numpy as np
+from django.conf import settings
+from django.db import IntegrityError
 from django.db.models import Sum
 from django.shortcuts import HttpResponse, get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import status, viewsets
+from rest_framework import generics, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
                             ShoppingCart, Tag)
+from foodgram.performance import span
 from users.models import Subscribe, User
+from .batch import render_batch, run_batch
+from .bulk import create_recipes
+from .cards import CARD_COLUMNS, read_cards
+from .catalog import ingredients_catalog, tags_catalog
+from .facets import cached_tag_counts, requested_facets
+from .fieldsets import get_fieldset
 from .filters import IngredientSearchFilter, RecipeFilter
-from .mixins import CreateDestroyViewSet
+from .mixins import (CatalogSnapshotMixin, ConcurrencyLimitMixin,
+                     CreateDestroyViewSet)
 from .paginators import PageLimitPagination
 from .permissions import IsAuthorOrReadOnly
-from .serializers import (FavoriteRecipeSerializer, IngredientSerializer,
+from .renderers import ORJSONRenderer
+from .representations import (RECIPE_RELATIONS, RECIPE_SCHEMA,
+                              SUBSCRIPTION_RELATIONS, SUBSCRIPTION_SCHEMA,
+                              build_recipes, build_recipes_from_cards,
+                              build_subscriptions, favorite_recipe,
+                              recipe_columns, short_recipe,
+                              subscription_columns)
+from .serializers import (BatchSerializer, BulkRecipesSerializer,
+                          FavoriteRecipeSerializer, IngredientSerializer,
                           RecipeSerializer, ShoppingCartSerializer,
                           SubscribeSerializer, TagSerializer)
+from .similarity import similarity_index
+from .writes import add_relation, remove_relation
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConcurrencyLimitMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     pagination_class = PageLimitPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     serializer_class = RecipeSerializer
     permission_classes = (IsAuthorOrReadOnly,)
+    renderer_classes = (ORJSONRenderer, BrowsableAPIRenderer)
+    throttle_scopes = {
+        'create': 'uploads',
+        'update': 'uploads',
+        'partial_update': 'uploads',
+        'destroy': 'writes',
+        'similar': 'search',
+        'bulk': 'uploads',
+    }
+    similar_limit = 6
+    max_similar_limit = 50
 
+    def list(self, request, *args, **kwargs):
+        facets = requested_facets(request)
+        response = self.list_recipes(request, *args, **kwargs)
+        if 'tags' in facets:
+            response.data['facets'] = {'tags': cached_tag_counts(
+                request.query_params, self.get_facet_queryset)}
+        return response
+
+    def get_facet_queryset(self):
+        params = self.request.query_params.copy()
+        params.pop('tags', None)
+        queryset = self.filterset_class(
+            params, queryset=self.get_queryset(), request=self.request).qs
+        if 'have' in params:
+            return Recipe.objects.filter(
+                pk__in=self.cookable_ids(queryset).tolist())
+        return queryset
+
+    def list_recipes(self, request, *args, **kwargs):
+        if 'have' in request.query_params:
+            return self.list_cookable(request)
+        if not settings.FAST_READ_PATH:
+            return super().list(request, *args, **kwargs)
+        fields, expand = get_fieldset(request, RECIPE_SCHEMA, RECIPE_RELATIONS)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(
+            queryset.values(*self.get_columns(fields, expand)))
+        with span('serializer'):
+            data = self.render_recipes(page, request, fields, expand)
+        return self.get_paginated_response(data)
+
+    def list_cookable(self, request):
+        """Рецепты из имеющихся ингредиентов ?have=1,2,3 по индексу;
+        остальные фильтры RecipeFilter сужают выборку."""
+        ranked = self.cookable_ids(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(ranked.tolist())
+        if not settings.FAST_READ_PATH:
+            recipes = Recipe.objects.in_bulk(page)
+            serializer = self.get_serializer(
+                [recipes[key] for key in page if key in recipes], many=True)
+            return self.get_paginated_response(serializer.data)
+        fields, expand = get_fieldset(request, RECIPE_SCHEMA, RECIPE_RELATIONS)
+        rows = self.rows_in_order(page, self.get_columns(fields, expand))
+        with span('serializer'):
+            data = self.render_recipes(rows, request, fields, expand)
+        return self.get_paginated_response(data)
+
+    def cookable_ids(self, queryset):
+        """id рецептов по ?have= в порядке индекса, суженные queryset."""
+        ranked = similarity_index.cookable(
+            int(pk) for pk in self.request.query_params['have'].split(',')
+            if pk)
+        if not queryset.query.has_filters():
+            return ranked
+        return ranked[np.isin(ranked, np.fromiter(
+            queryset.values_list('id', flat=True), dtype=np.int64))]
+
+    @staticmethod
+    def rows_in_order(ids, columns):
+        rows = {
+            row['id']: row
+            for row in Recipe.objects.filter(pk__in=ids).values(*columns)
+        }
+        return [rows[key] for key in ids if key in rows]
+
+    @staticmethod
+    def get_columns(fields, expand):
+        if settings.RECIPE_CARDS:
+            return CARD_COLUMNS
+        return recipe_columns(fields, expand)
+
+    @staticmethod
+    def render_recipes(rows, request, fields, expand):
+        if settings.RECIPE_CARDS:
+            return build_recipes_from_cards(
+                read_cards(rows), request, fields, expand)
+        return build_recipes(rows, request, fields, expand)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.FAST_READ_PATH:
+            return super().retrieve(request, *args, **kwargs)
+        fields, expand = get_fieldset(request, RECIPE_SCHEMA, RECIPE_RELATIONS)
+        row = generics.get_object_or_404(
+            self.filter_queryset(self.get_queryset()).values(
+                *self.get_columns(fields, expand)),
+            pk=self.kwargs[self.lookup_field],
+        )
+        with span('serializer'):
+            data = self.render_recipes([row], request, fields, expand)[0]
+        return Response(data)
+
+    @action(detail=False, methods=('post',))
+    def bulk(self, request):
+        serializer = BulkRecipesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            results = create_recipes(
+                request.user, serializer.validated_data['recipes'])
+        except IntegrityError:
+            return Response(
+                {'errors': 'Рецепты изменились во время сохранения, '
+                           'повторите запрос'},
+                status=status.HTTP_409_CONFLICT)
+        created = sum(
+            result['status'] == status.HTTP_201_CREATED for result in results)
+        if created == len(results):
+            code = status.HTTP_201_CREATED
+        elif created:
+            code = status.HTTP_207_MULTI_STATUS
+        else:
+            code = status.HTTP_400_BAD_REQUEST
+        return Response({'results': results}, status=code)
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=True, methods=('get',))
+    def similar(self, request, pk=None):
+        fields, expand = get_fieldset(request, RECIPE_SCHEMA, RECIPE_RELATIONS)
+        generics.get_object_or_404(Recipe.objects.values('id'), pk=pk)
+        try:
+            limit = min(max(
+                int(request.query_params.get('limit', self.similar_limit)),
+                1), self.max_similar_limit)
+        except ValueError:
+            limit = self.similar_limit
+        ids = [
+            recipe_id for recipe_id, _ in
+            similarity_index.similar(int(pk), limit * 2)
+        ]
+        rows = self.rows_in_order(ids, self.get_columns(fields, expand))
+        with span('serializer'):
+            data = self.render_recipes(rows[:limit], request, fields, expand)
+        return Response(data)
+
+
+class TagViewSet(CatalogSnapshotMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    catalog = tags_catalog
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogSnapshotMixin,
+                        viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
     filter_backends = (IngredientSearchFilter,)
     search_fields = ('^name',)
+    throttle_scope = 'search'
+    catalog = ingredients_catalog
 
 
 class SubscriptionsViewSet(viewsets.ModelViewSet):
     serializer_class = SubscribeSerializer
     permission_classes = (IsAuthenticated,)
     pagination_class = PageLimitPagination
+    renderer_classes = (ORJSONRenderer, BrowsableAPIRenderer)
 
     def get_queryset(self):
         return Subscribe.objects.filter(
             user=self.request.user).prefetch_related('author')
 
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_READ_PATH:
+            return super().list(request, *args, **kwargs)
+        fields, expand = get_fieldset(
+            request, SUBSCRIPTION_SCHEMA, SUBSCRIPTION_RELATIONS)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset.prefetch_related(None).values(
+            *subscription_columns(fields)))
+        with span('serializer'):
+            data = build_subscriptions(page, request, fields, expand)
+        return self.get_paginated_response(data)
+
 
 class SubscribeAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+    throttle_scope = 'writes'
+
     def post(self, request, author_id):
-        author = get_object_or_404(
-            User,
-            id=author_id
-        )
-        if request.user == author:
+        if request.user.pk == author_id:
             return Response(
                 {'errors': 'Нельзя подписаться на самого себя'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        subscription = Subscribe.objects.filter(
-            author=author,
-            user=request.user,
-        )
-        if subscription.exists():
+        if not add_relation(
+            Subscribe, 'user', 'author', request.user.pk, author_id
+        ):
+            get_object_or_404(User, id=author_id)
             return Response(
                 {'errors': 'Вы уже подписаны на этого автора'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        queryset = Subscribe.objects.create(
-            author=author,
+        row = get_object_or_404(
+            Subscribe.objects.values(
+                *subscription_columns(SUBSCRIPTION_SCHEMA)),
             user=request.user,
-        )
-        serializer = SubscribeSerializer(
-            queryset,
-            context={'request': request}
+            author_id=author_id,
         )
         return Response(
-            serializer.data,
+            build_subscriptions([row], request)[0],
             status=status.HTTP_201_CREATED,
         )
 
     def delete(self, request, author_id):
-        user = request.user
-        author = get_object_or_404(
-            User,
-            id=author_id,
-        )
-        subscription = Subscribe.objects.filter(
-            author=author,
-            user=user,
-        )
-        if not subscription.exists():
+        if not remove_relation(
+            Subscribe, 'user', 'author', request.user.pk, author_id
+        ):
+            get_object_or_404(User, id=author_id)
             return Response(
                 {'errors': 'Вы не подписаны на этого автора'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        subscription.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class AddRemoveFromListMixin:
-    def perform_action(
-        self, queryset, item_field, owner_field, item, owner, error_message
-    ):
-        if not queryset.filter(
-            **{item_field: item, owner_field: owner}
-        ).exists():
+    """Добавление в список и удаление из него одним запросом к базе.
+
+    added_representation(recipe, request) строит ответ на добавление из
+    строки рецепта с полями id, name, image и cooking_time.
+    """
+
+    added_representation = staticmethod(short_recipe)
+
+    def create(self, request, *args, **kwargs):
+        recipe_id = self.kwargs.get('recipe_id')
+        if not add_relation(
+            self.queryset.model, self.owner_field, self.item_field,
+            request.user.pk, recipe_id,
+        ):
+            get_object_or_404(Recipe, pk=recipe_id)
             return Response(
-                {'errors': error_message},
+                {'errors': [self.duplicate_message]},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        queryset.get(**{item_field: item, owner_field: owner}).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        recipe = get_object_or_404(
+            Recipe.objects.values('id', 'name', 'image', 'cooking_time'),
+            pk=recipe_id,
+        )
+        return Response(
+            self.added_representation(recipe, request),
+            status=status.HTTP_201_CREATED,
+        )
 
     @action(methods=('delete',), detail=True)
     def delete(self, request, recipe_id):
-        item = self.kwargs.get('recipe_id')
-        owner = self.request.user
-        queryset = self.get_queryset()
-        item_field = self.item_field
-        owner_field = self.owner_field
-        error_message = self.error_message
-        return self.perform_action(
-            queryset,
-            item_field,
-            owner_field,
-            item, owner,
-            error_message
-        )
+        if not remove_relation(
+            self.queryset.model, self.owner_field, self.item_field,
+            request.user.pk, recipe_id,
+        ):
+            return Response(
+                {'errors': self.error_message},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class ShoppingCartViewSet(AddRemoveFromListMixin, CreateDestroyViewSet):
     queryset = ShoppingCart.objects.all()
     serializer_class = ShoppingCartSerializer
+    permission_classes = (IsAuthenticated,)
     error_message = 'Рецепт не добавлен в список покупок'
+    duplicate_message = 'Рецепт уже в списке покупок'
     item_field = 'recipe'
     owner_field = 'cart_owner'
-
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        recipe = get_object_or_404(Recipe, pk=self.kwargs.get('recipe_id'))
-        context.update({'recipe': recipe})
-        context.update({'owner': self.request.user})
-        return context
+    throttle_scopes = {'create': 'writes', 'delete': 'writes'}
 
 
 class FavoriteViewSet(AddRemoveFromListMixin, viewsets.ModelViewSet):
@@ -157,23 +335,14 @@ class FavoriteViewSet(AddRemoveFromListMixin, viewsets.ModelViewSet):
     item_field = 'recipe'
     owner_field = 'recipe_lover'
     error_message = 'Рецепт не добавлен в избранное'
-
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context.update({'recipe': self.kwargs.get('recipe_id')})
-        return context
-
-    def perform_create(self, serializer):
-        recipe = get_object_or_404(
-            Recipe,
-            pk=self.kwargs.get('recipe_id'),
-        )
-        serializer.save(
-            recipe_lover=self.request.user, recipe=recipe)
+    duplicate_message = 'Рецепт уже в избранном'
+    throttle_scopes = {'create': 'writes', 'delete': 'writes'}
+    added_representation = staticmethod(favorite_recipe)
 
 
-class DownloadShoppingCart(APIView):
+class DownloadShoppingCart(ConcurrencyLimitMixin, APIView):
     permission_classes = (IsAuthenticated,)
+    throttle_scope = 'downloads'
 
     def get(self, request):
         if not ShoppingCart.objects.filter(cart_owner=request.user).exists():
@@ -186,13 +355,40 @@ class DownloadShoppingCart(APIView):
                 'ingredient__name', 'ingredient__measurement_unit').annotate(
                     total_amount=Sum('amount')).order_by()
 
-        text = 'Список покупок:\n\n'
-        for item in ingredients:
-            text += (f'{item["ingredient__name"]}: '
-                     f'{item["total_amount"]} '
-                     f'{item["ingredient__measurement_unit"]}\n')
+        with span('serializer'):
+            text = 'Список покупок:\n\n'
+            for item in ingredients:
+                text += (f'{item["ingredient__name"]}: '
+                         f'{item["total_amount"]} '
+                         f'{item["ingredient__measurement_unit"]}\n')
 
         response = HttpResponse(text, content_type='text/plain')
         filename = 'recipes_list.txt'
         response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
+
+
+class BatchAPIView(APIView):
+    """Несколько GET-запросов к API за один HTTP-запрос."""
+
+    throttle_scope = 'batch'
+
+    def get_throttle_cost(self, request):
+        """Пачка списывает из ведра batch по токену на подзапрос."""
+        data = request.data
+        requests = data.get('requests') if hasattr(data, 'get') else None
+        if not isinstance(requests, list):
+            return 1
+        return max(min(len(requests), settings.BATCH['MAX_REQUESTS']), 1)
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        urls = serializer.validated_data['requests']
+        results = run_batch(
+            request, urls,
+            parallel=serializer.validated_data['parallel'],
+            max_workers=settings.BATCH['MAX_WORKERS'])
+        return HttpResponse(
+            render_batch(urls, results),
+            content_type=ORJSONRenderer.media_type)
@@ -0,0 +1,67 @@
+"""Идемпотентные добавление и удаление связей одним SQL-запросом.
+
+Прямые INSERT и DELETE не вызывают post_save и post_delete, поэтому о
+фактических изменениях сообщает сигнал relation_changed (sender — модель
+связи, owner_id, item_id, added).
+"""
+from django.db import connections, router
+from django.dispatch import Signal
+
+relation_changed = Signal()
+
+
+def _table(model, owner_field, item_field):
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    return (
+        connection,
+        quote(model._meta.db_table),
+        quote(model._meta.get_field(owner_field).column),
+        quote(model._meta.get_field(item_field).column),
+    )
+
+
+def add_relation(model, owner_field, item_field, owner_id, item_id):
+    """Добавляет связь, если объект существует, а связи ещё нет.
+
+    Проверка существования объекта и уникальности выполняется тем же
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING; возвращает True, если
+    строка вставлена.
+    """
+    connection, table, owner_column, item_column = _table(
+        model, owner_field, item_field)
+    item_model = model._meta.get_field(item_field).related_model
+    item_pk = connection.ops.quote_name(item_model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({owner_column}, {item_column}) '
+            f'SELECT %s, {item_pk} '
+            f'FROM {connection.ops.quote_name(item_model._meta.db_table)} '
+            f'WHERE {item_pk} = %s '
+            f'ON CONFLICT DO NOTHING',
+            (owner_id, int(item_id)),
+        )
+        added = cursor.rowcount == 1
+    if added:
+        relation_changed.send(
+            sender=model, owner_id=owner_id, item_id=int(item_id),
+            added=True)
+    return added
+
+
+def remove_relation(model, owner_field, item_field, owner_id, item_id):
+    """Удаляет связь одним DELETE; возвращает True, если она была."""
+    connection, table, owner_column, item_column = _table(
+        model, owner_field, item_field)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} '
+            f'WHERE {owner_column} = %s AND {item_column} = %s',
+            (owner_id, int(item_id)),
+        )
+        removed = cursor.rowcount > 0
+    if removed:
+        relation_changed.send(
+            sender=model, owner_id=owner_id, item_id=int(item_id),
+            added=False)
+    return removed
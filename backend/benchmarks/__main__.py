@@ -0,0 +1,41 @@
+import argparse
+import os
+import sys
+
+import django
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Бенчмарки горячих путей API на синтетических данных.')
+    parser.add_argument(
+        '--scales', default='10,100,1000',
+        help='число пользователей для каждого прогона через запятую')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument(
+        '--only', action='append',
+        help='запускать только сценарии, содержащие подстроку')
+    parser.add_argument('--output', default='var/bench_results.json')
+    parser.add_argument('--compare', help='JSON предыдущего прогона')
+    parser.add_argument(
+        '--threshold', type=float, default=0.2,
+        help='допустимый рост p50 при сравнении (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    django.setup()
+    from .runner import compare, dump, load, run
+
+    results = run(
+        [int(scale) for scale in args.scales.split(',')],
+        repeat=args.repeat, seed=args.seed, only=args.only,
+    )
+    dump(results, args.output)
+    print(f'results: {args.output}')
+    if args.compare and compare(load(args.compare), results, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
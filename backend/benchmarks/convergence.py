@@ -0,0 +1,91 @@
+"""Сходимость кешей воркеров после записи в другом процессе.
+
+gunicorn с несколькими воркерами прогревает снимок тегов и кеш токенов;
+локальные сроки жизни подняты до часа, так что обновить их может только
+канал сброса. Затем этот процесс через ORM добавляет тег и удаляет токен,
+и скрипт опрашивает сервер, пока пачка подряд идущих ответов не покажет
+новое состояние во всех воркерах.
+
+    python -m benchmarks.convergence --workers 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+
+from .load import free_port, prepare_environment, seed_database, start_server
+
+
+def converge(check, probes, timeout):
+    """Секунды до первой пачки из probes подряд успешных проверок."""
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        if all(check() for _ in range(probes)):
+            return time.monotonic() - start
+        time.sleep(0.05)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--probes', type=int, default=40)
+    parser.add_argument('--timeout', type=float, default=15)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    problems = []
+    with tempfile.TemporaryDirectory() as directory:
+        prepare_environment(Path(directory), throttling=False)
+        os.environ.update({
+            'CATALOG_CACHE_LOCAL_TTL': '3600',
+            'TOKEN_CACHE_TTL': '3600',
+            'TOKEN_CACHE_LOCAL_TTL': '3600',
+        })
+        dataset = seed_database(args.users, args.seed)
+        from recipes.models import Tag
+        from rest_framework.authtoken.models import Token
+
+        port = free_port()
+        server = start_server(port, args.workers, 1)
+        base_url = f'http://127.0.0.1:{port}'
+        token = dataset.tokens[-1]
+        headers = {'Authorization': f'Token {token}'}
+        try:
+            for _ in range(args.probes * 2):
+                requests.get(f'{base_url}/api/tags/', timeout=10)
+                requests.get(
+                    f'{base_url}/api/users/me/', headers=headers, timeout=10)
+            Tag.objects.create(name='Сходимость', slug='converge',
+                               color='#123456')
+            tag_delay = converge(
+                lambda: 'converge' in requests.get(
+                    f'{base_url}/api/tags/', timeout=10).text,
+                args.probes, args.timeout)
+            Token.objects.filter(key=token).delete()
+            token_delay = converge(
+                lambda: requests.get(
+                    f'{base_url}/api/users/me/', headers=headers,
+                    timeout=10).status_code == 401,
+                args.probes, args.timeout)
+        finally:
+            server.terminate()
+            server.wait()
+    for name, delay in (('новый тег', tag_delay),
+                        ('удалённый токен', token_delay)):
+        if delay is None:
+            problems.append(f'{name}: нет сходимости за {args.timeout} с')
+        else:
+            print(f'{name}: все воркеры за {delay:.2f} с')
+    for problem in problems:
+        print(problem)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
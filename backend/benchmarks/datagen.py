@@ -0,0 +1,230 @@
+"""Детерминированный генератор синтетических данных для бенчмарков."""
+import csv
+import random
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from api.trending import update_trending
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            RecipeActivity, ShoppingCart, Tag)
+from users.models import Subscribe, User
+
+INGREDIENTS_CSV = Path(settings.BASE_DIR).parent / 'data' / 'ingredients.csv'
+PASSWORD = 'bench-password-42'
+IMAGE = 'recipes/images/bench.jpg'
+BATCH_SIZE = 2000
+
+TAGS = (
+    ('Завтрак', 'breakfast', '#E26C2D'),
+    ('Обед', 'lunch', '#49B64E'),
+    ('Ужин', 'dinner', '#8775D2'),
+    ('Десерт', 'dessert', '#F2C94C'),
+    ('Суп', 'soup', '#2D9CDB'),
+    ('Выпечка', 'bakery', '#EB5757'),
+    ('Салат', 'salad', '#27AE60'),
+    ('Напиток', 'drink', '#9B51E0'),
+)
+
+RECIPES_PER_USER = (0, 10)
+INGREDIENTS_PER_RECIPE = (3, 12)
+TAGS_PER_RECIPE = (1, 3)
+FAVORITES_PER_USER = (0, 20)
+CART_PER_USER = (0, 6)
+SUBSCRIPTIONS_PER_USER = (0, 8)
+
+
+@dataclass
+class Dataset:
+    users: int
+    recipes: int
+    tokens: list = field(default_factory=list)
+    tag_slugs: list = field(default_factory=list)
+    ingredient_names: list = field(default_factory=list)
+    recipe_ids_by_author: dict = field(default_factory=dict)
+
+    @property
+    def main_token(self):
+        """Токен пользователя, у которого гарантированно есть все связи."""
+        return self.tokens[0]
+
+
+def read_ingredients(path=INGREDIENTS_CSV):
+    with open(path, encoding='utf-8') as csv_file:
+        return [
+            (row[0], row[1]) for row in csv.reader(csv_file) if len(row) == 2
+        ]
+
+
+def _sample(rng, population, cum_weights, count):
+    chosen = set()
+    while len(chosen) < min(count, len(population)):
+        chosen.add(rng.choices(population, cum_weights=cum_weights)[0])
+    return sorted(chosen)
+
+
+def _cum_weights(size, skew=0.8):
+    total = 0.0
+    weights = []
+    for rank in range(size):
+        total += 1 / (rank + 1) ** skew
+        weights.append(total)
+    return weights
+
+
+def _reset_sequences(*models):
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def _create_catalog():
+    tags = Tag.objects.bulk_create([
+        Tag(pk=pk, name=name, slug=slug, color=color)
+        for pk, (name, slug, color) in enumerate(TAGS, start=1)
+    ])
+    ingredient_rows = read_ingredients()
+    Ingredient.objects.bulk_create([
+        Ingredient(pk=pk, name=name, measurement_unit=unit)
+        for pk, (name, unit) in enumerate(ingredient_rows, start=1)
+    ], batch_size=BATCH_SIZE)
+    return tags, ingredient_rows
+
+
+def _create_users(rng, users):
+    password = make_password(PASSWORD)
+    User.objects.bulk_create([
+        User(
+            pk=pk, username=f'user{pk}', email=f'user{pk}@example.com',
+            first_name=f'Имя{pk}', last_name=f'Фамилия{pk}',
+            password=password,
+        )
+        for pk in range(1, users + 1)
+    ], batch_size=BATCH_SIZE)
+    tokens = ['%040x' % rng.getrandbits(160) for _ in range(users)]
+    Token.objects.bulk_create([
+        Token(key=key, user_id=pk) for pk, key in enumerate(tokens, start=1)
+    ], batch_size=BATCH_SIZE)
+    return tokens
+
+
+def _create_recipes(rng, users, tags, ingredients_count):
+    ingredient_ids = list(range(1, ingredients_count + 1))
+    rng.shuffle(ingredient_ids)
+    ingredient_weights = _cum_weights(len(ingredient_ids))
+    recipes = []
+    recipe_tags = []
+    recipe_ingredients = []
+    recipe_ids_by_author = {}
+    for author_id in range(1, users + 1):
+        count = rng.randint(*RECIPES_PER_USER)
+        if author_id == 1:
+            count = max(count, 3)
+        for number in range(count):
+            recipe_id = len(recipes) + 1
+            recipes.append(Recipe(
+                pk=recipe_id, author_id=author_id,
+                name=f'Рецепт {author_id}-{number}',
+                text='Описание рецепта. ' * rng.randint(5, 40),
+                cooking_time=rng.randint(5, 180), image=IMAGE,
+            ))
+            recipe_ids_by_author.setdefault(author_id, []).append(recipe_id)
+            recipe_tags += [
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag.pk)
+                for tag in rng.sample(tags, rng.randint(*TAGS_PER_RECIPE))
+            ]
+            recipe_ingredients += [
+                IngredientInRecipe(
+                    recipe_id=recipe_id, ingredient_id=ingredient_id,
+                    amount=rng.randint(1, 500))
+                for ingredient_id in _sample(
+                    rng, ingredient_ids, ingredient_weights,
+                    rng.randint(*INGREDIENTS_PER_RECIPE))
+            ]
+    Recipe.objects.bulk_create(recipes, batch_size=BATCH_SIZE)
+    Recipe.tags.through.objects.bulk_create(
+        recipe_tags, batch_size=BATCH_SIZE)
+    IngredientInRecipe.objects.bulk_create(
+        recipe_ingredients, batch_size=BATCH_SIZE)
+    return recipe_ids_by_author
+
+
+def _create_relations(rng, users, recipes_count, recipe_ids_by_author):
+    recipe_ids = list(range(1, recipes_count + 1))
+    recipe_weights = _cum_weights(len(recipe_ids))
+    authors = list(recipe_ids_by_author)
+    author_weights = _cum_weights(len(authors))
+    favorites = []
+    cart = []
+    subscriptions = []
+    for user_id in range(1, users + 1):
+        minimum = 3 if user_id == 1 else 0
+        favorites += [
+            Favorite(recipe_id=recipe_id, recipe_lover_id=user_id)
+            for recipe_id in _sample(
+                rng, recipe_ids, recipe_weights,
+                max(rng.randint(*FAVORITES_PER_USER), minimum))
+        ]
+        cart += [
+            ShoppingCart(recipe_id=recipe_id, cart_owner_id=user_id)
+            for recipe_id in _sample(
+                rng, recipe_ids, recipe_weights,
+                max(rng.randint(*CART_PER_USER), minimum))
+        ]
+        subscriptions += [
+            Subscribe(user_id=user_id, author_id=author_id)
+            for author_id in _sample(
+                rng, authors, author_weights,
+                max(rng.randint(*SUBSCRIPTIONS_PER_USER), minimum))
+            if author_id != user_id
+        ]
+    Favorite.objects.bulk_create(favorites, batch_size=BATCH_SIZE)
+    ShoppingCart.objects.bulk_create(cart, batch_size=BATCH_SIZE)
+    Subscribe.objects.bulk_create(subscriptions, batch_size=BATCH_SIZE)
+    RecipeActivity.objects.bulk_create(
+        [
+            RecipeActivity(
+                recipe_id=item.recipe_id, owner_id=getattr(item, owner),
+                kind=kind)
+            for items, owner, kind in (
+                (favorites, 'recipe_lover_id', RecipeActivity.FAVORITE),
+                (cart, 'cart_owner_id', RecipeActivity.SHOPPING_CART),
+            )
+            for item in items
+        ],
+        batch_size=BATCH_SIZE)
+
+
+@transaction.atomic
+def generate(users=100, seed=42):
+    """Заполняет пустую базу; одинаковые users и seed дают одинаковые данные.
+
+    Популярность ингредиентов, рецептов и авторов подчиняется закону Ципфа,
+    чтобы распределение связей было похоже на реальное.
+    """
+    rng = random.Random(seed)
+    tags, ingredient_rows = _create_catalog()
+    tokens = _create_users(rng, users)
+    recipe_ids_by_author = _create_recipes(
+        rng, users, tags, len(ingredient_rows))
+    recipes_count = sum(map(len, recipe_ids_by_author.values()))
+    _create_relations(rng, users, recipes_count, recipe_ids_by_author)
+    _reset_sequences(Tag, Ingredient, User, Recipe)
+    update_trending(timezone.now() + timedelta(
+        seconds=settings.TRENDING['LAG_SECONDS']))
+    return Dataset(
+        users=users,
+        recipes=recipes_count,
+        tokens=tokens,
+        tag_slugs=[tag.slug for tag in tags],
+        ingredient_names=[name for name, _ in ingredient_rows],
+        recipe_ids_by_author=recipe_ids_by_author,
+    )
@@ -0,0 +1,118 @@
+"""Стресс-проверка идемпотентности избранного, корзины и подписок.
+
+Несколько потоков одновременно шлют одинаковые POST, затем одинаковые
+DELETE на gunicorn с несколькими воркерами. Каждый раунд должен дать ровно
+один 201 (204), остальные — 400, ни одного 5xx, и ровно одну строку в базе.
+
+    python -m benchmarks.doubleclick --concurrency 16 --rounds 20
+"""
+import argparse
+import sys
+import tempfile
+import threading
+from collections import Counter
+from pathlib import Path
+
+import requests
+
+from .load import free_port, prepare_environment, seed_database, start_server
+
+
+def fire(base_url, token, method, path, concurrency):
+    barrier = threading.Barrier(concurrency)
+    statuses = []
+
+    def worker():
+        session = requests.Session()
+        session.headers['Authorization'] = f'Token {token}'
+        barrier.wait()
+        try:
+            status = session.request(
+                method, base_url + path, timeout=30).status_code
+        except requests.RequestException:
+            status = 'error'
+        statuses.append(status)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return Counter(statuses)
+
+
+def targets(dataset, rounds):
+    from recipes.models import Favorite, ShoppingCart
+    from users.models import Subscribe
+
+    authors = [
+        author for author in sorted(dataset.recipe_ids_by_author)
+        if author != 2
+    ]
+    for number in range(rounds):
+        recipe_id = dataset.recipes - number
+        author_id = authors[-1 - number % len(authors)]
+        yield (
+            f'/api/recipes/{recipe_id}/favorite/',
+            Favorite.objects.filter(recipe_lover_id=2, recipe_id=recipe_id),
+        )
+        yield (
+            f'/api/recipes/{recipe_id}/shopping_cart/',
+            ShoppingCart.objects.filter(cart_owner_id=2, recipe_id=recipe_id),
+        )
+        yield (
+            f'/api/users/{author_id}/subscribe/',
+            Subscribe.objects.filter(user_id=2, author_id=author_id),
+        )
+
+
+def check_round(base_url, token, path, rows, concurrency):
+    problems = []
+    rows.delete()
+    for method, success in (('POST', 201), ('DELETE', 204)):
+        statuses = fire(base_url, token, method, path, concurrency)
+        expected = {success: 1, 400: concurrency - 1}
+        if dict(statuses) != expected:
+            problems.append(f'{method} {path}: {dict(statuses)}')
+        if method == 'POST' and rows.count() != 1:
+            problems.append(f'{method} {path}: {rows.count()} строк')
+    if rows.exists():
+        problems.append(f'DELETE {path}: строка осталась')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        prepare_environment(Path(directory), throttling=False)
+        dataset = seed_database(args.users, args.seed)
+        port = free_port()
+        server = start_server(port, args.workers, args.threads)
+        base_url = f'http://127.0.0.1:{port}'
+        problems = []
+        checked = 0
+        try:
+            for path, rows in targets(dataset, args.rounds):
+                problems += check_round(
+                    base_url, dataset.tokens[1], path, rows,
+                    args.concurrency)
+                checked += 1
+        finally:
+            server.terminate()
+            server.wait()
+    for problem in problems:
+        print(problem)
+    print(f'{checked} раундов, {len(problems)} проблем')
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Старт, память и middleware воркера в полном и API-профиле настроек.
+
+Для foodgram.settings и foodgram.settings_api по отдельности:
+
+- время импорта WSGI-приложения и число загруженных модулей — медиана
+  по нескольким свежим интерпретаторам;
+- RSS воркеров gunicorn после прогрева (читается из /proc, только Linux);
+- задержка запроса через весь стек middleware (handler.get_response) и без
+  него (handler._get_response); разница — накладные расходы middleware.
+
+    python -m benchmarks.footprint --workers 2 --requests 2000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+
+from .load import (BACKEND_DIR, free_port, prepare_environment, seed_database,
+                   start_server)
+
+PROFILES = ('foodgram.settings', 'foodgram.settings_api')
+PATHS = ('/api/tags/', '/api/users/me/', '/api/recipes/')
+
+
+def probe_import():
+    start = time.perf_counter()
+    from foodgram.wsgi import application  # noqa: F401
+    return {
+        'import_s': time.perf_counter() - start,
+        'modules': len(sys.modules),
+    }
+
+
+def probe_middleware(token, count):
+    """Медианы в микросекундах: полный стек и только view."""
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test import RequestFactory
+
+    handler = WSGIHandler()
+    factory = RequestFactory(
+        SERVER_NAME='127.0.0.1', HTTP_AUTHORIZATION=f'Token {token}')
+    timings = {}
+    for path in PATHS:
+        for name, call in (('stack', handler.get_response),
+                           ('view', handler._get_response)):
+            samples = []
+            for _ in range(count):
+                request = factory.get(path)
+                start = time.perf_counter()
+                call(request)
+                samples.append(time.perf_counter() - start)
+            timings[f'{path} {name}'] = statistics.median(samples) * 1e6
+    return timings
+
+
+def run_probe(profile, *arguments):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.footprint', '--probe', *arguments],
+        cwd=BACKEND_DIR, check=True, stdout=subprocess.PIPE, text=True,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': profile},
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def worker_rss(server):
+    """RSS дочерних процессов gunicorn в мегабайтах."""
+    sizes = []
+    for status in Path('/proc').glob('[0-9]*/status'):
+        try:
+            fields = dict(
+                line.split(':', 1) for line in status.read_text().splitlines()
+                if ':' in line)
+        except OSError:
+            continue
+        if int(fields['PPid']) == server.pid and 'VmRSS' in fields:
+            sizes.append(int(fields['VmRSS'].split()[0]) / 1024)
+    return sizes
+
+
+def measure_rss(profile, workers, token):
+    os.environ['DJANGO_SETTINGS_MODULE'] = profile
+    port = free_port()
+    server = start_server(port, workers, 1)
+    try:
+        session = requests.Session()
+        session.headers['Authorization'] = f'Token {token}'
+        for _ in range(50 * workers):
+            for path in PATHS:
+                session.get(f'http://127.0.0.1:{port}{path}', timeout=10)
+        return worker_rss(server)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def measure(profile, args, token):
+    imports = [run_probe(profile, 'import') for _ in range(args.imports)]
+    rss = measure_rss(profile, args.workers, token)
+    return {
+        'import_s': statistics.median(item['import_s'] for item in imports),
+        'modules': statistics.median(item['modules'] for item in imports),
+        'worker_rss_mb': statistics.median(rss) if rss else None,
+        'request_us': run_probe(
+            profile, 'middleware', token, str(args.requests)),
+    }
+
+
+def report(results):
+    full, lean = (results[profile] for profile in PROFILES)
+    rows = [
+        ('импорт, мс', full['import_s'] * 1000, lean['import_s'] * 1000),
+        ('модулей', full['modules'], lean['modules']),
+        ('RSS воркера, МБ', full['worker_rss_mb'], lean['worker_rss_mb']),
+    ]
+    for path in PATHS:
+        stack, view = f'{path} stack', f'{path} view'
+        rows.append((
+            f'middleware {path}, мкс',
+            full['request_us'][stack] - full['request_us'][view],
+            lean['request_us'][stack] - lean['request_us'][view],
+        ))
+        rows.append((
+            f'запрос {path}, мкс',
+            full['request_us'][stack], lean['request_us'][stack],
+        ))
+    print(f'{"":<40} {"settings":>12} {"settings_api":>12}')
+    for name, old, new in rows:
+        if old is None or new is None:
+            print(f'{name:<40} {"-":>12} {"-":>12}')
+            continue
+        print(f'{name:<40} {old:>12.1f} {new:>12.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--imports', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='JSON с результатами')
+    parser.add_argument('--probe', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        kind, *rest = args.probe
+        if kind == 'import':
+            print(json.dumps(probe_import()))
+            return
+        import django
+        django.setup()
+        print(json.dumps(probe_middleware(rest[0], int(rest[1]))))
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        prepare_environment(Path(directory), throttling=False)
+        dataset = seed_database(args.users, args.seed)
+        token = dataset.tokens[-1]
+        for profile in PROFILES:
+            results[profile] = measure(profile, args, token)
+    report(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(results, output, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
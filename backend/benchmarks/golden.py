@@ -0,0 +1,271 @@
+"""Сверка быстрого пути чтения с сериализаторами DRF байт в байт.
+
+    python -m benchmarks.golden --users 100
+
+Сверку путей golden_paths на небольшой базе выполняет и pytest
+(tests/test_golden.py); этот скрипт — прогон на большой базе вместе со
+справочниками, кешем списков и /api/batch/.
+"""
+import argparse
+import os
+import sys
+
+import django
+
+
+RECIPE_FIELDSETS = (
+    'fields=id,name,image,cooking_time,is_favorited,is_in_shopping_cart'
+    '&expand=author',
+    'fields=id,tags,ingredients,author',
+    'expand=tags',
+    'fields=text&limit=3',
+    'fields=bogus',
+    'expand=name',
+)
+SUBSCRIPTION_FIELDSETS = (
+    'fields=id,recipes_count',
+    'fields=email,recipes&recipes_limit=2',
+    'fields=id,recipes',
+    'expand=recipes&recipes_limit=1',
+    'fields=recipes_count,username&expand=recipes',
+)
+
+
+def golden_paths(dataset):
+    from .scenarios import filter_combinations
+
+    own_recipes = dataset.recipe_ids_by_author[1]
+    for suffix, query in filter_combinations(dataset):
+        yield True, f'/api/recipes/?{query}'
+        if 'is_' not in suffix:
+            yield False, f'/api/recipes/?{query}'
+    for query in ('page=2', 'limit=50', 'limit=7&page=3', 'page=100000'):
+        yield True, f'/api/recipes/?{query}'
+        yield False, f'/api/recipes/?{query}'
+    for recipe_id in (*own_recipes, dataset.recipes, dataset.recipes + 1):
+        yield True, f'/api/recipes/{recipe_id}/'
+        yield False, f'/api/recipes/{recipe_id}/'
+    for query in RECIPE_FIELDSETS:
+        yield True, f'/api/recipes/?{query}'
+        yield False, f'/api/recipes/{own_recipes[0]}/?{query}'
+    yield True, '/api/recipes/abc/'
+    yield True, f'/api/recipes/{own_recipes[0]}/?tags=missing'
+    for query in (
+        '', 'recipes_limit=1', 'recipes_limit=3', 'limit=2&page=2',
+        *SUBSCRIPTION_FIELDSETS,
+    ):
+        yield True, f'/api/users/subscriptions/?{query}'
+
+
+def golden_clients(dataset):
+    """{авторизован: Client} для путей golden_paths."""
+    from django.test import Client
+
+    return {
+        True: Client(HTTP_AUTHORIZATION=f'Token {dataset.main_token}'),
+        False: Client(),
+    }
+
+
+def render_both(client, path):
+    """((статус, тело) сериализаторов DRF, (статус, тело) быстрого пути)."""
+    from django.test import override_settings
+    from rest_framework.renderers import JSONRenderer
+
+    with override_settings(FAST_READ_PATH=False):
+        expected = client.get(path)
+    with override_settings(FAST_READ_PATH=True):
+        actual = client.get(path)
+    return (
+        (expected.status_code, JSONRenderer().render(expected.data)),
+        (actual.status_code, actual.content),
+    )
+
+
+def check(dataset):
+    clients = golden_clients(dataset)
+    failures = 0
+    for authorized, path in golden_paths(dataset):
+        expected, actual = render_both(clients[authorized], path)
+        same = expected == actual
+        failures += not same
+        print(f'{"ok  " if same else "FAIL"} {actual[0]} '
+              f'{"auth" if authorized else "anon"} {path}')
+        if not same:
+            print(f'  drf:  {expected[1][:300]}')
+            print(f'  fast: {actual[1][:300]}')
+    return failures
+
+
+def check_catalogs():
+    """Снимки справочников совпадают с выводом сериализаторов."""
+    import gzip
+
+    from django.test import Client
+    from rest_framework.renderers import JSONRenderer
+
+    from api.catalog import brotli
+    from api.serializers import IngredientSerializer, TagSerializer
+    from recipes.models import Ingredient, Tag
+
+    client = Client()
+    decoders = {'identity': bytes, 'gzip': gzip.decompress}
+    if brotli is not None:
+        decoders['br'] = brotli.decompress
+    failures = 0
+    for path, serializer, model in (
+        ('/api/tags/', TagSerializer, Tag),
+        ('/api/ingredients/', IngredientSerializer, Ingredient),
+    ):
+        expected = JSONRenderer().render(
+            serializer(model.objects.all(), many=True).data)
+        for encoding, decode in decoders.items():
+            response = client.get(path, HTTP_ACCEPT_ENCODING=encoding)
+            cached = client.get(
+                path, HTTP_ACCEPT_ENCODING=encoding,
+                HTTP_IF_NONE_MATCH=response['ETag'])
+            same = (
+                response.status_code == 200
+                and response.get('Content-Encoding', 'identity') == encoding
+                and decode(response.content) == expected
+                and cached.status_code == 304
+            )
+            failures += not same
+            print(f'{"ok  " if same else "FAIL"} {response.status_code} '
+                  f'{encoding} {path} -> {cached.status_code}')
+    return failures
+
+
+def check_memberships(dataset):
+    """Кеш избранного и списка покупок после записей через эндпоинты и
+    каскадного удаления рецепта совпадает с таблицами."""
+    from django.test import Client
+    from rest_framework.authtoken.models import Token
+
+    from api import memberships
+    from recipes.models import Favorite, Recipe
+
+    client = Client(HTTP_AUTHORIZATION=f'Token {dataset.main_token}')
+    user_id = Token.objects.get(key=dataset.main_token).user_id
+    recipe_id = dataset.recipes
+
+    def delete_favorite_recipe():
+        Recipe.objects.filter(pk=Favorite.objects.filter(
+            recipe_lover_id=user_id).values('recipe_id')[:1]).delete()
+
+    steps = (
+        ('POST favorite', lambda: client.post(
+            f'/api/recipes/{recipe_id}/favorite/')),
+        ('POST shopping_cart', lambda: client.post(
+            f'/api/recipes/{recipe_id}/shopping_cart/')),
+        ('DELETE favorite', lambda: client.delete(
+            f'/api/recipes/{recipe_id}/favorite/')),
+        ('каскадное удаление', delete_favorite_recipe),
+    )
+    failures = 0
+    for name, step in steps:
+        client.get('/api/recipes/?is_favorited=1&is_in_shopping_cart=1')
+        step()
+        for kind in memberships.LISTS:
+            same = (
+                memberships.recipe_ids(kind, user_id).tolist()
+                == memberships.load(kind, user_id).tolist()
+            )
+            failures += not same
+            print(f'{"ok  " if same else "FAIL"} {kind} после {name}')
+    return failures
+
+
+def check_batch(dataset):
+    """Ответы внутри /api/batch/ совпадают с отдельными запросами."""
+    import json
+
+    from django.test import Client
+
+    paths = [
+        '/api/users/me/', '/api/tags/', '/api/recipes/?limit=6',
+        '/api/ingredients/', '/api/recipes/?is_favorited=1',
+        f'/api/recipes/{dataset.recipes}/',
+        '/api/recipes/download_shopping_cart/',
+        '/api/recipes/abc/', '/api/batch/',
+    ]
+    clients = {
+        True: Client(HTTP_AUTHORIZATION=f'Token {dataset.main_token}'),
+        False: Client(),
+    }
+    failures = 0
+    for authorized, client in clients.items():
+        for parallel in (False, True):
+            response = client.post(
+                '/api/batch/', {'requests': paths, 'parallel': parallel},
+                content_type='application/json')
+            items = json.loads(response.content)
+            for path, item in zip(paths, items):
+                single = client.get(path)
+                if single['Content-Type'].startswith('application/json'):
+                    expected = json.loads(single.content)
+                else:
+                    expected = single.content.decode()
+                if path == '/api/batch/':
+                    single.status_code = 404
+                    expected = item['body']
+                same = (
+                    item['path'] == path
+                    and item['status'] == single.status_code
+                    and item['body'] == expected
+                )
+                failures += not same
+                print(f'{"ok  " if same else "FAIL"} {item["status"]} '
+                      f'{"auth" if authorized else "anon"} '
+                      f'{"parallel" if parallel else "serial"} {path}')
+    return failures
+
+
+def prepare_edge_cases(dataset):
+    """Пустое изображение и символы, которые JSONRenderer экранирует."""
+    from recipes.models import Recipe
+
+    first, second, *_ = dataset.recipe_ids_by_author[1]
+    Recipe.objects.filter(pk=first).update(
+        image='', text='Строка\u2028перенос\u2029абзац "кавычки" \\ </script>')
+    Recipe.objects.filter(pk=second).update(image='recipes/images/a b.jpg')
+
+
+def seed(users, seed):
+    """Заново засеянная база для сверки: данные генератора, индекс похожих
+    рецептов, крайние случаи и карточки."""
+    from api.cards import refresh_cards
+    from api.similarity import similarity_index
+    from recipes.models import Recipe
+    from .datagen import generate
+    from .runner import reset_database
+
+    reset_database()
+    dataset = generate(users=users, seed=seed)
+    similarity_index.rebuild()
+    prepare_edge_cases(dataset)
+    refresh_cards(Recipe.objects.values_list('pk', flat=True))
+    return dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    django.setup()
+    from .runner import bench_environment
+
+    with bench_environment():
+        dataset = seed(args.users, args.seed)
+        failures = (
+            check(dataset) + check_catalogs()
+            + check_memberships(dataset) + check_batch(dataset))
+    print(f'{failures} mismatches')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
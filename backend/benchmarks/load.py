@@ -0,0 +1,281 @@
+"""Нагрузочный прогон приложения под gunicorn на локальной базе SQLite.
+
+    python -m benchmarks.load --users 200 --concurrency 16 --duration 30
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from io import StringIO
+from pathlib import Path
+
+import django
+import requests
+
+from .scenarios import PNG_1X1
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_MIX = 'browse=45,autocomplete=20,favorite=12,cart=10,download=8,post=5'
+
+
+def prepare_environment(directory, throttling):
+    os.environ.update({
+        'THROTTLING': 'TRUE' if throttling else 'FALSE',
+        'SECRET_KEY': os.environ.get('SECRET_KEY', 'load-test-secret'),
+        'ALLOWED_HOSTS': '127.0.0.1,localhost',
+        'DB_ENGINE': 'django.db.backends.sqlite3',
+        'POSTGRES_DB': str(directory / 'load.sqlite3'),
+        'MEDIA_ROOT': str(directory / 'media'),
+        'SIMILARITY_INDEX_PATH': str(directory / 'similarity.npz'),
+        'PROMETHEUS_MULTIPROC_DIR': str(directory / 'prometheus'),
+        'CACHE_LOCATION': str(directory / 'cache'),
+        'THROTTLE_CACHE_BACKEND': (
+            'django.core.cache.backends.filebased.FileBasedCache'),
+        'THROTTLE_CACHE_LOCATION': str(directory / 'throttle'),
+        'DJANGO_SETTINGS_MODULE': 'foodgram.settings',
+    })
+    for name in ('DB_REPLICA_NAME', 'DB_REPLICA_HOST'):
+        os.environ.pop(name, None)
+
+
+def seed_database(users, seed):
+    django.setup()
+    from django.core.management import call_command
+    from django.db import connections
+
+    from .datagen import generate
+
+    call_command('migrate', verbosity=0)
+    try:
+        dataset = generate(users=users, seed=seed)
+        call_command('build_similarity_index', verbosity=0)
+        call_command('build_recipe_cards', stdout=StringIO())
+        return dataset
+    finally:
+        connections.close_all()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, workers, threads):
+    server = subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn', 'foodgram.wsgi:application',
+            '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+            '--threads', str(threads), '--log-level', 'warning',
+        ],
+        cwd=BACKEND_DIR,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/api/tags/', timeout=5)
+        except requests.RequestException:
+            time.sleep(0.2)
+            continue
+        return server
+    server.terminate()
+    server.wait()
+    raise RuntimeError('gunicorn не запустился за 30 секунд')
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint, latency, ok):
+        with self.lock:
+            self.samples[endpoint].append(latency)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        for endpoint, latencies in sorted(self.samples.items()):
+            latencies.sort()
+            endpoints[endpoint] = {
+                'requests': len(latencies),
+                'rps': round(len(latencies) / elapsed, 2),
+                'error_rate': round(self.errors[endpoint] / len(latencies), 4),
+                **{
+                    f'p{int(q * 100)}_ms': round(
+                        latencies[min(int(q * len(latencies)),
+                                      len(latencies) - 1)] * 1000, 2)
+                    for q in (0.5, 0.95, 0.99)
+                },
+            }
+        total = sum(len(latencies) for latencies in self.samples.values())
+        return {
+            'elapsed_s': round(elapsed, 2),
+            'requests': total,
+            'rps': round(total / elapsed, 2),
+            'errors': sum(self.errors.values()),
+            'endpoints': endpoints,
+        }
+
+
+class VirtualUser:
+    """Клиент с собственным токеном, выполняющий сценарии по весам."""
+
+    def __init__(self, base_url, token, dataset, recorder, rng):
+        self.base_url = base_url
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = f'Token {token}'
+        self.dataset = dataset
+        self.recorder = recorder
+        self.rng = rng
+
+    def call(self, endpoint, method, path, expected=(200,), **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self.base_url + path, timeout=30, **kwargs)
+            ok = response.status_code in expected
+        except requests.RequestException:
+            ok = False
+        self.recorder.record(endpoint, time.perf_counter() - start, ok)
+
+    def random_recipe(self):
+        return self.rng.randint(1, self.dataset.recipes)
+
+    def browse(self):
+        page = self.rng.randint(1, 10)
+        self.call('GET recipes list', 'GET', f'/api/recipes/?page={page}',
+                  expected=(200, 404))
+        self.call('GET recipe detail', 'GET',
+                  f'/api/recipes/{self.random_recipe()}/')
+
+    def autocomplete(self):
+        name = self.rng.choice(self.dataset.ingredient_names)
+        for length in range(1, min(len(name), 4) + 1):
+            self.call('GET ingredients search', 'GET', '/api/ingredients/',
+                      params={'name': name[:length]})
+
+    def favorite(self):
+        path = f'/api/recipes/{self.random_recipe()}/favorite/'
+        self.call('POST favorite', 'POST', path, expected=(201, 400))
+        self.call('DELETE favorite', 'DELETE', path, expected=(204, 400))
+
+    def cart(self):
+        path = f'/api/recipes/{self.random_recipe()}/shopping_cart/'
+        self.call('POST shopping_cart', 'POST', path, expected=(201, 400))
+        if self.rng.random() < 0.5:
+            self.call('DELETE shopping_cart', 'DELETE', path,
+                      expected=(204, 400))
+
+    def download(self):
+        self.call('GET download_shopping_cart', 'GET',
+                  '/api/recipes/download_shopping_cart/',
+                  expected=(200, 400))
+
+    def post(self):
+        ingredients = self.rng.sample(
+            range(1, len(self.dataset.ingredient_names) + 1), 5)
+        self.call('POST recipe', 'POST', '/api/recipes/', expected=(201,),
+                  json={
+                      'ingredients': [
+                          {'id': pk, 'amount': 100} for pk in ingredients],
+                      'tags': [1],
+                      'image': PNG_1X1,
+                      'name': f'Нагрузка {self.rng.getrandbits(64):x}',
+                      'text': 'Рецепт из нагрузочного прогона',
+                      'cooking_time': 20,
+                  })
+
+
+def parse_mix(mix):
+    weights = {}
+    for item in mix.split(','):
+        name, weight = item.split('=')
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def drive(base_url, dataset, concurrency, duration, mix, seed):
+    recorder = Recorder()
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    deadline = time.monotonic() + duration
+
+    def worker(number):
+        rng = random.Random(seed + number)
+        user = VirtualUser(
+            base_url, dataset.tokens[number % len(dataset.tokens)],
+            dataset, recorder, rng)
+        while time.monotonic() < deadline:
+            getattr(user, rng.choices(names, weights)[0])()
+
+    threads = [
+        threading.Thread(target=worker, args=(number,))
+        for number in range(concurrency)
+    ]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.report(time.monotonic() - start)
+
+
+def print_report(report):
+    print(
+        f'{report["requests"]} requests in {report["elapsed_s"]}s, '
+        f'{report["rps"]} rps, {report["errors"]} errors')
+    print(f'{"endpoint":<28}{"count":>8}{"rps":>9}{"p50":>9}'
+          f'{"p95":>9}{"p99":>9}{"errors":>9}')
+    for endpoint, stats in report['endpoints'].items():
+        print(
+            f'{endpoint:<28}{stats["requests"]:>8}{stats["rps"]:>9}'
+            f'{stats["p50_ms"]:>9}{stats["p95_ms"]:>9}{stats["p99_ms"]:>9}'
+            f'{stats["error_rate"]:>9.2%}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--mix', default=DEFAULT_MIX)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument(
+        '--throttling', action='store_true',
+        help='не отключать лимиты запросов REST_FRAMEWORK')
+    parser.add_argument('--output', help='сохранить отчёт в JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        prepare_environment(Path(directory), args.throttling)
+        dataset = seed_database(args.users, args.seed)
+        port = free_port()
+        server = start_server(port, args.workers, args.threads)
+        try:
+            report = drive(
+                f'http://127.0.0.1:{port}', dataset, args.concurrency,
+                args.duration, parse_mix(args.mix), args.seed)
+        finally:
+            server.terminate()
+            server.wait()
+    report['config'] = vars(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""Регрессии планов запросов горячих эндпоинтов.
+
+Для каждого случая — список рецептов с каждым фильтром RecipeFilter,
+подписки, выгрузка списка покупок и поиск ингредиентов по префиксу —
+запрос выполняется на засеянной базе, все его SELECT проходят через
+EXPLAIN. От планов остаются использованные индексы, полные просмотры
+таблиц, временные сортировки и оценка стоимости (только PostgreSQL).
+Сравнение с базовой линией отмечает лишние SQL-запросы, пропавшие
+индексы, новые полные просмотры и рост стоимости больше порога.
+
+    python -m benchmarks.plans --users 300
+    python -m benchmarks.plans --users 300 --update
+
+Те же проверки по базовой линии выполняет pytest (tests/test_plans.py).
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+import django
+
+BASELINE = Path(__file__).with_name('plans_baseline.json')
+SQLITE_STEP = re.compile(
+    r'^(?P<kind>SCAN|SEARCH) (?P<table>\S+)(?: AS \S+)?'
+    r'(?: USING (?P<automatic>AUTOMATIC )?(?:COVERING )?INDEX'
+    r'(?: (?P<index>\S+))?| USING (?:INTEGER )?(?P<pk>PRIMARY KEY))?')
+
+
+def plan_cases(dataset):
+    """(имя, путь) для каждого проверяемого запроса."""
+    from .scenarios import filter_combinations
+
+    for suffix, query in filter_combinations(dataset):
+        yield f'recipes_list{suffix}', f'/api/recipes/?{query}'
+    yield 'recipes_list[have]', '/api/recipes/?have=1,2,3,5,8,13,21,34'
+    yield 'recipes_list[ordering]', '/api/recipes/?ordering=trending'
+    yield 'subscriptions', '/api/users/subscriptions/'
+    yield ('subscriptions[recipes_limit]',
+           '/api/users/subscriptions/?recipes_limit=3')
+    yield 'download_shopping_cart', '/api/recipes/download_shopping_cart/'
+    prefix = dataset.ingredient_names[len(dataset.ingredient_names) // 2][:2]
+    yield 'ingredients_search', f'/api/ingredients/?name={prefix}'
+
+
+def explain_sqlite(cursor, sql):
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+    summary = {'indexes': set(), 'scans': set(), 'sorts': 0, 'cost': None}
+    for *_, detail in cursor.fetchall():
+        if detail.startswith('USE TEMP B-TREE'):
+            summary['sorts'] += 1
+        step = SQLITE_STEP.match(detail)
+        if step is None or step['table'] == 'subquery':
+            continue
+        if step['automatic'] or not (step['index'] or step['pk']):
+            summary['scans'].add(step['table'])
+        elif step['index']:
+            summary['indexes'].add(step['index'])
+        else:
+            summary['indexes'].add(f'{step["table"]}_pkey')
+    return summary
+
+
+def explain_postgresql(cursor, sql):
+    cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]['Plan']
+    summary = {
+        'indexes': set(), 'scans': set(), 'sorts': 0,
+        'cost': root['Total Cost'],
+    }
+    nodes = [root]
+    while nodes:
+        node = nodes.pop()
+        nodes.extend(node.get('Plans', ()))
+        if node['Node Type'] == 'Seq Scan':
+            summary['scans'].add(node['Relation Name'])
+        elif node['Node Type'] == 'Sort':
+            summary['sorts'] += 1
+        if 'Index Name' in node:
+            summary['indexes'].add(node['Index Name'])
+    return summary
+
+
+EXPLAINERS = {
+    'sqlite': explain_sqlite,
+    'postgresql': explain_postgresql,
+}
+
+
+def inspect(client, path):
+    """Число SQL-запросов и сводка планов их SELECT."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    explain = EXPLAINERS[connection.vendor]
+    client.get(path)
+    with CaptureQueriesContext(connection) as queries:
+        status = client.get(path).status_code
+    indexes, scans, sorts, cost = set(), set(), 0, 0.0
+    with connection.cursor() as cursor:
+        for query in queries.captured_queries:
+            if not query['sql'].lstrip().upper().startswith('SELECT'):
+                continue
+            summary = explain(cursor, query['sql'])
+            indexes |= summary['indexes']
+            scans |= summary['scans']
+            sorts += summary['sorts']
+            if summary['cost'] is not None:
+                cost += summary['cost']
+    return {
+        'status': status,
+        'queries': len(queries),
+        'indexes': sorted(indexes),
+        'scans': sorted(scans),
+        'sorts': sorts,
+        'cost': round(cost, 2) if connection.vendor != 'sqlite' else None,
+    }
+
+
+def compare_case(old, plan, threshold):
+    """Описания ухудшений плана одного случая относительно базовой линии."""
+    flags = []
+    if plan['status'] != old['status']:
+        flags.append(f'статус {old["status"]} -> {plan["status"]}')
+    if plan['queries'] > old['queries']:
+        flags.append(f'запросов {old["queries"]} -> {plan["queries"]}')
+    lost = sorted(set(old['indexes']) - set(plan['indexes']))
+    if lost:
+        flags.append(f'не используются индексы {", ".join(lost)}')
+    scans = sorted(set(plan['scans']) - set(old['scans']))
+    if scans:
+        flags.append(f'полный просмотр {", ".join(scans)}')
+    if plan['sorts'] > old['sorts']:
+        flags.append(f'сортировок {old["sorts"]} -> {plan["sorts"]}')
+    if old['cost'] and plan['cost'] is not None and (
+            plan['cost'] > old['cost'] * (1 + threshold)):
+        flags.append(f'стоимость {old["cost"]} -> {plan["cost"]}')
+    return flags
+
+
+def compare(baseline, current, threshold):
+    """Список (случай, описание) для планов хуже базовой линии."""
+    problems = []
+    for name, plan in current.items():
+        old = baseline.get(name)
+        if old is None:
+            print(f'new  {name}')
+            continue
+        flags = compare_case(old, plan, threshold)
+        print(f'{"FAIL" if flags else "ok  "} {name}')
+        for flag in flags:
+            print(f'       {flag}')
+            problems.append((name, flag))
+    return problems
+
+
+def load_baseline(path=BASELINE):
+    """{СУБД: {users, seed, cases}}; пустой словарь, если файла нет."""
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def collect(users, seed):
+    """Планы всех случаев на заново засеянной базе.
+
+    База и кеши уже должны быть тестовыми: bench_environment в main,
+    pytest-django в tests/test_plans.py.
+    """
+    from django.db import connection
+    from django.test import Client
+
+    from api.cards import refresh_cards
+    from api.similarity import similarity_index
+    from recipes.models import Recipe
+    from .datagen import generate
+    from .runner import reset_database
+
+    reset_database()
+    dataset = generate(users=users, seed=seed)
+    similarity_index.rebuild()
+    refresh_cards(Recipe.objects.values_list('pk', flat=True))
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    client = Client(HTTP_AUTHORIZATION=f'Token {dataset.main_token}')
+    return {name: inspect(client, path) for name, path in plan_cases(dataset)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    parser.add_argument(
+        '--threshold', type=float, default=0.2,
+        help='допустимый рост стоимости плана (0.2 = 20%%)')
+    parser.add_argument(
+        '--update', action='store_true',
+        help='записать текущие планы как базовую линию')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    django.setup()
+    from django.db import connection
+
+    from .runner import bench_environment
+
+    if connection.vendor not in EXPLAINERS:
+        sys.exit(f'EXPLAIN для {connection.vendor} не поддерживается')
+    with bench_environment():
+        current = collect(args.users, args.seed)
+    baselines = load_baseline(args.baseline)
+    if args.update:
+        baselines[connection.vendor] = {
+            'users': args.users, 'seed': args.seed, 'cases': current}
+        args.baseline.write_text(
+            json.dumps(baselines, ensure_ascii=False, indent=2) + '\n',
+            encoding='utf-8')
+        print(f'базовая линия: {args.baseline} ({connection.vendor})')
+        return
+    baseline = baselines.get(connection.vendor, {})
+    if baseline and (baseline['users'], baseline['seed']) != (
+            args.users, args.seed):
+        sys.exit(
+            f'базовая линия снята на --users {baseline["users"]} '
+            f'--seed {baseline["seed"]}')
+    problems = compare(baseline.get('cases', {}), current, args.threshold)
+    print(f'{len(problems)} регрессий')
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
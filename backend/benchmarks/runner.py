@@ -0,0 +1,185 @@
+import json
+import os
+import platform
+import statistics
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import count
+from time import perf_counter
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import (CaptureQueriesContext, setup_test_environment,
+                               teardown_test_environment)
+
+from api.cards import refresh_cards
+from api.catalog import CATALOGS
+from api.similarity import similarity_index
+from recipes.models import Recipe
+from .datagen import generate
+from .scenarios import build_scenarios
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def measure(scenario, client, repeat, iterations):
+    scenario(client, next(iterations))
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        response = scenario(client, next(iterations))
+        timings.append((perf_counter() - start) * 1000)
+    with CaptureQueriesContext(connection) as queries:
+        response = scenario(client, next(iterations))
+    query_count = len(queries)
+    tracemalloc.start()
+    scenario(client, next(iterations))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'status': response.status_code,
+        'ok': response.status_code == scenario.expected,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'queries': query_count,
+        'peak_kb': round(peak / 1024, 1),
+        'response_bytes': len(response.content),
+    }
+
+
+def run_scale(users, repeat, seed, only=None):
+    reset_database()
+    start = perf_counter()
+    dataset = generate(users=users, seed=seed)
+    similarity_index.rebuild()
+    refresh_cards(Recipe.objects.values_list('pk', flat=True))
+    generation_s = perf_counter() - start
+    client = Client(HTTP_AUTHORIZATION=f'Token {dataset.main_token}')
+    iterations = count()
+    results = {}
+    for scenario in build_scenarios(dataset):
+        if only and not any(name in scenario.name for name in only):
+            continue
+        results[scenario.name] = measure(scenario, client, repeat, iterations)
+        print(
+            f'  {scenario.name:<55} '
+            f'p50={results[scenario.name]["p50_ms"]:>9.2f}ms '
+            f'q={results[scenario.name]["queries"]:>4} '
+            f'status={results[scenario.name]["status"]}'
+        )
+    return {
+        'users': users,
+        'recipes': dataset.recipes,
+        'generation_s': round(generation_s, 2),
+        'scenarios': results,
+    }
+
+
+@contextmanager
+def bench_environment():
+    """Тестовая база, временные MEDIA_ROOT и кеш, без лимитов запросов и
+    без опроса канала сброса кешей: один процесс, а лишний запрос сбивал бы
+    число запросов в замерах."""
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True)
+    try:
+        with override_settings(
+            MEDIA_ROOT=tempfile.mkdtemp(),
+            SIMILARITY={
+                **settings.SIMILARITY,
+                'INDEX_PATH': f'{tempfile.mkdtemp()}/similarity.npz',
+                'SYNC_INTERVAL': 0,
+            },
+            CACHES={**settings.CACHES, 'default': {
+                **settings.CACHES['default'],
+                'LOCATION': tempfile.mkdtemp(),
+            }},
+            REST_FRAMEWORK={
+                **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}},
+            INVALIDATION={**settings.INVALIDATION, 'POLL_INTERVAL': 3600},
+        ):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def reset_database():
+    call_command('flush', interactive=False, verbosity=0)
+    for cache in caches.all():
+        cache.clear()
+    for catalog in CATALOGS:
+        catalog.invalidate()
+    similarity_index.reset()
+
+
+def run(scales, repeat=20, seed=42, only=None):
+    results = {}
+    with bench_environment():
+        for users in scales:
+            print(f'scale={users}')
+            results[str(users)] = run_scale(users, repeat, seed, only)
+    return {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': settings.DATABASES['default']['ENGINE'],
+            'repeat': repeat,
+            'seed': seed,
+            'fast_read_path': settings.FAST_READ_PATH,
+            'recipe_cards': settings.RECIPE_CARDS,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.2):
+    """Сравнивает два прогона; возвращает список регрессий."""
+    regressions = []
+    for scale, data in current['results'].items():
+        old_data = baseline['results'].get(scale)
+        if not old_data:
+            continue
+        for name, stats in data['scenarios'].items():
+            old = old_data['scenarios'].get(name)
+            if not old:
+                continue
+            delta = (stats['p50_ms'] - old['p50_ms']) / old['p50_ms']
+            flags = []
+            if delta > threshold:
+                flags.append('latency')
+            if stats['queries'] > old['queries']:
+                flags.append('queries')
+            print(
+                f'{scale:>7} {name:<55} '
+                f'{old["p50_ms"]:>9.2f} -> {stats["p50_ms"]:>9.2f}ms '
+                f'({delta:+.0%}) q {old["queries"]} -> {stats["queries"]} '
+                f'{" ".join(flags)}'
+            )
+            if flags:
+                regressions.append((scale, name, flags))
+    return regressions
+
+
+def dump(results, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(results, output, ensure_ascii=False, indent=2)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as source:
+        return json.load(source)
@@ -0,0 +1,136 @@
+import json
+from itertools import combinations
+from urllib.parse import urlencode
+
+PNG_1X1 = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+)
+
+STARTUP_REQUESTS = [
+    '/api/users/me/', '/api/tags/', '/api/recipes/', '/api/ingredients/',
+]
+
+
+class Scenario:
+    def __init__(self, name, method, path, expected=200, body=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.expected = expected
+        self.body = body
+
+    def __call__(self, client, iteration):
+        body = self.body(iteration) if self.body else None
+        if body is None:
+            return getattr(client, self.method)(self.path)
+        return getattr(client, self.method)(
+            self.path, data=json.dumps(body),
+            content_type='application/json')
+
+
+def recipe_payload(name, ingredient_ids):
+    return {
+        'ingredients': [
+            {'id': ingredient_id, 'amount': 10 * number}
+            for number, ingredient_id in enumerate(ingredient_ids, start=1)
+        ],
+        'tags': [1, 2],
+        'image': PNG_1X1,
+        'name': name,
+        'text': 'Рецепт из бенчмарка',
+        'cooking_time': 15,
+    }
+
+
+def filter_combinations(dataset):
+    options = (
+        ('tags', dataset.tag_slugs[:2]),
+        ('author', [max(
+            dataset.recipe_ids_by_author,
+            key=lambda author: len(dataset.recipe_ids_by_author[author]),
+        )]),
+        ('is_favorited', [1]),
+        ('is_in_shopping_cart', [1]),
+    )
+    for size in range(len(options) + 1):
+        for combo in combinations(options, size):
+            yield (
+                ''.join(f'[{key}]' for key, _ in combo),
+                urlencode(
+                    [(key, value) for key, values in combo
+                     for value in values]
+                ),
+            )
+
+
+def build_scenarios(dataset):
+    """Сценарии горячих путей API для заданного набора данных."""
+    scenarios = []
+    for suffix, query in filter_combinations(dataset):
+        scenarios.append(Scenario(
+            f'recipes_list{suffix}', 'get', f'/api/recipes/?{query}'))
+    own_recipe = dataset.recipe_ids_by_author[1][0]
+    prefix = dataset.ingredient_names[len(dataset.ingredient_names) // 2][:2]
+    scenarios += [
+        Scenario('recipes_list_limit_50', 'get', '/api/recipes/?limit=50'),
+        Scenario(
+            'recipes_list_limit_50_cards', 'get',
+            '/api/recipes/?limit=50&fields=id,name,image,cooking_time,'
+            'is_favorited,is_in_shopping_cart&expand=author'),
+        Scenario(
+            'recipes_list_trending', 'get', '/api/recipes/?ordering=trending'),
+        Scenario('recipes_list_facets', 'get', '/api/recipes/?facets=tags'),
+        Scenario(
+            'recipes_list_facets[is_favorited]', 'get',
+            '/api/recipes/?facets=tags&is_favorited=1'),
+        Scenario(
+            'recipes_list_have', 'get',
+            '/api/recipes/?have=1,2,3,5,8,13,21,34'),
+        Scenario(
+            'recipes_list_have[tags]', 'get',
+            f'/api/recipes/?have=1,2,3,5,8,13,21,34&'
+            f'{urlencode({"tags": dataset.tag_slugs[0]})}'),
+        Scenario('recipe_detail', 'get', f'/api/recipes/{own_recipe}/'),
+        Scenario(
+            'recipe_similar', 'get', f'/api/recipes/{own_recipe}/similar/'),
+        Scenario('ingredients_all', 'get', '/api/ingredients/'),
+        Scenario(
+            'ingredients_search', 'get',
+            f'/api/ingredients/?{urlencode({"name": prefix})}'),
+        Scenario('tags_list', 'get', '/api/tags/'),
+        Scenario(
+            'batch_startup', 'post', '/api/batch/',
+            body=lambda iteration: {'requests': STARTUP_REQUESTS}),
+        Scenario(
+            'batch_startup_parallel', 'post', '/api/batch/',
+            body=lambda iteration: {
+                'requests': STARTUP_REQUESTS, 'parallel': True}),
+        Scenario('users_me', 'get', '/api/users/me/'),
+        Scenario('subscriptions', 'get', '/api/users/subscriptions/'),
+        Scenario(
+            'subscriptions_recipes_limit', 'get',
+            '/api/users/subscriptions/?recipes_limit=3'),
+        Scenario(
+            'subscriptions_recipe_ids', 'get',
+            '/api/users/subscriptions/?fields=id,username,recipes'),
+        Scenario(
+            'download_shopping_cart', 'get',
+            '/api/recipes/download_shopping_cart/'),
+        Scenario(
+            'recipe_create', 'post', '/api/recipes/', expected=201,
+            body=lambda iteration: recipe_payload(
+                f'Бенчмарк {iteration}', range(1, 9))),
+        Scenario(
+            'recipe_bulk_create_20', 'post', '/api/recipes/bulk/',
+            expected=201,
+            body=lambda iteration: {'recipes': [
+                recipe_payload(f'Пачка {iteration}-{number}', range(1, 9))
+                for number in range(20)
+            ]}),
+        Scenario(
+            'recipe_update', 'patch', f'/api/recipes/{own_recipe}/',
+            body=lambda iteration: recipe_payload(
+                f'Обновлённый {iteration}', range(10, 18))),
+    ]
+    return scenarios
@@ -0,0 +1,118 @@
+"""Задержка индекса похожих рецептов и поиска по продуктам на синтетическом
+каталоге без базы.
+
+Признаки выбираются с тем же степенным распределением, что и в datagen;
+ответы индекса сверяются с полным перебором по матрице.
+
+    python -m benchmarks.similarity --recipes 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+from time import perf_counter
+
+import django
+import numpy as np
+
+
+def synthetic_features(recipes, ingredients, tags, seed):
+    from .datagen import _cum_weights, _sample
+    from api.similarity import INGREDIENT, TAG, feature_code
+
+    rng = random.Random(seed)
+    ingredient_ids = list(range(1, ingredients + 1))
+    weights = _cum_weights(ingredients)
+    return {
+        recipe_id: [
+            feature_code(INGREDIENT, pk) for pk in _sample(
+                rng, ingredient_ids, weights, rng.randint(3, 12))
+        ] + [
+            feature_code(TAG, pk)
+            for pk in rng.sample(range(1, tags + 1), rng.randint(1, 3))
+        ]
+        for recipe_id in range(1, recipes + 1)
+    }
+
+
+def timed(function, *args):
+    start = perf_counter()
+    result = function(*args)
+    return result, (perf_counter() - start) * 1000
+
+
+def brute_force(index, recipe_id, limit):
+    columns, weights = index.vector(recipe_id)
+    scores = index.matrix[:, columns] @ weights
+    scores[index.row_of[recipe_id]] = 0
+    order = np.lexsort((index.recipe_ids, -scores))[:limit]
+    return [int(index.recipe_ids[row]) for row in order if scores[row] > 0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=100000)
+    parser.add_argument('--ingredients', type=int, default=2000)
+    parser.add_argument('--tags', type=int, default=12)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--limit', type=int, default=12)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    django.setup()
+    from django.conf import settings
+
+    from api.similarity import SimilarityIndex
+
+    features = synthetic_features(
+        args.recipes, args.ingredients, args.tags, args.seed)
+    index, build_ms = timed(
+        SimilarityIndex.build, features, settings.SIMILARITY['TAG_WEIGHT'])
+    rng = random.Random(args.seed)
+    queries = rng.sample(range(1, args.recipes + 1), args.queries)
+    timings = []
+    mismatches = 0
+    for recipe_id in queries:
+        result, elapsed = timed(index.similar, recipe_id, args.limit)
+        timings.append(elapsed)
+        if [pk for pk, _ in result] != brute_force(
+                index, recipe_id, args.limit):
+            mismatches += 1
+    changed = {
+        recipe_id: features[rng.randint(1, args.recipes)]
+        for recipe_id in rng.sample(range(1, args.recipes + 1), 1000)
+    }
+    _, update_ms = timed(index.update, changed)
+    delta_timings = [
+        timed(index.similar, recipe_id, args.limit)[1]
+        for recipe_id in queries
+    ]
+    pantry_timings = [
+        timed(index.cookable, rng.sample(range(1, 60), 8))[1]
+        for _ in range(100)
+    ]
+    _, merge_ms = timed(index.merged)
+    timings.sort()
+    delta_timings.sort()
+    pantry_timings.sort()
+    print(
+        f'{args.recipes} рецептов, {len(index.codes)} признаков, '
+        f'{index.matrix.nnz} ненулевых\n'
+        f'сборка {build_ms:.0f} мс, обновление 1000 рецептов '
+        f'{update_ms:.0f} мс, слияние {merge_ms:.0f} мс\n'
+        f'similar: p50={statistics.median(timings):.2f} мс '
+        f'p95={timings[int(len(timings) * 0.95)]:.2f} мс\n'
+        f'similar с дельтой: p50={statistics.median(delta_timings):.2f} мс '
+        f'p95={delta_timings[int(len(delta_timings) * 0.95)]:.2f} мс\n'
+        f'cookable (8 ингредиентов): '
+        f'p50={statistics.median(pantry_timings):.2f} мс '
+        f'p95={pantry_timings[int(len(pantry_timings) * 0.95)]:.2f} мс\n'
+        f'{mismatches} расхождений с полным перебором'
+    )
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
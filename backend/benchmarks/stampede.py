@@ -0,0 +1,118 @@
+"""Проверка single-flight и stale-while-revalidate у TieredCache.
+
+Несколько процессов по несколько потоков одновременно просят один
+холодный ключ в общем файловом кеше; медленное вычисление должно
+выполниться ровно один раз. Затем ключ устаревает: все запросы должны
+сразу получить старое значение, а пересчитать его — один фоновый поток.
+
+    python -m benchmarks.stampede --processes 4 --threads 8
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+def setup(directory):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    os.environ['CACHE_LOCATION'] = str(Path(directory) / 'cache')
+    import django
+    django.setup()
+
+
+def make_cache(ttl, stale_ttl):
+    from foodgram.caching import TieredCache
+
+    return TieredCache(
+        'stampede', shared_alias='default', ttl=ttl, stale_ttl=stale_ttl,
+        local_ttl=0, jitter=0)
+
+
+def slow_compute(log_path, value, delay):
+    def compute():
+        with open(log_path, 'a') as log:
+            log.write(f'{os.getpid()}\n')
+        time.sleep(delay)
+        return value
+    return compute
+
+
+def worker(directory, threads, start_at, phase, results):
+    setup(directory)
+    cache = make_cache(ttl=1, stale_ttl=30)
+    log_path = Path(directory) / f'{phase}.log'
+    timings, values = [], []
+
+    def request():
+        begin = time.perf_counter()
+        values.append(cache.get_or_set(
+            'key', slow_compute(log_path, phase, 0.3)))
+        timings.append((time.perf_counter() - begin) * 1000)
+
+    pool = [threading.Thread(target=request) for _ in range(threads)]
+    time.sleep(max(0, start_at - time.time()))
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    time.sleep(0.5)
+    results.put((timings, values))
+
+
+def run_phase(directory, phase, processes, threads):
+    results = multiprocessing.Queue()
+    start_at = time.time() + 1
+    pool = [
+        multiprocessing.Process(
+            target=worker,
+            args=(directory, threads, start_at, phase, results))
+        for _ in range(processes)
+    ]
+    for process in pool:
+        process.start()
+    collected = [results.get() for _ in pool]
+    for process in pool:
+        process.join()
+    timings = sorted(value for items, _ in collected for value in items)
+    values = [value for _, items in collected for value in items]
+    log_path = Path(directory) / f'{phase}.log'
+    computed = len(log_path.read_text().split()) if log_path.exists() else 0
+    return timings, values, computed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    problems = []
+    with tempfile.TemporaryDirectory() as directory:
+        for phase, expected in (('cold', {'cold'}), ('stale', {'cold'})):
+            if phase == 'stale':
+                time.sleep(1.5)
+            timings, values, computed = run_phase(
+                directory, phase, args.processes, args.threads)
+            print(
+                f'{phase}: {len(timings)} запросов, вычислений {computed}, '
+                f'p50={statistics.median(timings):.0f} мс '
+                f'max={timings[-1]:.0f} мс')
+            if computed != 1:
+                problems.append(f'{phase}: {computed} вычислений')
+            if set(values) != expected:
+                problems.append(f'{phase}: значения {sorted(set(values))}')
+            if phase == 'stale' and timings[-1] > 250:
+                problems.append(f'{phase}: ожидание {timings[-1]:.0f} мс')
+    print(f'{len(problems)} проблем')
+    for problem in problems:
+        print(problem)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""Двухуровневый кеш: LRU процесса перед общим кешем Django.
+
+В общем кеше значение лежит в конверте (значение, свежо до, годно до).
+Свежее значение отдаётся как есть; ещё stale_ttl секунд после этого
+отдаётся устаревшее, а пересчитывает его в фоне один воркер. Отсутствующий
+ключ пересчитывается single-flight: внутри процесса остальные потоки ждут
+вычисляющий, между процессами — владельца блокировки cache.add(). Сроки
+жизни размываются на ±jitter, чтобы записанные вместе ключи не истекали
+вместе. Локальная копия живёт не дольше local_ttl: за это время удаление
+ключа в одном воркере доходит до остальных. Значение, вычисление которого
+началось до удаления какого-либо ключа в этом процессе, не записывается:
+оно могло быть прочитано из базы до удаления.
+"""
+import logging
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+from time import monotonic
+
+from django.core.cache import caches
+from django.db import connections
+
+from .metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+
+class TieredCache:
+    def __init__(self, name, shared_alias=None, max_size=1000, ttl=300,
+                 stale_ttl=0, local_ttl=5, jitter=0.1, lock_timeout=10,
+                 poll_interval=0.05):
+        self.name = name
+        self.shared_alias = shared_alias
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.local_ttl = local_ttl
+        self.jitter = jitter
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.entries = OrderedDict()
+        self.flights = {}
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.generation = 0
+
+    @property
+    def shared(self):
+        if self.shared_alias is None:
+            return None
+        return caches[self.shared_alias]
+
+    def _shared_key(self, key):
+        return f'{self.name}:{key}'
+
+    def _lock_key(self, key):
+        return f'{self.name}:{key}:lock'
+
+    def _count(self, outcome):
+        with self.lock:
+            self.counts[outcome] += 1
+
+    def _local(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def _remember(self, key, envelope):
+        with self.lock:
+            self.entries[key] = (envelope, monotonic() + self.local_ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def _lookup(self, key):
+        """Конверт и уровень; несвежая локальная копия сверяется с общим
+        кешем, где её мог уже обновить другой воркер."""
+        envelope = self._local(key)
+        if envelope is not None and time.time() < envelope[1]:
+            return envelope, 'local'
+        shared = self.shared
+        if shared is not None:
+            stored = shared.get(self._shared_key(key))
+            if stored is not None and (
+                    envelope is None or stored[1] > envelope[1]):
+                self._remember(key, stored)
+                return stored, 'shared'
+        return envelope, 'local'
+
+    def get_or_set(self, key, compute):
+        """Значение ключа; при промахе compute() вызывается один раз на
+        все воркеры, при устаревании — в фоне."""
+        envelope, tier = self._lookup(key)
+        now = time.time()
+        hit = envelope is not None and now < envelope[2]
+        record_cache(self.name, hit=hit)
+        if not hit:
+            self._count('miss')
+            return self._compute_once(key, compute)
+        if now >= envelope[1]:
+            self._count('stale')
+            self._revalidate(key, compute)
+        else:
+            self._count(tier)
+        return envelope[0]
+
+    def set(self, key, value):
+        fresh_until = time.time() + self.ttl * random.uniform(
+            1 - self.jitter, 1 + self.jitter)
+        envelope = (value, fresh_until, fresh_until + self.stale_ttl)
+        shared = self.shared
+        if shared is not None:
+            shared.set(
+                self._shared_key(key), envelope,
+                int(envelope[2] - time.time()) + 1)
+        self._remember(key, envelope)
+        return value
+
+    def _store(self, key, value, generation):
+        if generation != self.generation:
+            return value
+        return self.set(key, value)
+
+    def forget(self, key):
+        """Удаляет только локальную копию."""
+        with self.lock:
+            self.entries.pop(key, None)
+            self.generation += 1
+
+    def delete(self, key):
+        self.forget(key)
+        shared = self.shared
+        if shared is not None:
+            shared.delete(self._shared_key(key))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+
+    def _take_flight(self, key):
+        with self.lock:
+            if key in self.flights:
+                return None
+            self.flights[key] = threading.Event()
+            return self.flights[key]
+
+    def _land(self, key):
+        with self.lock:
+            event = self.flights.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def _compute_once(self, key, compute):
+        event = self._take_flight(key)
+        if event is None:
+            with self.lock:
+                event = self.flights.get(key)
+            if event is not None:
+                event.wait(self.lock_timeout)
+            envelope, _ = self._lookup(key)
+            if envelope is not None and time.time() < envelope[2]:
+                self._count('waited')
+                return envelope[0]
+            return self._fill(key, compute)
+        try:
+            return self._fill(key, compute)
+        finally:
+            self._land(key)
+
+    def _fill(self, key, compute):
+        shared = self.shared
+        generation = self.generation
+        deadline = monotonic() + self.lock_timeout
+        while shared is not None and monotonic() < deadline:
+            if shared.add(self._lock_key(key), 1, self.lock_timeout):
+                try:
+                    self._count('computed')
+                    return self._store(key, compute(), generation)
+                finally:
+                    shared.delete(self._lock_key(key))
+            time.sleep(self.poll_interval)
+            envelope = shared.get(self._shared_key(key))
+            if envelope is not None:
+                self._remember(key, envelope)
+                self._count('waited')
+                return envelope[0]
+        self._count('computed')
+        return self._store(key, compute(), generation)
+
+    def _revalidate(self, key, compute):
+        if self._take_flight(key) is None:
+            return
+        shared = self.shared
+        if shared is not None and not shared.add(
+                self._lock_key(key), 1, self.lock_timeout):
+            self._land(key)
+            return
+        threading.Thread(
+            target=self._refresh, args=(key, compute, self.generation),
+            daemon=True).start()
+
+    def _refresh(self, key, compute, generation):
+        try:
+            self._count('computed')
+            self._store(key, compute(), generation)
+        except Exception:
+            logger.exception('Не удалось обновить %s:%s', self.name, key)
+        finally:
+            if self.shared is not None:
+                self.shared.delete(self._lock_key(key))
+            self._land(key)
+            connections.close_all()
+
+    def stats(self):
+        with self.lock:
+            hits = (
+                self.counts['local'] + self.counts['shared']
+                + self.counts['stale'])
+            requests = hits + self.counts['miss']
+            return {
+                'size': len(self.entries),
+                'local_hits': self.counts['local'],
+                'shared_hits': self.counts['shared'],
+                'stale_hits': self.counts['stale'],
+                'waited': self.counts['waited'],
+                'misses': self.counts['miss'],
+                'computed': self.counts['computed'],
+                'hit_ratio': hits / requests if requests else 0.0,
+            }
@@ -0,0 +1,75 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY_DB = 'default'
+REPLICA_DB = 'replica'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def pin_to_primary():
+    """До конца текущего запроса все чтения идут в основную базу."""
+    _use_replica.set(False)
+
+
+def primary_db(view):
+    """Закрепляет view (функцию или класс) за основной базой."""
+    view.use_primary_db = True
+    return view
+
+
+def is_pinned(view_func, view_name):
+    """View закреплён за основной базой декоратором или настройкой."""
+    view_class = (
+        getattr(view_func, 'cls', None)
+        or getattr(view_func, 'view_class', None)
+    )
+    return (
+        getattr(view_func, 'use_primary_db', False)
+        or getattr(view_class, 'use_primary_db', False)
+        or view_name in settings.REPLICA_PINNED_VIEWS
+    )
+
+
+@contextmanager
+def replica_reads(enabled):
+    """Чтения внутри блока идут в реплику, если enabled."""
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            _use_replica.get()
+            and not connections[PRIMARY_DB].in_atomic_block
+        ):
+            return REPLICA_DB
+        return PRIMARY_DB
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with replica_reads(request.method in SAFE_METHODS):
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if is_pinned(view_func, request.resolver_match.view_name):
+            pin_to_primary()
@@ -0,0 +1,98 @@
+import os
+from time import perf_counter
+
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+from .performance import wrap_queries
+
+UNRESOLVED_ROUTE = '<unresolved>'
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_http_request_duration_seconds',
+    'Время обработки HTTP-запроса',
+    ('route', 'method', 'status'),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'foodgram_http_requests_in_progress',
+    'Запросы, которые обрабатываются прямо сейчас',
+    ('route',),
+    multiprocess_mode='livesum',
+)
+DB_QUERIES = Histogram(
+    'foodgram_db_queries_per_request',
+    'Число SQL-запросов на один HTTP-запрос',
+    ('route',),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200),
+)
+UPLOAD_SIZE = Histogram(
+    'foodgram_request_body_bytes',
+    'Размер тела POST/PUT/PATCH-запросов',
+    ('route',),
+    buckets=(
+        1024, 10 * 1024, 100 * 1024, 512 * 1024,
+        1024 ** 2, 5 * 1024 ** 2, 10 * 1024 ** 2,
+    ),
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests_total',
+    'Обращения к кешам приложения',
+    ('cache', 'result'),
+)
+
+UPLOAD_METHODS = ('POST', 'PUT', 'PATCH')
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def get_route(request):
+    resolver_match = request.resolver_match
+    return resolver_match.view_name if resolver_match else UNRESOLVED_ROUTE
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        start = perf_counter()
+        try:
+            with wrap_queries(count_queries):
+                response = self.get_response(request)
+        finally:
+            if getattr(request, '_metrics_route', None):
+                REQUESTS_IN_PROGRESS.labels(request._metrics_route).dec()
+        route = get_route(request)
+        REQUEST_LATENCY.labels(
+            route, request.method, response.status_code
+        ).observe(perf_counter() - start)
+        DB_QUERIES.labels(route).observe(queries[0])
+        if request.method in UPLOAD_METHODS:
+            UPLOAD_SIZE.labels(route).observe(
+                int(request.META.get('CONTENT_LENGTH') or 0))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_route = get_route(request)
+        REQUESTS_IN_PROGRESS.labels(request._metrics_route).inc()
+
+
+def metrics_view(request):
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,153 @@
+import json
+import logging
+import random
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('foodgram.performance')
+
+_stats = ContextVar('request_stats', default=None)
+_query_wrappers = ContextVar('query_wrappers', default=())
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.total_time = 0.0
+        self.spans = Counter()
+        self.statements = Counter()
+        self.active = set()
+
+    @property
+    def duplicates(self):
+        return sum(
+            count - 1 for count in self.statements.values() if count > 1)
+
+    def top_duplicate(self):
+        if not self.statements:
+            return None, 0
+        sql, count = self.statements.most_common(1)[0]
+        return (sql, count) if count > 1 else (None, 0)
+
+    def server_timing(self):
+        serializer_time = self.spans['serializer']
+        app_time = max(self.total_time - self.sql_time - serializer_time, 0)
+        return ', '.join((
+            f'db;dur={self.sql_time * 1000:.2f};'
+            f'desc="{self.queries} queries, {self.duplicates} duplicates"',
+            f'serializer;dur={serializer_time * 1000:.2f}',
+            f'app;dur={app_time * 1000:.2f}',
+            f'total;dur={self.total_time * 1000:.2f}',
+        ))
+
+
+def current_stats():
+    return _stats.get()
+
+
+@contextmanager
+def span(name):
+    """Засекает время участка кода; вложенные участки не суммируются."""
+    stats = _stats.get()
+    if stats is None or name in stats.active:
+        yield
+        return
+    stats.active.add(name)
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        stats.spans[name] += perf_counter() - start
+        stats.active.discard(name)
+
+
+@contextmanager
+def wrap_queries(wrapper):
+    """Подключает execute_wrapper к соединениям текущего потока и
+    запоминает его для потоков, продолжающих запрос (inherited_wrappers)."""
+    token = _query_wrappers.set((*_query_wrappers.get(), wrapper))
+    try:
+        with inherited_wrappers((wrapper,)):
+            yield
+    finally:
+        _query_wrappers.reset(token)
+
+
+@contextmanager
+def inherited_wrappers(wrappers=None):
+    """Подключает к соединениям текущего потока обёртки запроса, из
+    контекста которого он запущен (api.batch)."""
+    if wrappers is None:
+        wrappers = _query_wrappers.get()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            for wrapper in wrappers:
+                stack.enter_context(connection.execute_wrapper(wrapper))
+        yield
+
+
+def _count_queries(execute, sql, params, many, context):
+    stats = _stats.get()
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_time += perf_counter() - start
+        stats.queries += 1
+        stats.statements[sql] += 1
+
+
+class PerformanceMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.PERFORMANCE_SAMPLE_RATE
+        self.slow_request_ms = settings.PERFORMANCE_SLOW_REQUEST_MS
+        self.max_queries = settings.PERFORMANCE_MAX_QUERIES
+        self.max_duplicates = settings.PERFORMANCE_MAX_DUPLICATE_QUERIES
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        stats = RequestStats()
+        token = _stats.set(stats)
+        start = perf_counter()
+        try:
+            with wrap_queries(_count_queries):
+                response = self.get_response(request)
+        finally:
+            stats.total_time = perf_counter() - start
+            _stats.reset(token)
+        response['Server-Timing'] = stats.server_timing()
+        self.report(request, response, stats)
+        return response
+
+    def report(self, request, response, stats):
+        total_ms = stats.total_time * 1000
+        if (
+            total_ms < self.slow_request_ms
+            and stats.queries <= self.max_queries
+            and stats.duplicates <= self.max_duplicates
+        ):
+            return
+        duplicate_sql, duplicate_count = stats.top_duplicate()
+        resolver_match = request.resolver_match
+        logger.warning(json.dumps({
+            'event': 'slow_request',
+            'method': request.method,
+            'path': request.path,
+            'route': resolver_match.view_name if resolver_match else None,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+            'sql_ms': round(stats.sql_time * 1000, 2),
+            'serializer_ms': round(stats.spans['serializer'] * 1000, 2),
+            'queries': stats.queries,
+            'duplicate_queries': stats.duplicates,
+            'top_duplicate_count': duplicate_count,
+            'top_duplicate_sql': duplicate_sql and duplicate_sql[:300],
+        }, ensure_ascii=False))
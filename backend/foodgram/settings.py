@@ -1,4 +1,5 @@
 import os
+import tempfile
 from os import environ
 from pathlib import Path
 
@@ -34,6 +35,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -41,8 +43,22 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.invalidation.InvalidationMiddleware',
 ]
 
+PERFORMANCE_INSTRUMENTATION = (
+    environ.get('PERFORMANCE_INSTRUMENTATION', 'FALSE').upper() == 'TRUE'
+)
+PERFORMANCE_SAMPLE_RATE = float(environ.get('PERFORMANCE_SAMPLE_RATE', '1'))
+PERFORMANCE_SLOW_REQUEST_MS = float(
+    environ.get('PERFORMANCE_SLOW_REQUEST_MS', '500'))
+PERFORMANCE_MAX_QUERIES = int(environ.get('PERFORMANCE_MAX_QUERIES', '30'))
+PERFORMANCE_MAX_DUPLICATE_QUERIES = int(
+    environ.get('PERFORMANCE_MAX_DUPLICATE_QUERIES', '5'))
+
+if PERFORMANCE_INSTRUMENTATION:
+    MIDDLEWARE.insert(0, 'foodgram.performance.PerformanceMiddleware')
+
 ROOT_URLCONF = 'foodgram.urls'
 
 TEMPLATES = [
@@ -75,6 +91,48 @@ DATABASES = {
     }
 }
 
+REPLICA_PINNED_VIEWS = [
+    view_name for view_name
+    in os.getenv('DB_REPLICA_PINNED_VIEWS', '').split(',') if view_name
+]
+
+if os.getenv('DB_REPLICA_NAME') or os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv(
+            'DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['foodgram.db_router.PrimaryReplicaRouter']
+    MIDDLEWARE.insert(1, 'foodgram.db_router.ReplicaRoutingMiddleware')
+
+CACHES = {
+    'default': {
+        'BACKEND': environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': environ.get(
+            'CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'foodgram')),
+    },
+    'throttle': {
+        'BACKEND': environ.get(
+            'THROTTLE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': environ.get('THROTTLE_CACHE_LOCATION', 'throttle'),
+        'KEY_PREFIX': 'throttle',
+    },
+}
+
+if 'memcached' not in CACHES['throttle']['BACKEND']:
+    CACHES['throttle']['OPTIONS'] = {
+        'MAX_ENTRIES': int(environ.get('THROTTLE_CACHE_MAX_ENTRIES', '100000')),
+        'CULL_FREQUENCY': 10,
+    }
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -108,7 +166,7 @@ STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
 
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -116,7 +174,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
@@ -127,6 +185,98 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS':
         'api.paginators.PageLimitPagination',
     'PAGE_SIZE': 6,
+    'NUM_PROXIES': int(environ.get('NUM_PROXIES', '1')),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttles.UserTokenBucketThrottle',
+        'api.throttles.IPTokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'downloads': environ.get('THROTTLE_DOWNLOADS', '10/min'),
+        'downloads_ip': environ.get('THROTTLE_DOWNLOADS_IP', '60/min'),
+        'uploads': environ.get('THROTTLE_UPLOADS', '30/hour'),
+        'uploads_ip': environ.get('THROTTLE_UPLOADS_IP', '120/hour'),
+        'search': environ.get('THROTTLE_SEARCH', '120/min'),
+        'search_ip': environ.get('THROTTLE_SEARCH_IP', '600/min'),
+        'writes': environ.get('THROTTLE_WRITES', '60/min'),
+        'writes_ip': environ.get('THROTTLE_WRITES_IP', '300/min'),
+        'batch': environ.get('THROTTLE_BATCH', '300/min'),
+        'batch_ip': environ.get('THROTTLE_BATCH_IP', '1200/min'),
+    },
+}
+
+if environ.get('THROTTLING', 'TRUE').upper() != 'TRUE':
+    REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] = {}
+
+CONCURRENCY_LIMITS = {
+    'downloads': int(environ.get('CONCURRENCY_DOWNLOADS', '2')),
+    'uploads': int(environ.get('CONCURRENCY_UPLOADS', '4')),
+}
+
+ADMIN_IMPORT_MAX_SIZE = int(
+    environ.get('ADMIN_IMPORT_MAX_SIZE', str(1024 * 1024)))
+
+FAST_READ_PATH = environ.get('FAST_READ_PATH', 'TRUE').upper() == 'TRUE'
+RECIPE_CARDS = environ.get('RECIPE_CARDS', 'TRUE').upper() == 'TRUE'
+
+CATALOG_CACHE = {
+    'CACHE': environ.get('CATALOG_CACHE', 'default'),
+    'TTL': int(environ.get('CATALOG_CACHE_TTL', '3600')),
+    'STALE_TTL': int(environ.get('CATALOG_CACHE_STALE_TTL', '300')),
+    'LOCAL_TTL': int(environ.get('CATALOG_CACHE_LOCAL_TTL', '5')),
+}
+
+SIMILARITY = {
+    'INDEX_PATH': environ.get(
+        'SIMILARITY_INDEX_PATH', os.path.join(BASE_DIR, 'var', 'similarity.npz')),
+    'TAG_WEIGHT': float(environ.get('SIMILARITY_TAG_WEIGHT', '0.5')),
+    'SYNC_OVERLAP': int(environ.get('SIMILARITY_SYNC_OVERLAP', '5')),
+    'SYNC_INTERVAL': float(environ.get('SIMILARITY_SYNC_INTERVAL', '1')),
+    'MAX_DELTA': int(environ.get('SIMILARITY_MAX_DELTA', '1000')),
+}
+
+RECIPE_FACETS = {
+    'CACHE': environ.get('RECIPE_FACETS_CACHE', 'default'),
+    'TIMEOUT': int(environ.get('RECIPE_FACETS_TIMEOUT', '300')),
+}
+
+RECIPE_MEMBERSHIPS = {
+    'CACHE': environ.get('RECIPE_MEMBERSHIPS_CACHE', 'default'),
+    'TIMEOUT': int(environ.get('RECIPE_MEMBERSHIPS_TIMEOUT', '3600')),
+    'FILTER_MAX_IDS': int(
+        environ.get('RECIPE_MEMBERSHIPS_FILTER_MAX_IDS', '500')),
+}
+
+TRENDING = {
+    'HALF_LIFE_HOURS': float(environ.get('TRENDING_HALF_LIFE_HOURS', '72')),
+    'FAVORITE_WEIGHT': float(environ.get('TRENDING_FAVORITE_WEIGHT', '1')),
+    'SHOPPING_CART_WEIGHT': float(
+        environ.get('TRENDING_SHOPPING_CART_WEIGHT', '0.5')),
+    'LAG_SECONDS': int(environ.get('TRENDING_LAG_SECONDS', '5')),
+    'BATCH_SIZE': int(environ.get('TRENDING_BATCH_SIZE', '5000')),
+    'RETENTION_DAYS': int(environ.get('TRENDING_RETENTION_DAYS', '30')),
+    'GAP_TIMEOUT': int(environ.get('TRENDING_GAP_TIMEOUT', '3600')),
+}
+
+INVALIDATION = {
+    'POLL_INTERVAL': float(environ.get('INVALIDATION_POLL_INTERVAL', '1')),
+    'OVERLAP': int(environ.get('INVALIDATION_OVERLAP', '10')),
+    'RETENTION': int(environ.get('INVALIDATION_RETENTION', '3600')),
+}
+
+BATCH = {
+    'MAX_REQUESTS': int(environ.get('BATCH_MAX_REQUESTS', '10')),
+    'MAX_WORKERS': int(environ.get('BATCH_MAX_WORKERS', '4')),
+}
+
+BULK_RECIPES = {
+    'MAX_ITEMS': int(environ.get('BULK_RECIPES_MAX_ITEMS', '100')),
+}
+
+TOKEN_CACHE = {
+    'MAX_SIZE': int(environ.get('TOKEN_CACHE_MAX_SIZE', '10000')),
+    'TTL': int(environ.get('TOKEN_CACHE_TTL', '60')),
+    'LOCAL_TTL': int(environ.get('TOKEN_CACHE_LOCAL_TTL', '5')),
+    'SHARED_CACHE': environ.get('TOKEN_CACHE_SHARED_ALIAS'),
 }
 
 
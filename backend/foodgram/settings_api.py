@@ -0,0 +1,46 @@
+"""Настройки воркеров, обслуживающих только /api/.
+
+Клиенты API аутентифицируются токеном, поэтому админка, import_export,
+сессии, сообщения и CSRF им не нужны: без них воркер быстрее стартует,
+занимает меньше памяти и пропускает запрос через меньшее число middleware.
+Админку обслуживает отдельный процесс с foodgram.settings.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, TEMPLATES
+
+ADMIN_ONLY_APPS = (
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'import_export',
+)
+ADMIN_ONLY_MIDDLEWARE = (
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+)
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in ADMIN_ONLY_APPS]
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if middleware not in ADMIN_ONLY_MIDDLEWARE
+]
+
+TEMPLATES = [
+    {
+        **template,
+        'OPTIONS': {
+            **template['OPTIONS'],
+            'context_processors': [
+                processor for processor
+                in template['OPTIONS']['context_processors']
+                if not processor.startswith('django.contrib.messages.')
+            ],
+        },
+    }
+    for template in TEMPLATES
+]
+
+ROOT_URLCONF = 'foodgram.urls_api'
@@ -0,0 +1,35 @@
+"""Настройки для pytest.
+
+Недостающие обязательные переменные окружения получают значения по
+умолчанию; база — SQLite, если DB_ENGINE не задан (в CI задаётся
+PostgreSQL), кеш — в памяти процесса, медиа и индекс похожих рецептов — во
+временном каталоге, лимиты запросов и опрос канала сброса кешей выключены.
+"""
+import os
+import tempfile
+
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+os.environ.setdefault('ALLOWED_HOSTS', 'testserver,localhost,127.0.0.1')
+os.environ.setdefault('DB_ENGINE', 'django.db.backends.sqlite3')
+os.environ.setdefault('THROTTLING', 'FALSE')
+
+from .settings import *  # noqa: E402,F401,F403
+
+TEST_DIR = tempfile.mkdtemp(prefix='foodgram-tests-')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'foodgram-tests',
+    },
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'foodgram-tests-throttle',
+    },
+}
+
+MEDIA_ROOT = os.path.join(TEST_DIR, 'media')
+
+SIMILARITY = {**SIMILARITY, 'INDEX_PATH': os.path.join(TEST_DIR, 'similarity.npz'), 'SYNC_INTERVAL': 0}  # noqa: F405
+
+INVALIDATION = {**INVALIDATION, 'POLL_INTERVAL': 3600}  # noqa: F405
@@ -0,0 +1,32 @@
+import os
+import shutil
+import subprocess
+import sys
+
+from prometheus_client import multiprocess
+
+
+def on_starting(server):
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+    build_similarity_index(server)
+
+
+def build_similarity_index(server):
+    """Собирает индекс похожих рецептов до запуска воркеров, если его ещё
+    нет, чтобы его не строили запросы. Ошибка (например, база ещё не
+    мигрирована) не мешает старту: индекс можно собрать командой позже."""
+    try:
+        subprocess.run(
+            [sys.executable, 'manage.py', 'build_similarity_index',
+             '--if-missing'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    except subprocess.CalledProcessError as error:
+        server.log.warning('Индекс похожих рецептов не собран: %s', error)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,8 +1,17 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.models import ADDITION, CHANGE, LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.shortcuts import redirect
 from import_export import resources
 from import_export.admin import ImportExportModelAdmin
 from import_export.fields import Field
+from import_export.results import RowResult
 
+from .admin_tools import EstimatedCountPaginator, input_filter
+from .importers import IngredientKeyLoader
 from .models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
                      ShoppingCart, Tag)
 
@@ -18,7 +27,8 @@ class IngredientsResource(resources.ModelResource):
     )
     id = Field(
         attribute='id',
-        column_name='id'
+        column_name='id',
+        readonly=True,
     )
 
     class Meta:
@@ -28,6 +38,13 @@ class IngredientsResource(resources.ModelResource):
             'name',
             'measurement_unit'
         )
+        import_id_fields = ('name', 'measurement_unit')
+        instance_loader_class = IngredientKeyLoader
+        use_bulk = True
+        batch_size = 1000
+        skip_unchanged = True
+        report_skipped = False
+        skip_diff = True
 
 
 @admin.register(Ingredient)
@@ -38,12 +55,49 @@ class IngredientAdmin(ImportExportModelAdmin):
         'name',
         'measurement_unit',
     )
-    list_filter = ('name',)
+    search_fields = ('^name',)
+    ordering = ('name',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def import_action(self, request, *args, **kwargs):
+        import_file = request.FILES.get('import_file')
+        limit = settings.ADMIN_IMPORT_MAX_SIZE
+        if import_file is not None and import_file.size > limit:
+            self.message_user(
+                request,
+                f'Файл больше {limit // 1024} КБ. Загрузите его командой '
+                f'python manage.py import_ingredients',
+                messages.ERROR)
+            return redirect(request.path)
+        return super().import_action(request, *args, **kwargs)
+
+    def generate_log_entries(self, result, request):
+        """Записи журнала одной пачкой вместо запроса на каждую строку."""
+        if self.get_skip_admin_log():
+            return
+        flags = {
+            RowResult.IMPORT_TYPE_NEW: ADDITION,
+            RowResult.IMPORT_TYPE_UPDATE: CHANGE,
+        }
+        content_type = ContentType.objects.get_for_model(self.model)
+        LogEntry.objects.bulk_create([
+            LogEntry(
+                user_id=request.user.pk,
+                content_type=content_type,
+                object_id=row.object_id,
+                object_repr=row.object_repr[:200],
+                action_flag=flags[row.import_type],
+                change_message=f'{row.import_type} through import_export',
+            )
+            for row in result if row.import_type in flags
+        ], batch_size=1000)
 
 
 class RecipeIngredientInline(admin.TabularInline):
     model = IngredientInRecipe
     min_num = 1
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(Recipe)
@@ -52,13 +106,34 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'id',
         'name',
-        'author'
+        'author',
+        'favorites_count',
     )
+    list_select_related = ('author',)
     list_filter = (
-        'name',
-        'author',
+        input_filter('author__username', 'автору'),
         'tags',
     )
+    search_fields = ('name',)
+    autocomplete_fields = ('author', 'tags')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        favorites = Favorite.objects.filter(
+            recipe=OuterRef('pk')).order_by().values('recipe').annotate(
+                count=Count('pk')).values('count')
+        return super().get_queryset(request).annotate(
+            favorites_count=Coalesce(
+                Subquery(favorites, output_field=IntegerField()), 0))
+
+    @admin.display(description='В избранном', ordering='favorites_count')
+    def favorites_count(self, recipe):
+        return recipe.favorites_count
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.save(update_fields=('modified',))
 
 
 @admin.register(Tag)
@@ -69,22 +144,30 @@ class TagAdmin(ImportExportModelAdmin):
         'slug',
         'color',
     )
-    list_filter = ('name',)
+    search_fields = ('name', 'slug')
 
 
 @admin.register(Favorite)
-class Favorite(admin.ModelAdmin):
+class FavoriteAdmin(admin.ModelAdmin):
     list_display = (
         'recipe',
         'recipe_lover',
     )
-    list_filter = ('recipe_lover',)
+    list_select_related = ('recipe', 'recipe_lover')
+    list_filter = (input_filter('recipe_lover__username', 'пользователю'),)
+    autocomplete_fields = ('recipe', 'recipe_lover')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(ShoppingCart)
-class ShoppingCart(admin.ModelAdmin):
+class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = (
         'cart_owner',
         'recipe',
     )
-    list_filter = ('cart_owner',)
+    list_select_related = ('cart_owner', 'recipe')
+    list_filter = (input_filter('cart_owner__username', 'владельцу'),)
+    autocomplete_fields = ('cart_owner', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,127 @@
+"""Пакетная загрузка ингредиентов.
+
+Существующие строки один раз читаются в словарь по (name,
+measurement_unit), файл читается потоком, новые и изменённые строки
+пишутся пачками bulk_create и bulk_update. id переименованных ингредиентов
+копятся в renamed, чтобы вызывающий код пересобрал карточки их рецептов.
+"""
+import csv
+from collections import Counter
+
+from import_export.instance_loaders import ModelInstanceLoader
+
+from .models import Ingredient
+
+HEADER = ('name', 'measurement_unit')
+LOOKUP_CHUNK = 500
+
+
+def ingredient_key(name, measurement_unit):
+    return name.strip(), measurement_unit.strip()
+
+
+def read_ingredients(lines):
+    """(id или None, name, measurement_unit) из CSV с заголовком или без.
+
+    Без заголовка столбцы — name, measurement_unit; с заголовком столбец id
+    необязателен.
+    """
+    reader = csv.reader(lines)
+    first = next(reader, None)
+    if first is None:
+        return
+    columns = [column.strip() for column in first]
+    if set(HEADER) <= set(columns):
+        position = {column: index for index, column in enumerate(columns)}
+    else:
+        position = {'name': 0, 'measurement_unit': 1}
+        reader = (row for rows in ([first], reader) for row in rows)
+    for row in reader:
+        if len(row) < len(position):
+            continue
+        name, unit = ingredient_key(
+            row[position['name']], row[position['measurement_unit']])
+        if not name:
+            continue
+        pk = row[position['id']].strip() if 'id' in position else ''
+        yield int(pk) if pk.isdigit() else None, name, unit
+
+
+class IngredientImport:
+    """Импорт потока строк из read_ingredients.
+
+    run() — генератор строк диффа ('create' | 'update', id, было, стало);
+    при dry_run в базу ничего не пишется. Итоги — в stats, id записанных
+    переименований — в renamed.
+    """
+
+    def __init__(self, batch_size=1000, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.stats = Counter()
+        self.renamed = set()
+        self.creates = []
+        self.updates = []
+
+    def run(self, rows):
+        by_key = {
+            (name, unit): pk for pk, name, unit in
+            Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit').iterator()
+        }
+        by_id = {pk: key for key, pk in by_key.items()}
+        for pk, name, unit in rows:
+            key = (name, unit)
+            if pk in by_id and by_id[pk] != key and key not in by_key:
+                old = by_id[pk]
+                del by_key[old]
+                by_key[key], by_id[pk] = pk, key
+                self.updates.append(
+                    Ingredient(pk=pk, name=name, measurement_unit=unit))
+                yield 'update', pk, old, key
+            elif key not in by_key:
+                by_key[key] = None
+                self.creates.append(
+                    Ingredient(name=name, measurement_unit=unit))
+                yield 'create', None, None, key
+            else:
+                self.stats['unchanged'] += 1
+            if len(self.creates) + len(self.updates) >= self.batch_size:
+                self.flush()
+        self.flush()
+
+    def flush(self):
+        self.stats['created'] += len(self.creates)
+        self.stats['updated'] += len(self.updates)
+        if not self.dry_run:
+            Ingredient.objects.bulk_create(
+                self.creates, batch_size=self.batch_size)
+            Ingredient.objects.bulk_update(
+                self.updates, ('name', 'measurement_unit'),
+                batch_size=self.batch_size)
+            self.renamed.update(ingredient.pk for ingredient in self.updates)
+        self.creates, self.updates = [], []
+
+
+class IngredientKeyLoader(ModelInstanceLoader):
+    """Загрузчик для django-import-export: все строки набора ищутся
+    несколькими запросами по name и сопоставляются по
+    (name, measurement_unit)."""
+
+    def __init__(self, resource, dataset=None):
+        super().__init__(resource, dataset)
+        names = sorted({
+            ingredient_key(
+                row.get('name') or '', row.get('measurement_unit') or '')[0]
+            for row in dataset.dict
+        }) if dataset is not None else []
+        self.instances = {}
+        for start in range(0, len(names), LOOKUP_CHUNK):
+            for ingredient in self.get_queryset().filter(
+                    name__in=names[start:start + LOOKUP_CHUNK]):
+                self.instances[ingredient_key(
+                    ingredient.name, ingredient.measurement_unit)] = ingredient
+
+    def get_instance(self, row):
+        return self.instances.get(ingredient_key(
+            row.get('name') or '', row.get('measurement_unit') or ''))
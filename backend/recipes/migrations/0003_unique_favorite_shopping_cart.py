@@ -0,0 +1,34 @@
+# Generated by Django 3.2 on 2026-10-19 10:14
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicates(apps, schema_editor):
+    for model_name, owner in (
+        ('Favorite', 'recipe_lover'),
+        ('ShoppingCart', 'cart_owner'),
+    ):
+        model = apps.get_model('recipes', model_name)
+        keep = model.objects.values(owner, 'recipe').annotate(
+            keep_id=Min('id')).values_list('keep_id', flat=True)
+        model.objects.exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_auto_20230626_1524'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('recipe_lover', 'recipe'), name='unique_favorite'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('cart_owner', 'recipe'), name='unique_shopping_cart'),
+        ),
+    ]
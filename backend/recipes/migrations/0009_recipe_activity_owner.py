@@ -0,0 +1,30 @@
+# Generated by Django 3.2 on 2026-10-19 11:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0008_recipe_author_pub_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipeactivity',
+            name='owner',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddField(
+            model_name='trendingwatermark',
+            name='pending',
+            field=models.JSONField(default=dict, help_text='id -> время, когда пропуск замечен (unix time)', verbose_name='Пропущенные id событий'),
+        ),
+        migrations.AddIndex(
+            model_name='recipeactivity',
+            index=models.Index(fields=['recipe', 'owner'], name='recipe_activity_owner_idx'),
+        ),
+    ]
@@ -79,11 +79,21 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    modified = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Дата изменения'
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['author', 'name'],
@@ -135,6 +145,12 @@ class Favorite(models.Model):
     class Meta:
         verbose_name = 'Избранный рецепт'
         verbose_name_plural = 'Избранные рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe_lover', 'recipe'],
+                name='unique_favorite',
+            )
+        ]
 
 
 class ShoppingCart(models.Model):
@@ -152,6 +168,135 @@ class ShoppingCart(models.Model):
     class Meta:
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['cart_owner', 'recipe'],
+                name='unique_shopping_cart',
+            )
+        ]
 
     def __str__(self):
         return self.recipe.name
+
+
+class RecipeActivity(models.Model):
+    FAVORITE = 1
+    SHOPPING_CART = 2
+    KINDS = (
+        (FAVORITE, 'Избранное'),
+        (SHOPPING_CART, 'Список покупок'),
+    )
+
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.DO_NOTHING,
+        verbose_name='Рецепт',
+        related_name='+',
+        db_constraint=False,
+    )
+    owner = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING,
+        null=True,
+        verbose_name='Пользователь',
+        related_name='+',
+        db_constraint=False,
+    )
+    kind = models.PositiveSmallIntegerField(
+        choices=KINDS,
+        verbose_name='Событие',
+    )
+    weight = models.SmallIntegerField(
+        default=1,
+        verbose_name='Вес',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Время',
+    )
+
+    class Meta:
+        verbose_name = 'Активность по рецепту'
+        verbose_name_plural = 'Активность по рецептам'
+        indexes = [
+            models.Index(
+                fields=['recipe', 'owner'], name='recipe_activity_owner_idx'),
+        ]
+
+
+class RecipePopularity(models.Model):
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Рецепт',
+        related_name='popularity',
+    )
+    score = models.FloatField(
+        default=0,
+        verbose_name='Оценка',
+    )
+
+    class Meta:
+        verbose_name = 'Популярность рецепта'
+        verbose_name_plural = 'Популярность рецептов'
+        indexes = [
+            models.Index(
+                fields=['-score', '-recipe'], name='recipe_trending_idx'),
+        ]
+
+
+class TrendingWatermark(models.Model):
+    last_activity_id = models.BigIntegerField(
+        default=0,
+        verbose_name='Последнее учтённое событие',
+    )
+    epoch = models.DateTimeField(
+        verbose_name='Начало отсчёта затухания',
+    )
+    pending = models.JSONField(
+        default=dict,
+        verbose_name='Пропущенные id событий',
+        help_text='id -> время, когда пропуск замечен (unix time)',
+    )
+
+    class Meta:
+        verbose_name = 'Отметка пересчёта популярности'
+        verbose_name_plural = 'Отметки пересчёта популярности'
+
+
+class RecipeCard(models.Model):
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Рецепт',
+        related_name='card',
+    )
+    modified = models.DateTimeField(
+        verbose_name='Дата изменения рецепта',
+    )
+    data = models.TextField(
+        verbose_name='JSON карточки',
+    )
+
+    class Meta:
+        verbose_name = 'Карточка рецепта'
+        verbose_name_plural = 'Карточки рецептов'
+
+
+class CacheInvalidation(models.Model):
+    topic = models.CharField(
+        max_length=50,
+        verbose_name='Тема',
+    )
+    key = models.CharField(
+        max_length=64,
+        verbose_name='Ключ',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Время',
+    )
+
+    class Meta:
+        verbose_name = 'Сброс кеша'
+        verbose_name_plural = 'Сбросы кешей'
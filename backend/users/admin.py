@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from recipes.admin_tools import EstimatedCountPaginator, input_filter
 from .models import Subscribe, User
 
 
@@ -13,7 +14,9 @@ class UserAdmin(admin.ModelAdmin):
         'last_name',
         'password',
     )
-    list_filter = ('username',)
+    search_fields = ('^username', '^email')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Subscribe)
@@ -23,4 +26,11 @@ class SubscribeAdmin(admin.ModelAdmin):
         'user',
         'author',
     )
-    list_filter = ('user',)
+    list_select_related = ('user', 'author')
+    list_filter = (
+        input_filter('user__username', 'подписчику'),
+        input_filter('author__username', 'автору'),
+    )
+    autocomplete_fields = ('user', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -43,6 +43,14 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    def refresh_from_db(self, using=None, fields=None):
+        """Обращение к одному отложенному полю загружает все отложенные:
+        пользователь из кеша токенов приходит только с id и is_active."""
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred.issuperset(fields):
+            fields = list(deferred)
+        super().refresh_from_db(using=using, fields=fields)
+
 
 class Subscribe(models.Model):
     user = models.ForeignKey(
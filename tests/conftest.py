@@ -0,0 +1,66 @@
+import pytest
+from django.core.cache import caches
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.catalog import CATALOGS
+from recipes.models import Ingredient, Recipe, Tag
+
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    """Кеши в памяти процесса переживают откат транзакции теста."""
+    for cache in caches.all():
+        cache.clear()
+    for catalog in CATALOGS:
+        catalog.forget()
+    yield
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='cook', email='cook@example.com', password='1234567',
+        first_name='Иван', last_name='Поваров')
+
+
+@pytest.fixture
+def another_user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='chef', email='chef@example.com', password='1234567',
+        first_name='Пётр', last_name='Шефов')
+
+
+@pytest.fixture
+def token(user):
+    return Token.objects.create(user=user)
+
+
+@pytest.fixture
+def user_client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@pytest.fixture
+def tag():
+    return Tag.objects.create(name='Завтрак', slug='breakfast', color='#E26C2D')
+
+
+@pytest.fixture
+def ingredient():
+    return Ingredient.objects.create(name='мука', measurement_unit='г')
+
+
+@pytest.fixture
+def make_recipe(tag, ingredient):
+    """Создаёт рецепт автора author со связями, как это делает API."""
+    def make(author, name, **fields):
+        recipe = Recipe.objects.create(
+            author=author, name=name, text='Текст', cooking_time=10,
+            image='recipes/test.png', **fields)
+        recipe.tags.add(tag)
+        recipe.ingredients.create(ingredient=ingredient, amount=100)
+        return recipe
+    return make
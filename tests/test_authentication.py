@@ -0,0 +1,49 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.authentication import CachedToken, token_cache
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cache_keeps_only_token_key_and_user_state(user_client, token):
+    assert user_client.get('/api/users/me/').status_code == 200
+    cached = token_cache.get_or_set(token.key, lambda: None)
+    assert cached == CachedToken(token.key, token.user_id, True)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cached_user_loads_profile_in_one_query(user_client, user):
+    user_client.get('/api/users/me/')
+    with CaptureQueriesContext(connection) as queries:
+        response = user_client.get('/api/users/me/')
+    assert response.json()['username'] == user.username
+    user_queries = [
+        query for query in queries.captured_queries
+        if 'FROM "users_user"' in query['sql']]
+    assert len(user_queries) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_logout_invalidates_cached_token(user_client):
+    assert user_client.get('/api/users/me/').status_code == 200
+    assert user_client.post('/api/auth/token/logout/').status_code == 204
+    assert user_client.get('/api/users/me/').status_code == 401
+
+
+@pytest.mark.django_db(transaction=True)
+def test_deactivation_invalidates_cached_token(user_client, user):
+    assert user_client.get('/api/users/me/').status_code == 200
+    user.is_active = False
+    user.save()
+    assert user_client.get('/api/users/me/').status_code == 401
+
+
+@pytest.mark.django_db(transaction=True)
+def test_lookup_racing_delete_is_not_stored(token):
+    def lookup_then_delete():
+        token_cache.delete(token.key)
+        return CachedToken(token.key, token.user_id, True)
+
+    token_cache.get_or_set(token.key, lookup_then_delete)
+    assert token_cache.get_or_set(token.key, lambda: None) is None
@@ -0,0 +1,48 @@
+import re
+
+import pytest
+from rest_framework.test import APIClient
+
+URLS = ['/api/tags/', '/api/recipes/', '/api/ingredients/']
+
+
+@pytest.fixture
+def timed_client(settings, token):
+    settings.MIDDLEWARE = [
+        'foodgram.performance.PerformanceMiddleware', *settings.MIDDLEWARE]
+    settings.PERFORMANCE_SAMPLE_RATE = 1
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def batch_queries(client, parallel):
+    response = client.post(
+        '/api/batch/', {'requests': URLS, 'parallel': parallel},
+        format='json')
+    assert response.status_code == 200
+    return int(re.search(
+        r'(\d+) queries', response['Server-Timing']).group(1))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_queries_are_counted(timed_client, user, make_recipe):
+    make_recipe(user, 'Оладьи')
+    batch_queries(timed_client, parallel=False)
+    sequential = batch_queries(timed_client, parallel=False)
+    assert sequential > 0
+    assert batch_queries(timed_client, parallel=True) == sequential
+
+
+@pytest.mark.django_db
+def test_batch_costs_a_token_per_request(settings, user_client):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {'batch': '5/min'},
+    }
+    payload = {'requests': URLS}
+    first = user_client.post('/api/batch/', payload, format='json')
+    second = user_client.post('/api/batch/', payload, format='json')
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert int(second['Retry-After']) > 0
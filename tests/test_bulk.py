@@ -0,0 +1,65 @@
+import os
+
+import pytest
+from django.conf import settings
+from django.db import IntegrityError
+
+from api import bulk
+from recipes.models import CacheInvalidation, Recipe
+
+PIXEL = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg==')
+
+
+def stored_images():
+    directory = os.path.join(settings.MEDIA_ROOT, 'recipes', 'images')
+    return set(os.listdir(directory)) if os.path.isdir(directory) else set()
+
+
+@pytest.fixture
+def payload(tag, ingredient):
+    def make(*names, tags=None):
+        return {'recipes': [{
+            'name': name, 'text': 'Текст', 'cooking_time': 10,
+            'image': PIXEL, 'tags': tags or [tag.pk],
+            'ingredients': [{'id': ingredient.pk, 'amount': 100}],
+        } for name in names]}
+    return make
+
+
+@pytest.mark.django_db
+def test_bulk_create_publishes_recipe_event(user_client, payload):
+    response = user_client.post(
+        '/api/recipes/bulk/', payload('Оладьи', 'Блины'), format='json')
+    assert response.status_code == 201
+    ids = {str(result['id']) for result in response.json()['results']}
+    assert set(CacheInvalidation.objects.filter(
+        topic='recipe').values_list('key', flat=True)) >= ids
+
+
+@pytest.mark.django_db
+def test_duplicate_tags_are_rejected(user_client, payload, tag):
+    response = user_client.post(
+        '/api/recipes/bulk/', payload('Оладьи', tags=[tag.pk, tag.pk]),
+        format='json')
+    assert response.status_code == 400
+    assert response.json()['results'][0]['errors'] == {
+        'tags': [f'{tag.pk} - дублирующийся тег']}
+    assert not Recipe.objects.exists()
+
+
+@pytest.mark.django_db
+def test_rollback_removes_saved_images(user_client, payload, monkeypatch):
+    def conflict(author, recipes, items):
+        Recipe.objects.bulk_create(recipes)
+        assert stored_images() != before
+        raise IntegrityError
+
+    before = stored_images()
+    monkeypatch.setattr(bulk, 'insert_rows', conflict)
+    response = user_client.post(
+        '/api/recipes/bulk/', payload('Оладьи', 'Блины'), format='json')
+    assert response.status_code == 409
+    assert stored_images() == before
+    assert not Recipe.objects.exists()
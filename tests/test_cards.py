@@ -0,0 +1,52 @@
+import json
+
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import RecipeCard
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def card(recipe):
+    return json.loads(RecipeCard.objects.get(pk=recipe.pk).data)
+
+
+@pytest.mark.django_db
+def test_reads_do_not_write_missing_cards(user_client, user, make_recipe):
+    recipe = make_recipe(user, 'Оладьи')
+    RecipeCard.objects.all().delete()
+    with CaptureQueriesContext(connection) as queries:
+        response = user_client.get('/api/recipes/')
+    assert response.status_code == 200
+    assert response.json()['results'][0]['name'] == 'Оладьи'
+    assert not [
+        query for query in queries.captured_queries
+        if query['sql'].lstrip().upper().startswith(WRITES)]
+    assert not RecipeCard.objects.filter(pk=recipe.pk).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_saved_recipe_refreshes_card_on_commit(user, make_recipe):
+    recipe = make_recipe(user, 'Оладьи')
+    with transaction.atomic():
+        recipe.name = 'Блины'
+        recipe.save()
+        assert card(recipe)['name'] == 'Оладьи'
+    assert card(recipe)['name'] == 'Блины'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_renamed_tag_refreshes_cards(user, make_recipe, tag):
+    recipe = make_recipe(user, 'Оладьи')
+    tag.name = 'Ужин'
+    tag.save()
+    assert [item['name'] for item in card(recipe)['tags']] == ['Ужин']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_clearing_tag_recipes_refreshes_cards(user, make_recipe, tag):
+    recipe = make_recipe(user, 'Оладьи')
+    tag.recipe_set.clear()
+    assert card(recipe)['tags'] == []
@@ -0,0 +1,44 @@
+import pytest
+
+from api.similarity import similarity_index
+from recipes.models import Ingredient, Recipe, RecipePopularity
+
+
+@pytest.fixture
+def no_index():
+    similarity_index.reset()
+    yield
+    similarity_index.reset()
+
+
+def tag_facets(client, query=''):
+    response = client.get(f'/api/recipes/?facets=tags{query}')
+    assert response.status_code == 200
+    return response.json()['facets']['tags']
+
+
+@pytest.mark.django_db
+def test_trending_counts_do_not_leak_into_plain_list(
+        user_client, user, make_recipe, tag):
+    trending = make_recipe(user, 'Оладьи')
+    make_recipe(user, 'Блины')
+    RecipePopularity.objects.create(recipe=trending, score=1)
+    assert tag_facets(user_client, '&ordering=trending') == {tag.slug: 1}
+    assert tag_facets(user_client) == {tag.slug: 2}
+
+
+@pytest.mark.django_db
+def test_have_counts_match_cookable_page(
+        user_client, user, make_recipe, tag, no_index):
+    make_recipe(user, 'Оладьи')
+    salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+    other = Recipe.objects.create(
+        author=user, name='Рассол', text='Текст', cooking_time=5,
+        image='recipes/test.png')
+    other.tags.add(tag)
+    other.ingredients.create(ingredient=salt, amount=1)
+    similarity_index.rebuild()
+    response = user_client.get(f'/api/recipes/?facets=tags&have={salt.pk}')
+    assert response.status_code == 200
+    assert response.json()['count'] == 1
+    assert response.json()['facets']['tags'] == {tag.slug: 1}
@@ -0,0 +1,45 @@
+"""Быстрый путь чтения (FAST_READ_PATH) отдаёт те же байты и статусы, что
+сериализаторы DRF; большой прогон — python -m benchmarks.golden."""
+import pytest
+
+from benchmarks import golden
+from benchmarks.runner import reset_database
+
+GROUPS = ('list', 'detail', 'fieldsets', 'subscriptions')
+
+
+def group(path):
+    if path.startswith('/api/users/subscriptions/'):
+        return 'subscriptions'
+    if 'fields=' in path or 'expand=' in path:
+        return 'fieldsets'
+    if path.startswith('/api/recipes/?'):
+        return 'list'
+    return 'detail'
+
+
+@pytest.fixture(scope='module')
+def dataset(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        yield golden.seed(users=12, seed=7)
+        reset_database()
+
+
+@pytest.fixture
+def paths(dataset, django_db_blocker):
+    with django_db_blocker.unblock():
+        yield golden.golden_clients(dataset), list(
+            golden.golden_paths(dataset))
+
+
+@pytest.mark.parametrize('name', GROUPS)
+def test_fast_path_matches_serializers(paths, name, django_db_blocker):
+    clients, cases = paths
+    cases = [(authorized, path) for authorized, path in cases
+             if group(path) == name]
+    assert cases
+    with django_db_blocker.unblock():
+        mismatches = [
+            path for authorized, path in cases
+            if len(set(golden.render_both(clients[authorized], path))) > 1]
+    assert mismatches == []
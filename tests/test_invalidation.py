@@ -0,0 +1,55 @@
+import json
+
+import pytest
+from django.utils import timezone
+
+from api.catalog import catalog_cache, tags_catalog
+from api.invalidation import channel
+from recipes.models import CacheInvalidation, Favorite, Tag
+
+
+def topics():
+    return set(CacheInvalidation.objects.values_list('topic', flat=True))
+
+
+@pytest.mark.django_db
+def test_tag_write_publishes_event(tag):
+    assert CacheInvalidation.objects.filter(
+        topic='tag', key=str(tag.pk)).exists()
+
+
+@pytest.mark.django_db
+def test_login_does_not_publish_user_event(user):
+    CacheInvalidation.objects.all().delete()
+    user.last_login = timezone.now()
+    user.save(update_fields=['last_login'])
+    assert topics() == set()
+
+
+@pytest.mark.django_db
+def test_deactivation_publishes_user_event(user):
+    user.is_active = False
+    user.save()
+    assert CacheInvalidation.objects.filter(
+        topic='user', key=str(user.pk)).exists()
+
+
+@pytest.mark.django_db
+def test_relation_rows_do_not_publish_events(user, make_recipe):
+    recipe = make_recipe(user, 'Блины')
+    CacheInvalidation.objects.all().delete()
+    Favorite.objects.create(recipe=recipe, recipe_lover=user)
+    assert topics() == set()
+
+
+@pytest.mark.django_db
+def test_tag_event_drops_shared_catalog_copy(tag):
+    tags_catalog.get()
+    shared_key = catalog_cache._shared_key(tags_catalog.name)
+    assert catalog_cache.shared.get(shared_key) is not None
+    channel.poll(force=True)
+    Tag.objects.create(name='Обед', slug='lunch', color='#49B64E')
+    channel.poll(force=True)
+    assert catalog_cache.shared.get(shared_key) is None
+    snapshot = json.loads(tags_catalog.get().variants['identity'])
+    assert [item['slug'] for item in snapshot] == ['breakfast', 'lunch']
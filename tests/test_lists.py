@@ -0,0 +1,45 @@
+import pytest
+
+from recipes.models import Favorite, ShoppingCart
+
+LISTS = [
+    ('favorite', Favorite, 'recipe_lover'),
+    ('shopping_cart', ShoppingCart, 'cart_owner'),
+]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('path, model, owner_field', LISTS)
+def test_add_and_remove_are_idempotent(user_client, user, make_recipe, path,
+                                       model, owner_field):
+    recipe = make_recipe(user, 'Борщ')
+    url = f'/api/recipes/{recipe.pk}/{path}/'
+    assert user_client.post(url).status_code == 201
+    assert user_client.post(url).status_code == 400
+    assert model.objects.filter(**{owner_field: user}).count() == 1
+    assert user_client.delete(url).status_code == 204
+    assert user_client.delete(url).status_code == 400
+    assert not model.objects.filter(**{owner_field: user}).exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('path', ['favorite', 'shopping_cart'])
+def test_add_missing_recipe_returns_404(user_client, path):
+    assert user_client.post(f'/api/recipes/999/{path}/').status_code == 404
+
+
+@pytest.mark.django_db
+def test_added_representations(user_client, user, make_recipe):
+    recipe = make_recipe(user, 'Щи')
+    favorite = user_client.post(f'/api/recipes/{recipe.pk}/favorite/').json()
+    cart = user_client.post(
+        f'/api/recipes/{recipe.pk}/shopping_cart/').json()
+    assert favorite == {
+        'id': recipe.pk, 'name': 'Щи', 'image': 'recipes/test.png',
+        'cooking_time': 10,
+    }
+    assert cart == {
+        'id': recipe.pk, 'name': 'Щи',
+        'image': 'http://testserver/media/recipes/test.png',
+        'cooking_time': 10,
+    }
@@ -0,0 +1,34 @@
+"""Планы запросов горячих эндпоинтов не хуже базовой линии.
+
+Базовая линия — backend/benchmarks/plans_baseline.json, своя для каждой
+СУБД; её снимает python -m benchmarks.plans --update.
+"""
+import pytest
+from django.db import connection
+
+from benchmarks import plans
+from benchmarks.runner import reset_database
+
+BASELINE = plans.load_baseline().get(connection.vendor)
+
+pytestmark = pytest.mark.skipif(
+    BASELINE is None,
+    reason=(
+        f'нет базовой линии планов для {connection.vendor}: '
+        f'python -m benchmarks.plans --update на этой СУБД'),
+)
+
+
+@pytest.fixture(scope='module')
+def current_plans(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        yield plans.collect(BASELINE['users'], BASELINE['seed'])
+        reset_database()
+
+
+@pytest.mark.parametrize(
+    'case', sorted(BASELINE['cases']) if BASELINE else ['-'])
+def test_plan_not_worse_than_baseline(current_plans, case):
+    assert case in current_plans, f'случай {case} больше не проверяется'
+    assert plans.compare_case(
+        BASELINE['cases'][case], current_plans[case], threshold=0.2) == []
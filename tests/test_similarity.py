@@ -0,0 +1,32 @@
+import pytest
+
+from api.similarity import similarity_index
+
+
+@pytest.fixture(autouse=True)
+def no_index():
+    similarity_index.reset()
+    yield
+    similarity_index.reset()
+
+
+@pytest.mark.django_db
+def test_missing_index_is_not_built_on_request(user_client, user,
+                                               make_recipe):
+    recipe = make_recipe(user, 'Оладьи')
+    response = user_client.get(f'/api/recipes/{recipe.pk}/similar/')
+    assert response.status_code == 503
+    assert response['Retry-After'] == '60'
+    assert not similarity_index.path.exists()
+
+
+@pytest.mark.django_db
+def test_rebuilt_index_sees_later_recipes(user_client, user, make_recipe):
+    first = make_recipe(user, 'Оладьи')
+    second = make_recipe(user, 'Блины')
+    similarity_index.rebuild()
+    third = make_recipe(user, 'Сырники')
+    response = user_client.get(f'/api/recipes/{first.pk}/similar/')
+    assert response.status_code == 200
+    assert {recipe['id'] for recipe in response.json()} == {
+        second.pk, third.pk}
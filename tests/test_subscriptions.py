@@ -0,0 +1,37 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.models import Subscribe
+
+
+@pytest.fixture
+def subscription(user, another_user, make_recipe):
+    for number in range(5):
+        make_recipe(another_user, f'Рецепт {number}')
+    return Subscribe.objects.create(user=user, author=another_user)
+
+
+@pytest.mark.django_db
+def test_recipes_limit_is_applied_in_sql(user_client, subscription):
+    with CaptureQueriesContext(connection) as queries:
+        response = user_client.get(
+            '/api/users/subscriptions/?recipes_limit=2')
+    author = response.json()['results'][0]
+    assert [recipe['name'] for recipe in author['recipes']] == [
+        'Рецепт 4', 'Рецепт 3']
+    assert author['recipes_count'] == 5
+    recipe_queries = [
+        query['sql'] for query in queries.captured_queries
+        if '"recipes_recipe"."cooking_time"' in query['sql']]
+    assert len(recipe_queries) == 1
+    assert 'LIMIT 2' in recipe_queries[0]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query', ['', '?recipes_limit=0', '?recipes_limit=3'])
+def test_fast_path_matches_serializer(user_client, subscription, settings,
+                                      query):
+    fast = user_client.get(f'/api/users/subscriptions/{query}').json()
+    settings.FAST_READ_PATH = False
+    assert user_client.get(f'/api/users/subscriptions/{query}').json() == fast
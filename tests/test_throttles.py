@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import caches
+
+from api.throttles import (IPTokenBucketThrottle, TokenBucketThrottle,
+                           UserTokenBucketThrottle)
+
+
+@pytest.fixture
+def search_rate(settings):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {'search': '5/min', 'search_ip': '5/min'},
+    }
+
+
+def make_request(user_id=None):
+    user = SimpleNamespace(is_authenticated=user_id is not None, pk=user_id)
+    return SimpleNamespace(
+        user=user, method='GET', META={'REMOTE_ADDR': '10.0.0.1'})
+
+
+def test_base_throttle_keys_by_user_or_ip():
+    throttle = TokenBucketThrottle()
+    assert throttle.get_ident_key(make_request(7)) == 'user:7'
+    assert throttle.get_ident_key(make_request()) == 'ip:10.0.0.1'
+
+
+def test_bucket_rejects_after_capacity(search_rate):
+    view = SimpleNamespace(throttle_scope='search')
+    request = make_request(1)
+    results = [
+        UserTokenBucketThrottle().allow_request(request, view)
+        for _ in range(6)]
+    assert results == [True] * 5 + [False]
+
+
+@pytest.mark.parametrize(
+    'throttle_class', [UserTokenBucketThrottle, IPTokenBucketThrottle])
+def test_concurrent_requests_do_not_exceed_capacity(
+        search_rate, throttle_class):
+    view = SimpleNamespace(throttle_scope='search')
+    request = make_request(1)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(
+            lambda _: throttle_class().allow_request(request, view),
+            range(32)))
+    assert 0 < sum(results) <= 5
+
+
+def test_spoofed_forwarded_for_keeps_bucket():
+    throttle = IPTokenBucketThrottle()
+    keys = set()
+    for spoofed in ('1.1.1.1', '2.2.2.2, 3.3.3.3', ''):
+        request = make_request()
+        request.META['HTTP_X_FORWARDED_FOR'] = (
+            f'{spoofed}, 203.0.113.7' if spoofed else '203.0.113.7')
+        keys.add(throttle.get_ident_key(request))
+    assert keys == {'203.0.113.7'}
+
+
+def test_contended_lock_does_not_reject_while_tokens_remain(search_rate):
+    view = SimpleNamespace(throttle_scope='search')
+    request = make_request(1)
+    throttle = UserTokenBucketThrottle()
+    throttle.lock_wait = 0
+    caches['throttle'].add('throttle:search:user:1:lock', 1, 60)
+    results = [throttle.allow_request(request, view) for _ in range(6)]
+    assert results == [True] * 5 + [False]
+    caches['throttle'].delete('throttle:search:user:1:lock')
+    assert not throttle.allow_request(request, view)
@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from api.trending import update_trending
+from recipes.models import RecipeActivity, RecipePopularity, TrendingWatermark
+
+
+def scores():
+    return dict(RecipePopularity.objects.values_list('recipe_id', 'score'))
+
+
+def backdate(minutes, **lookups):
+    RecipeActivity.objects.filter(**lookups).update(
+        created=timezone.now() - timedelta(minutes=minutes))
+
+
+@pytest.mark.django_db
+def test_add_then_remove_leaves_zero(user, another_user, make_recipe):
+    liked = make_recipe(user, 'Оладьи')
+    untouched = make_recipe(user, 'Блины')
+    RecipeActivity.objects.create(
+        recipe=liked, owner=another_user, kind=RecipeActivity.FAVORITE)
+    backdate(120)
+    RecipeActivity.objects.create(
+        recipe=liked, owner=another_user, kind=RecipeActivity.FAVORITE,
+        weight=-1)
+    backdate(1, weight=-1)
+    update_trending()
+    assert scores() == {liked.pk: 0.0, untouched.pk: 0.0}
+
+
+@pytest.mark.django_db
+def test_late_event_below_watermark_is_folded(user, make_recipe):
+    recipe = make_recipe(user, 'Оладьи')
+    first = RecipeActivity.objects.create(
+        recipe=recipe, owner=user, kind=RecipeActivity.FAVORITE)
+    RecipeActivity.objects.create(
+        pk=first.pk + 2, recipe=recipe, owner=user,
+        kind=RecipeActivity.SHOPPING_CART)
+    backdate(1)
+    update_trending()
+    watermark = TrendingWatermark.objects.get()
+    assert watermark.last_activity_id == first.pk + 2
+    assert list(watermark.pending) == [str(first.pk + 1)]
+    before = scores()[recipe.pk]
+
+    RecipeActivity.objects.create(
+        pk=first.pk + 1, recipe=recipe, owner=user,
+        kind=RecipeActivity.FAVORITE)
+    update_trending()
+    assert scores()[recipe.pk] > before
+    assert TrendingWatermark.objects.get().pending == {}